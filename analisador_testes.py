@@ -0,0 +1,467 @@
+"""Análise estática das suítes de teste geradas pelos LLMs.
+
+O caminho rápido é léxico: uma regex separa strings e comentários do código e,
+no código que sobra, acha testes, asserts, contextos de exceção e docstrings;
+a estrutura de linhas lógicas só é consultada nas linhas de def/class/with.
+Quando o arquivo tem algo que esse caminho não trata (string sem fim,
+parênteses desbalanceados, ``;``, tabs, ``with (...)`` entre parênteses...),
+ele é compilado com ``ast`` e a árvore é percorrida uma vez, o que custa umas
+quatro vezes mais. Os dois caminhos dão as mesmas métricas, com as chaves de
+``analisar_arquivo_testes`` do notebook, mais algumas novas. Erros de sintaxe
+que o caminho léxico não percebe não são apontados.
+"""
+import ast
+import io
+import re
+import tokenize
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate, chain, count, repeat
+from operator import add, sub
+from typing import Iterator, List, Match, Optional, Pattern, Tuple
+
+# Mude sempre que a definição de alguma métrica mudar (invalida resultados guardados).
+VERSAO_ANALISADOR = 2
+
+_PALAVRAS_SUCESSO = ("sucesso", "valido", "happy")
+_PALAVRAS_ERRO = ("erro", "invalido", "error", "validation")
+_PALAVRAS_BORDA = ("borda", "limite", "edge")
+_PALAVRAS_METODO = ("metodo", "criar", "buscar", "atualizar", "excluir")
+_ERROS = (("nome", "nome"), ("email", "email"), ("idade", "idade"), ("ativo", "ativo"), ("duplicado", "id_duplicado"))
+_METODOS = (
+    ("criar", "criarUsuario"),
+    ("buscar", "buscarUsuario"),
+    ("atualizar", "atualizarUsuario"),
+    ("excluir", "excluirUsuario"),
+)
+_CENARIOS = (
+    ("nome", "validação_nome"),
+    ("email", "validação_email"),
+    ("idade", "validação_idade"),
+    ("ativo", "validação_ativo"),
+)
+
+# O parser só produz as classes exatas de ast, então type() basta (e é mais barato que isinstance).
+_FUNCOES = {ast.FunctionDef, ast.AsyncFunctionDef}
+_COM_DOCSTRING = {ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef}
+_WITH = {ast.With, ast.AsyncWith}
+
+
+def _percorrer(arvore: ast.AST):
+    # Como ast.walk, mas sem ordem garantida e sem o custo de iter_child_nodes:
+    # os campos vão inteiros para a pilha e o que não é nó (str, int, bytes...)
+    # é descartado ao sair dela.
+    pilha = [arvore]
+    desempilhar, estender, empilhar = pilha.pop, pilha.extend, pilha.append
+    while pilha:
+        no = desempilhar()
+        campos = getattr(no, "_fields", None)
+        if campos is None:
+            continue
+        yield no
+        for campo in campos:
+            valor = getattr(no, campo, None)
+            if type(valor) is list:
+                estender(valor)
+            elif valor is not None:
+                empilhar(valor)
+
+
+def _nome_chamado(no: ast.AST) -> Optional[str]:
+    # Último nome de uma chamada: pytest.raises -> "raises", self.assertEqual -> "assertEqual".
+    if type(no) is ast.Call:
+        no = no.func
+    if type(no) is ast.Attribute:
+        return no.attr
+    if type(no) is ast.Name:
+        return no.id
+    return None
+
+
+def _e_raises(nome: Optional[str]) -> bool:
+    return nome is not None and (nome == "raises" or nome.startswith("assertRaises"))
+
+
+def _classificar(nome: str, metrics: dict):
+    # Mesma classificação por nome de função que o notebook usava.
+    nome = nome.lower()
+    if any(p in nome for p in _PALAVRAS_SUCESSO):
+        metrics["testes_sucesso"] += 1
+    elif any(p in nome for p in _PALAVRAS_ERRO):
+        metrics["testes_erro"] += 1
+        for palavra, erro in _ERROS:
+            if palavra in nome:
+                metrics["erros_cobertos"].add(erro)
+                break
+    elif any(p in nome for p in _PALAVRAS_BORDA):
+        metrics["testes_borda"] += 1
+    elif any(p in nome for p in _PALAVRAS_METODO):
+        metrics["testes_metodo"] += 1
+        for palavra, metodo in _METODOS:
+            if palavra in nome:
+                metrics["metodos_cobertos"].add(metodo)
+                break
+
+    for palavra, cenario in _CENARIOS:
+        if palavra in nome:
+            metrics["cobertura_cenarios"].add(cenario)
+    if "id" in nome and "duplicado" in nome:
+        metrics["cobertura_cenarios"].add("id_duplicado")
+
+
+# Cada trecho é o código até o próximo comentário ou string, e esse comentário
+# ou string; o que não fecha uma string fica como aspa solta. Consumir o código
+# com [^#'"]* evita que o re recomece a alternância em cada posição.
+_LEXICO = re.compile(
+    r"""([^#'"]*)(#[^\r\n]*"""
+    r"|'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''"
+    r'|"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""'
+    r"|'[^'\\\n]*(?:\\.[^'\\\n]*)*'"
+    r'|"[^"\\\n]*(?:\\.[^"\\\n]*)*"'
+    r"""|['"]|\Z)""",
+    re.DOTALL,
+)
+# Letras coladas à aspa só são prefixo se forem o identificador inteiro.
+_PREFIXO = re.compile(r"(?<!\w)(?:[rR][bBfF]?|[bBfF][rR]?|[uU])\Z")
+# As regex abaixo começam por texto fixo, que o re acha bem mais rápido que \b.
+_ASSERT = re.compile(r"assert(?<!\wassert)\b")
+_CHAMADA_ASSERT = re.compile(r"assert(?<!\wassert)\w+\s*\(")
+# Em bytes, só os parênteses (todos viram "(" ou ")"), as quebras e as barras.
+_UNIFICAR_PARENTESES = bytes.maketrans(b"[]{}", b"()()")
+_FORA_DA_ESTRUTURA = bytes(set(range(256)) - set(b"()[]{}\n\\"))
+_LINHA_ESPECIAL = re.compile(rb"[^\n]+")
+_UNIFICAR_PARENTESES_TEXTO = str.maketrans("[]{}", "()()")
+_PARENTESES_INTERNOS = re.compile(r"\([^()]*\)")
+_DEF = re.compile(r"def(?<!\wdef)\s+(\w+)")
+_CLASS = re.compile(r"class(?<!\wclass)\s+(\w+)")
+_WITH_PALAVRA = re.compile(r"with(?<!\wwith)\b")
+_COMECO_WITH = re.compile(r"\s*(?:async\s+)?with")
+# O caso comum: um item só, chamado sem parênteses dentro dos argumentos.
+_WITH_SIMPLES = re.compile(r"(?:async\s+)?with\s+(?:\w+\s*\.\s*)*(\w+)\s*\([^()\[\]{}]*\)(?:\s+as\s+\w+)?\s*:(?!=)")
+# Uma expressão feita só de strings sem prefixo b ou f, talvez entre parênteses.
+_DOCSTRING = re.compile(r'[\s(\\]*(?:[rRuU]?"(?:\\\n)*"[\s\\]*)+[\s)\\]*')
+_ALVO_WITH = re.compile(r"(?:\w+\s*\.\s*)*(\w+)\s*(?:<>)?")
+_AS = re.compile(r"\bas\b")
+_DOIS_PONTOS = re.compile(r":(?!=)")
+
+
+def _metricas(nomes: List[str], linhas_testes: int, asserts: int, contextos_raises: int, comentarios: int) -> dict:
+    metrics = {
+        "total_testes": 0,
+        "testes_sucesso": 0,
+        "testes_erro": 0,
+        "testes_borda": 0,
+        "testes_metodo": 0,
+        "cobertura_cenarios": set(),
+        "complexidade_testes": 0,
+        "comentarios_por_teste": 0,
+        "linhas_por_teste": 0,
+        "asserts_por_teste": 0,
+        "erros_cobertos": set(),
+        "metodos_cobertos": set(),
+    }
+    for nome in nomes:
+        _classificar(nome, metrics)
+
+    total = len(nomes)
+    metrics["total_testes"] = total
+    if total:
+        metrics["asserts_por_teste"] = asserts / total
+        metrics["comentarios_por_teste"] = comentarios / total
+        metrics["linhas_por_teste"] = linhas_testes / total
+    metrics["total_asserts"] = asserts
+    metrics["contextos_raises"] = contextos_raises
+    metrics["total_comentarios"] = comentarios
+    metrics["num_erros_cobertos"] = len(metrics["erros_cobertos"])
+    metrics["num_metodos_cobertos"] = len(metrics["metodos_cobertos"])
+    metrics["num_cobertura_cenarios"] = len(metrics["cobertura_cenarios"])
+    return metrics
+
+
+def _sem_strings(conteudo: str) -> Optional[Tuple[str, int, bool]]:
+    # Código com cada string trocada por "" (o prefixo r/b/f/u fica) e sem os
+    # comentários, nas mesmas linhas: as quebras de uma string de várias linhas
+    # viram continuações com barra. Devolve também o número de comentários e se
+    # alguma f-string tem "assert" (uma chamada que o ast conta). None se sobrar
+    # uma aspa que não abre string nenhuma.
+    pares = _LEXICO.findall(conteudo)
+    trechos = [trecho for _, trecho in pares]
+    if "'" in trechos or '"' in trechos:
+        return None
+    substitutos = [
+        "" if not trecho or trecho[0] == "#"
+        else '""' if "\n" not in trecho
+        else '"' + "\\\n" * trecho.count("\n") + '"'
+        for trecho in trechos
+    ]
+    codigos = [codigo for codigo, _ in pares]
+    assert_em_fstring = any(
+        trecho[0] != "#" and _e_fstring(codigos[i])
+        for i, trecho in enumerate(trechos) if "assert" in trecho
+    )
+    codigo = "".join(chain.from_iterable(zip(codigos, substitutos)))
+    return codigo, sum(map(str.startswith, trechos, repeat("#"))), assert_em_fstring
+
+
+def _e_fstring(codigo_antes: str) -> bool:
+    # O código antes da string começa depois de outra string ou comentário.
+    prefixo = _PREFIXO.search(codigo_antes, max(len(codigo_antes) - 3, 0))
+    return prefixo is not None and "f" in prefixo.group().lower()
+
+
+def _contar_comentarios(conteudo: str) -> int:
+    resultado = _sem_strings(conteudo)
+    if resultado is not None:
+        return resultado[1]
+    # Só se o ast aceitou o que a regex não entende.
+    linhas = io.StringIO(conteudo).readline
+    return sum(1 for token in tokenize.generate_tokens(linhas) if token.type == tokenize.COMMENT)
+
+
+def _contar_raises_with(instrucao: str) -> Optional[int]:
+    # Itens de "with a(...) as x, b(...):" cujo último nome chamado é raises/assertRaises*.
+    simples = _WITH_SIMPLES.match(instrucao)
+    if simples is not None:
+        return _e_raises(simples.group(1))
+    cabecalho = instrucao[_COMECO_WITH.match(instrucao).end():].replace("\\\n", "  ")
+    if cabecalho.lstrip().startswith("("):
+        return None
+    # Troca os parênteses por <>, de dentro para fora: sobra o nível de fora.
+    cabecalho = cabecalho.translate(_UNIFICAR_PARENTESES_TEXTO)
+    while "(" in cabecalho:
+        esvaziado = _PARENTESES_INTERNOS.sub("<>", cabecalho)
+        if esvaziado == cabecalho:
+            return None
+        cabecalho = esvaziado
+    dois_pontos = _DOIS_PONTOS.search(cabecalho)
+    if dois_pontos is None:
+        return None
+    total = 0
+    for item in cabecalho[:dois_pontos.start()].split(","):
+        alvo = _AS.search(item)
+        expressao = (item if alvo is None else item[:alvo.start()]).strip()
+        simples = _ALVO_WITH.fullmatch(expressao)
+        if simples is not None:
+            total += _e_raises(simples.group(1))
+        elif "aises" in expressao:
+            return None
+    return total
+
+
+@lru_cache(maxsize=None)
+def _proxima_linha_ate(indentacao: int) -> Pattern:
+    # Próxima linha não vazia com no máximo essa indentação.
+    return re.compile(r"\n {0,%d}[^ \n]" % indentacao)
+
+
+def _cabecalhos(codigo: str, padrao: Pattern) -> Iterator[Tuple[Match, int, int]]:
+    # Ocorrências de def/class/with no começo de uma linha: (achado, começo da
+    # linha, indentação). Palavras-chave só aparecem no começo de uma instrução.
+    for achado in padrao.finditer(codigo):
+        inicio_linha = codigo.rfind("\n", 0, achado.start()) + 1
+        antes = codigo[inicio_linha:achado.start()]
+        sem_indentacao = antes.lstrip(" ")
+        if not sem_indentacao or sem_indentacao.split() == ["async"]:
+            yield achado, inicio_linha, len(antes) - len(sem_indentacao)
+
+
+class _LinhasLogicas:
+    """As linhas físicas do código sem strings e onde cada linha lógica termina.
+
+    Só as linhas que deixam parênteses abertos, fecham parênteses de linhas
+    anteriores ou terminam em barra ("especiais") são guardadas; nas outras a
+    profundidade é a da última especial e não há continuação.
+    """
+
+    def __init__(self, codigo: str):
+        self.codigo = codigo
+        self.linhas = codigo.split("\n")
+        # Posição do começo da linha seguinte a cada linha.
+        self.seguintes = list(map(add, accumulate(map(len, self.linhas)), count(1)))
+        estrutura = codigo.encode("utf-8", "surrogatepass").translate(_UNIFICAR_PARENTESES, _FORA_DA_ESTRUTURA)
+        while b"()" in estrutura:
+            estrutura = estrutura.replace(b"()", b"")
+        self.especiais: List[int] = []
+        self.profundidades: List[int] = []  # depois de cada especial
+        self.continuacoes: List[bool] = []
+        numero = profundidade = posicao = 0
+        for achado in _LINHA_ESPECIAL.finditer(estrutura):
+            numero += estrutura.count(b"\n", posicao, achado.start())
+            posicao = achado.start()
+            trecho = achado.group()
+            profundidade += trecho.count(b"(") - trecho.count(b")")
+            self.especiais.append(numero)
+            self.profundidades.append(profundidade)
+            self.continuacoes.append(trecho.endswith(b"\\"))
+
+    def balanceadas(self) -> bool:
+        return min(self.profundidades, default=0) >= 0 and self.profundidades[-1:] in ([], [0])
+
+    def numero(self, posicao: int) -> int:
+        return bisect_right(self.seguintes, posicao)
+
+    def fecha(self, numero: int) -> bool:
+        # Alguma linha lógica termina na linha "numero"?
+        i = bisect_right(self.especiais, numero) - 1
+        if i < 0:
+            return True
+        return not self.profundidades[i] and not (self.continuacoes[i] and self.especiais[i] == numero)
+
+    def fim(self, numero: int) -> int:
+        # Última linha física da linha lógica que passa por "numero".
+        while True:
+            i = bisect_right(self.especiais, numero) - 1
+            if i < 0:
+                return numero
+            if self.profundidades[i]:
+                # Parênteses abertos: só fecham numa especial adiante.
+                i += 1
+                while self.profundidades[i]:
+                    i += 1
+                numero = self.especiais[i]
+            elif self.continuacoes[i] and self.especiais[i] == numero:
+                numero += 1
+            else:
+                return numero
+
+    def texto(self, numero: int) -> str:
+        return "\n".join(self.linhas[numero:self.fim(numero) + 1]).lstrip(" ")
+
+    def proxima_com_codigo(self, numero: int) -> int:
+        linhas = self.linhas
+        numero += 1
+        while numero < len(linhas) and not linhas[numero].strip(" "):
+            numero += 1
+        return numero
+
+    def anterior_com_codigo(self, numero: int) -> int:
+        linhas = self.linhas
+        numero -= 1
+        while not linhas[numero].strip(" "):
+            numero -= 1
+        return numero
+
+    def seguida_de_docstring(self, numero: int) -> bool:
+        # A linha lógica depois da que termina em "numero" é só uma expressão de strings?
+        numero = self.proxima_com_codigo(numero)
+        return (
+            numero < len(self.linhas)
+            and self.linhas[numero].lstrip(" ")[0] in "\"(rRuU"
+            and _DOCSTRING.fullmatch(self.texto(numero)) is not None
+        )
+
+    def fim_do_bloco(self, numero: int, indentacao: int) -> int:
+        # Última linha com código antes da próxima linha lógica com essa
+        # indentação ou menos (onde termina o corpo de um def nessa indentação).
+        proxima = _proxima_linha_ate(indentacao)
+        for achado in proxima.finditer(self.codigo, self.seguintes[numero] - 1):
+            candidata = self.numero(achado.start() + 1)
+            if self.fecha(candidata - 1):
+                return self.anterior_com_codigo(candidata)
+        return self.anterior_com_codigo(len(self.linhas))
+
+
+def _analisar_lexico(conteudo: str) -> Optional[dict]:
+    # Caminho rápido: as mesmas métricas do ast, a partir das linhas lógicas do
+    # código sem strings. None quando algo foge do que ele sabe tratar.
+    if "\r" in conteudo:
+        conteudo = conteudo.replace("\r\n", "\n")
+        if "\r" in conteudo:
+            return None
+    if "\0" in conteudo or conteudo.startswith("\ufeff"):
+        return None
+    resultado = _sem_strings(conteudo)
+    if resultado is None or resultado[2]:
+        return None
+    codigo, comentarios, _ = resultado
+    if ";" in codigo or "\t" in codigo or "\f" in codigo or codigo.rstrip(" \n").endswith("\\"):
+        return None
+    linhas = _LinhasLogicas(codigo)
+    if not linhas.balanceadas():
+        return None
+
+    asserts = len(_ASSERT.findall(codigo)) + len(_CHAMADA_ASSERT.findall(codigo))
+    docstrings = linhas.seguida_de_docstring(-1)
+    nomes = []
+    linhas_testes = 0
+    for achado, inicio_linha, indentacao in chain(_cabecalhos(codigo, _DEF), _cabecalhos(codigo, _CLASS)):
+        numero = linhas.numero(inicio_linha)
+        fim = linhas.fim(numero)
+        if linhas.linhas[fim].rstrip(" ").endswith(":"):
+            docstrings += linhas.seguida_de_docstring(fim)
+        elif '"' in linhas.texto(numero):
+            return None  # def f(): "docstring", tudo numa linha
+        nome = achado.group(1)
+        if nome.startswith("assert") and _CHAMADA_ASSERT.match(codigo, achado.start(1)):
+            asserts -= 1  # def assertValido(...) não é chamada
+        if achado.re is _DEF and nome.startswith("test_"):
+            nomes.append((numero, nome))
+            linhas_testes += linhas.fim_do_bloco(fim, indentacao) - numero + 1
+
+    contextos_raises = 0
+    for _, inicio_linha, _ in _cabecalhos(codigo, _WITH_PALAVRA):
+        texto = linhas.texto(linhas.numero(inicio_linha))
+        if "aises" in texto:
+            itens = _contar_raises_with(texto)
+            if itens is None:
+                return None
+            contextos_raises += itens
+
+    nomes.sort()
+    return _metricas([nome for _, nome in nomes], linhas_testes, asserts, contextos_raises, comentarios + docstrings)
+
+
+def _analisar_com_ast(conteudo: str) -> dict:
+    arvore = ast.parse(conteudo)
+    testes = []
+    asserts = 0  # assert e chamadas assert*(...) (unittest, mocks)
+    contextos_raises = 0  # with pytest.raises(...) / with self.assertRaises(...)
+    docstrings = 0
+    for no in _percorrer(arvore):
+        tipo = type(no)
+        if tipo is ast.Call:
+            nome = _nome_chamado(no)
+            if nome is not None and nome.startswith("assert"):
+                asserts += 1
+        elif tipo is ast.Assert:
+            asserts += 1
+        elif tipo in _WITH:
+            contextos_raises += sum(1 for item in no.items if _e_raises(_nome_chamado(item.context_expr)))
+        if tipo in _FUNCOES and no.name.startswith("test_"):
+            testes.append(no)
+        if tipo in _COM_DOCSTRING and no.body:
+            primeiro = no.body[0]
+            if (type(primeiro) is ast.Expr and type(primeiro.value) is ast.Constant
+                    and type(primeiro.value.value) is str):
+                docstrings += 1
+
+    testes.sort(key=lambda f: f.lineno)
+    return _metricas(
+        [funcao.name for funcao in testes],
+        sum(f.end_lineno - f.lineno + 1 for f in testes),
+        asserts,
+        contextos_raises,
+        docstrings + _contar_comentarios(conteudo),
+    )
+
+
+def analisar_codigo(conteudo: str) -> dict:
+    """Métricas de uma suíte a partir do código-fonte.
+
+    Tenta a varredura léxica e, se ela desistir, compila com ``ast``; neste caso
+    lança SyntaxError se o código não compilar.
+    """
+    metrics = _analisar_lexico(conteudo)
+    return _analisar_com_ast(conteudo) if metrics is None else metrics
+
+
+def analisar_arquivo_testes(caminho_arquivo: str) -> Optional[dict]:
+    """Analisa um arquivo de testes e extrai métricas (None se não puder ser lido ou compilado)."""
+    try:
+        with open(caminho_arquivo, "rb") as f:
+            # tokenize.open respeitaria o cookie de encoding; as suítes são UTF-8.
+            conteudo = f.read().decode("utf-8")
+        return analisar_codigo(conteudo)
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+        print(f"Erro ao analisar {caminho_arquivo}: {e}")
+        return None
@@ -0,0 +1,228 @@
+import threading
+from array import array
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from itertools import chain
+from typing import Dict, Iterator, Tuple
+
+from sistema_alvo import User, _usuario_validado
+
+# Colunas, uma posição por linha:
+#   texto    nome e email de cada linha em UTF-8, concatenados
+#   fins     2 uint64 por linha: onde terminam o nome e o email dentro de texto
+#   idades   int64
+#   ativos   1 byte (0/1)
+#   versoes  uint64 (a versão do compare-and-set, via versoes())
+# Cada id aponta para o número da sua linha. Gravar um id que já existe
+# acrescenta uma linha nova e abandona a antiga; quando as abandonadas passam
+# das vivas, as colunas são reescritas só com as vivas.
+_MENOR_INT64, _MAIOR_INT64 = -(1 << 63), (1 << 63) - 1
+_COMPACTAR_A_PARTIR_DE = 1024
+_FALTANDO = object()
+
+
+def _cabe_nas_colunas(id, user: User) -> bool:
+    # Valores que as colunas não reproduzem exatamente (subclasses, idade fora de
+    # 64 bits, id diferente da chave) ficam guardados como o próprio User.
+    return (
+        type(user.id) is str and user.id == id
+        and type(user.nome) is str and type(user.email) is str
+        and type(user.idade) is int and _MENOR_INT64 <= user.idade <= _MAIOR_INT64
+        and (user.ativo is True or user.ativo is False)
+    )
+
+
+class _Valores(ValuesView):
+    def __iter__(self):
+        return (user for _, user in self._mapping._percorrer())
+
+
+class _Itens(ItemsView):
+    def __iter__(self):
+        return self._mapping._percorrer()
+
+
+class _VersoesColunar:
+    """Versões guardadas na coluna versoes, ao lado do resto da linha."""
+
+    def __init__(self, armazenamento: "ArmazenamentoColunar"):
+        self._armazenamento = armazenamento
+
+    def get(self, id, default=None):
+        armazenamento = self._armazenamento
+        with armazenamento._trava:
+            linha = armazenamento._linhas.get(id)
+            return default if linha is None else armazenamento._versoes[linha]
+
+    def __setitem__(self, id, versao: int):
+        armazenamento = self._armazenamento
+        with armazenamento._trava:
+            armazenamento._versoes[armazenamento._linhas[id]] = versao
+
+    def update(self, versoes):
+        armazenamento = self._armazenamento
+        with armazenamento._trava:
+            for id, versao in versoes:
+                armazenamento._versoes[armazenamento._linhas[id]] = versao
+
+    def pop(self, id, default=None):
+        # A versão sai junto com a linha excluída.
+        return default
+
+    def maior(self) -> int:
+        with self._armazenamento._trava:
+            return max(self._armazenamento._versoes, default=0)
+
+
+class ArmazenamentoColunar(MutableMapping):
+    """Armazenamento compacto em colunas para UserService(armazenamento=...).
+
+    Em vez de um User e duas str por usuário, guarda nome e email num único
+    buffer UTF-8 e idade, ativo e versão em arrays. Cada leitura monta um User
+    novo a partir da linha: os Users devolvidos são iguais (==) entre leituras,
+    mas não o mesmo objeto.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._linhas: Dict[object, int] = {}
+        self._texto = bytearray()
+        self._fins = array("Q")
+        self._idades = array("q")
+        self._ativos = bytearray()
+        self._versoes = array("Q")
+        self._avulsos: Dict[int, User] = {}
+        self._abandonadas = 0
+
+    def versoes(self) -> _VersoesColunar:
+        return _VersoesColunar(self)
+
+    def _acrescentar(self, id, user: User, versao: int) -> int:
+        linha = len(self._ativos)
+        if _cabe_nas_colunas(id, user):
+            self._texto += user.nome.encode("utf-8", "surrogatepass")
+            self._fins.append(len(self._texto))
+            self._texto += user.email.encode("utf-8", "surrogatepass")
+            self._fins.append(len(self._texto))
+            self._idades.append(user.idade)
+            self._ativos.append(user.ativo)
+        else:
+            self._avulsos[linha] = user
+            self._fins.extend((len(self._texto), len(self._texto)))
+            self._idades.append(0)
+            self._ativos.append(0)
+        self._versoes.append(versao)
+        return linha
+
+    def _ler(self, id, linha: int) -> User:
+        if self._avulsos:
+            avulso = self._avulsos.get(linha)
+            if avulso is not None:
+                return avulso
+        fins = self._fins
+        inicio = fins[2 * linha - 1] if linha else 0
+        meio = fins[2 * linha]
+        texto = self._texto
+        return _usuario_validado(
+            id,
+            texto[inicio:meio].decode("utf-8", "surrogatepass"),
+            texto[meio:fins[2 * linha + 1]].decode("utf-8", "surrogatepass"),
+            self._idades[linha],
+            self._ativos[linha] == 1,
+        )
+
+    def _gravar(self, id, user: User):
+        # Chamado com a trava. Uma linha regravada herda a versão da anterior
+        # (o UserService grava a nova logo depois).
+        anterior = self._linhas.get(id)
+        versao = 0 if anterior is None else self._versoes[anterior]
+        self._linhas[id] = self._acrescentar(id, user, versao)
+        if anterior is not None:
+            self._abandonar(anterior)
+
+    def _abandonar(self, linha: int):
+        if self._avulsos:
+            self._avulsos.pop(linha, None)
+        self._abandonadas += 1
+        if self._abandonadas > max(len(self._linhas), _COMPACTAR_A_PARTIR_DE):
+            self._compactar()
+
+    def _compactar(self):
+        # Reescreve as colunas com as linhas vivas, na ordem dos ids.
+        texto, fins, idades, ativos, versoes = bytearray(), array("Q"), array("q"), bytearray(), array("Q")
+        avulsos = {}
+        linhas = self._linhas
+        for nova, (id, linha) in enumerate(linhas.items()):
+            inicio = self._fins[2 * linha - 1] if linha else 0
+            texto += self._texto[inicio:self._fins[2 * linha + 1]]
+            deslocamento = len(texto) - self._fins[2 * linha + 1]
+            fins.extend((self._fins[2 * linha] + deslocamento, len(texto)))
+            idades.append(self._idades[linha])
+            ativos.append(self._ativos[linha])
+            versoes.append(self._versoes[linha])
+            if linha in self._avulsos:
+                avulsos[nova] = self._avulsos[linha]
+            # Trocar o valor de uma chave existente não atrapalha a iteração do dict.
+            linhas[id] = nova
+        self._texto, self._fins, self._idades, self._ativos, self._versoes = texto, fins, idades, ativos, versoes
+        self._avulsos = avulsos
+        self._abandonadas = 0
+
+    def __getitem__(self, id) -> User:
+        with self._trava:
+            return self._ler(id, self._linhas[id])
+
+    def get(self, id, default=None):
+        with self._trava:
+            linha = self._linhas.get(id)
+            return default if linha is None else self._ler(id, linha)
+
+    def __contains__(self, id) -> bool:
+        return id in self._linhas
+
+    def __setitem__(self, id, user: User):
+        with self._trava:
+            self._gravar(id, user)
+
+    def __delitem__(self, id):
+        with self._trava:
+            self._abandonar(self._linhas.pop(id))
+
+    def pop(self, id, default=_FALTANDO):
+        with self._trava:
+            linha = self._linhas.pop(id, None)
+            if linha is None:
+                if default is _FALTANDO:
+                    raise KeyError(id)
+                return default
+            user = self._ler(id, linha)
+            self._abandonar(linha)
+            return user
+
+    def update(self, usuarios=(), **kwargs):
+        # Uma aquisição da trava para o lote inteiro (usado por criarUsuariosEmLote).
+        itens = usuarios.items() if hasattr(usuarios, "items") else usuarios
+        with self._trava:
+            for id, user in chain(itens, kwargs.items()):
+                self._gravar(id, user)
+
+    def __len__(self) -> int:
+        return len(self._linhas)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._linhas)
+
+    def _percorrer(self) -> Iterator[Tuple[object, User]]:
+        # Como num dict, criar ou excluir durante a iteração causa RuntimeError.
+        for id in self._linhas:
+            with self._trava:
+                linha = self._linhas.get(id)
+                if linha is not None:
+                    user = self._ler(id, linha)
+            if linha is not None:
+                yield id, user
+
+    def values(self) -> ValuesView:
+        return _Valores(self)
+
+    def items(self) -> ItemsView:
+        return _Itens(self)
@@ -0,0 +1,246 @@
+import sqlite3
+import threading
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Iterator, Optional, Tuple
+
+from sistema_alvo import User, _usuario_validado
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    seq INTEGER PRIMARY KEY,
+    id NOT NULL UNIQUE,
+    nome TEXT NOT NULL,
+    email TEXT NOT NULL,
+    idade INTEGER NOT NULL,
+    ativo INTEGER NOT NULL,
+    versao INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS usuarios_email ON usuarios (email, seq);
+"""
+
+# A coluna id não tem tipo declarado: ids que não são str (nunca validados pelo
+# UserService) voltam do banco com o mesmo tipo. seq preserva a ordem de inserção,
+# como num dict.
+_SQL_BUSCAR = "SELECT id, nome, email, idade, ativo FROM usuarios WHERE id = ?"
+_SQL_CONTEM = "SELECT 1 FROM usuarios WHERE id = ?"
+_SQL_GRAVAR = (
+    "INSERT INTO usuarios (id, nome, email, idade, ativo) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET nome = excluded.nome, email = excluded.email, "
+    "idade = excluded.idade, ativo = excluded.ativo"
+)
+_SQL_EXCLUIR = "DELETE FROM usuarios WHERE id = ?"
+_SQL_CONTAR = "SELECT COUNT(*) FROM usuarios"
+_SQL_IDS = "SELECT id FROM usuarios ORDER BY seq"
+_SQL_TODOS = "SELECT id, nome, email, idade, ativo FROM usuarios ORDER BY seq"
+_SQL_DESDE = "SELECT seq, id, nome, email, idade, ativo FROM usuarios WHERE seq >= ? ORDER BY seq"
+_SQL_EMAIL_EXISTE = "SELECT 1 FROM usuarios WHERE email = ? LIMIT 1"
+_SQL_PRIMEIRO_ID_EMAIL = "SELECT id FROM usuarios WHERE email = ? ORDER BY seq LIMIT 1"
+_SQL_VERSAO = "SELECT versao FROM usuarios WHERE id = ?"
+_SQL_DEFINIR_VERSAO = "UPDATE usuarios SET versao = ? WHERE id = ?"
+_SQL_MAIOR_VERSAO = "SELECT MAX(versao) FROM usuarios"
+
+
+_FALTANDO = object()
+_MAIOR_INT64 = (1 << 63) - 1
+
+
+def _usuario(linha) -> User:
+    # Os registros só entram no banco depois de validados pelo UserService.
+    id, nome, email, idade, ativo = linha
+    if type(idade) is bytes:
+        idade = int(idade)
+    return _usuario_validado(id, nome, email, idade, bool(ativo))
+
+
+def _linha(user: User) -> tuple:
+    # O sqlite3 só grava inteiros de 64 bits. Idades maiores (a validação não
+    # tem limite superior) vão como BLOB com os dígitos: um BLOB nunca é
+    # convertido pela afinidade INTEGER da coluna, ao contrário de um TEXT.
+    idade = user.idade
+    if idade > _MAIOR_INT64:
+        idade = int.__repr__(idade).encode("ascii")
+    return (user.id, user.nome, user.email, idade, user.ativo)
+
+
+class _Valores(ValuesView):
+    def __iter__(self):
+        return self._mapping._percorrer()
+
+
+class _Itens(ItemsView):
+    def __iter__(self):
+        return ((user.id, user) for user in self._mapping._percorrer())
+
+
+class _IndiceEmailSQLite:
+    """Índice de email servido pelo índice usuarios_email do próprio banco."""
+
+    def __init__(self, armazenamento: "ArmazenamentoSQLite"):
+        self._armazenamento = armazenamento
+
+    def __contains__(self, email) -> bool:
+        return self._armazenamento._consultar_um(_SQL_EMAIL_EXISTE, email) is not None
+
+    def primeiro_id(self, email: str) -> Optional[str]:
+        linha = self._armazenamento._consultar_um(_SQL_PRIMEIRO_ID_EMAIL, email)
+        return None if linha is None else linha[0]
+
+    def adicionar(self, user: User):
+        pass
+
+    def adicionar_lote(self, emails, ids):
+        pass
+
+    def remover(self, user: User):
+        pass
+
+
+class _VersoesSQLite:
+    """Versões guardadas na coluna versao de cada linha: sobrevivem a reinícios."""
+
+    def __init__(self, armazenamento: "ArmazenamentoSQLite"):
+        self._armazenamento = armazenamento
+
+    def get(self, id, default=None):
+        linha = self._armazenamento._consultar_um(_SQL_VERSAO, id)
+        return default if linha is None else linha[0]
+
+    def __setitem__(self, id, versao: int):
+        # Vai na mesma transação da escrita do registro; não conta como escrita nova.
+        self._armazenamento._escrever(_SQL_DEFINIR_VERSAO, (versao, id), quantidade=0)
+
+    def update(self, versoes):
+        armazenamento = self._armazenamento
+        with armazenamento._trava:
+            armazenamento._conexao.executemany(_SQL_DEFINIR_VERSAO, ((v, id) for id, v in versoes))
+
+    def pop(self, id, default=None):
+        # A versão sai do banco junto com a linha excluída.
+        return default
+
+    def maior(self) -> int:
+        return self._armazenamento._consultar_um(_SQL_MAIOR_VERSAO)[0] or 0
+
+
+class ArmazenamentoSQLite(MutableMapping):
+    """Backend SQLite para UserService(armazenamento=...).
+
+    Usa modo WAL e agrupa as escritas: o commit acontece a cada ``tamanho_lote``
+    escritas, em confirmar() ou em fechar(). Até ``tamanho_lote - 1`` escritas
+    podem se perder se o processo morrer antes do commit.
+    """
+
+    def __init__(self, caminho: str = ":memory:", tamanho_lote: int = 1000):
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode = WAL")
+        self._conexao.execute("PRAGMA synchronous = NORMAL")
+        self._conexao.executescript(_ESQUEMA)
+        self._trava = threading.RLock()
+        self.tamanho_lote = tamanho_lote
+        self._pendentes = 0
+
+    def indice_email(self) -> _IndiceEmailSQLite:
+        return _IndiceEmailSQLite(self)
+
+    def versoes(self) -> _VersoesSQLite:
+        return _VersoesSQLite(self)
+
+    def _consultar_um(self, sql: str, *parametros):
+        with self._trava:
+            return self._conexao.execute(sql, parametros).fetchone()
+
+    def _percorrer_linhas(self, sql: str, parametros=(), tamanho_bloco: int = 1000) -> Iterator[tuple]:
+        # Lê em blocos para não materializar a tabela inteira na memória.
+        cursor = self._conexao.cursor()
+        with self._trava:
+            cursor.execute(sql, parametros)
+            bloco = cursor.fetchmany(tamanho_bloco)
+        while bloco:
+            yield from bloco
+            with self._trava:
+                bloco = cursor.fetchmany(tamanho_bloco)
+
+    def _escrever(self, sql: str, parametros, quantidade: int = 1) -> int:
+        with self._trava:
+            cursor = self._conexao.execute(sql, parametros)
+            self._contar_escritas(quantidade)
+            return cursor.rowcount
+
+    def _contar_escritas(self, quantidade: int):
+        self._pendentes += quantidade
+        if self._pendentes >= self.tamanho_lote:
+            self.confirmar()
+
+    def confirmar(self):
+        with self._trava:
+            self._conexao.commit()
+            self._pendentes = 0
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.commit()
+            self._conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def __getitem__(self, id) -> User:
+        linha = self._consultar_um(_SQL_BUSCAR, id)
+        if linha is None:
+            raise KeyError(id)
+        return _usuario(linha)
+
+    def get(self, id, default=None):
+        linha = self._consultar_um(_SQL_BUSCAR, id)
+        return default if linha is None else _usuario(linha)
+
+    def __contains__(self, id) -> bool:
+        return self._consultar_um(_SQL_CONTEM, id) is not None
+
+    def __setitem__(self, id, user: User):
+        self._escrever(_SQL_GRAVAR, _linha(user))
+
+    def __delitem__(self, id):
+        if self._escrever(_SQL_EXCLUIR, (id,)) == 0:
+            raise KeyError(id)
+
+    def pop(self, id, default=_FALTANDO):
+        with self._trava:
+            linha = self._conexao.execute(_SQL_BUSCAR, (id,)).fetchone()
+            if linha is None:
+                if default is _FALTANDO:
+                    raise KeyError(id)
+                return default
+            self._escrever(_SQL_EXCLUIR, (id,))
+            return _usuario(linha)
+
+    def update(self, usuarios=(), **kwargs):
+        # Gravação em lote com um único executemany (usado por criarUsuariosEmLote).
+        itens = usuarios.items() if hasattr(usuarios, "items") else usuarios
+        linhas = [_linha(user) for _, user in itens]
+        linhas.extend(_linha(user) for user in kwargs.values())
+        with self._trava:
+            self._conexao.executemany(_SQL_GRAVAR, linhas)
+            self._contar_escritas(len(linhas))
+
+    def __len__(self) -> int:
+        return self._consultar_um(_SQL_CONTAR)[0]
+
+    def __iter__(self) -> Iterator:
+        return (linha[0] for linha in self._percorrer_linhas(_SQL_IDS))
+
+    def _percorrer(self) -> Iterator[User]:
+        return map(_usuario, self._percorrer_linhas(_SQL_TODOS))
+
+    def percorrer_desde(self, posicao: int) -> Iterator[Tuple[int, User]]:
+        """(seq, User) dos usuários com seq >= posicao, em ordem (o cursor de paginarUsuarios)."""
+        return ((linha[0], _usuario(linha[1:])) for linha in self._percorrer_linhas(_SQL_DESDE, (posicao,)))
+
+    def values(self) -> ValuesView:
+        return _Valores(self)
+
+    def items(self) -> ItemsView:
+        return _Itens(self)
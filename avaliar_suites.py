@@ -0,0 +1,210 @@
+"""Avaliação em paralelo das suítes de teste geradas pelos LLMs.
+
+Uso: python avaliar_suites.py PADRAO [PADRAO ...] -o resultados.jsonl [-j PROCESSOS] [--lote N] [--retomar]
+                              [--cache CAMINHO]
+
+As suítes são descobertas por glob (``**`` é recursivo) e analisadas em lotes
+por um pool de processos. Cada resultado é gravado numa linha de JSON assim que
+o seu lote termina, então o que já foi gravado sobrevive a uma queda do
+coordenador (``--retomar`` pula essas suítes) ou de um worker (o lote que
+estava nele é refeito num pool novo). Com ``--cache``, as suítes cujo conteúdo
+já foi analisado (pela mesma versão do analisador) nem chegam aos workers.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+from analisador_testes import analisar_codigo
+from cache_metricas import CacheMetricas, chave_conteudo, chaves_arquivos
+
+ERRO_WORKER = "o processo do worker terminou durante a análise"
+
+
+def descobrir_suites(padroes: Iterable[str]) -> List[str]:
+    """Arquivos que casam com algum dos padrões, sem repetição e em ordem."""
+    caminhos = set()
+    for padrao in padroes:
+        caminhos.update(c for c in glob.glob(padrao, recursive=True) if os.path.isfile(c))
+    return sorted(caminhos)
+
+
+def _para_json(metricas: dict) -> dict:
+    return {k: sorted(v) if isinstance(v, set) else v for k, v in metricas.items()}
+
+
+def _registro(caminho: str, metricas: Optional[dict], erro: Optional[str]) -> dict:
+    # Registro de uma suíte na saída: {"arquivo", "metricas"} ou {"arquivo", "erro"}.
+    if erro is not None:
+        return {"arquivo": caminho, "erro": erro}
+    return {"arquivo": caminho, "metricas": _para_json(metricas)}
+
+
+def _analisar_suite(caminho: str) -> tuple:
+    # (caminho, chave do conteúdo, métricas, erro); a chave é a do conteúdo analisado.
+    try:
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        return caminho, chave_conteudo(conteudo), analisar_codigo(conteudo.decode("utf-8")), None
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError, RecursionError) as e:
+        return caminho, None, None, f"{type(e).__name__}: {e}"
+
+
+def _analisar_lote(caminhos: List[str]) -> List[tuple]:
+    return [_analisar_suite(caminho) for caminho in caminhos]
+
+
+def carregar_resultados(caminho: str) -> Dict[str, dict]:
+    """Registros já gravados, por arquivo (a última linha vale). Ignora uma linha final truncada."""
+    resultados = {}
+    if not os.path.exists(caminho):
+        return resultados
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            resultados[registro["arquivo"]] = registro
+    return resultados
+
+
+def _lotes(caminhos: List[str], tamanho: int) -> List[List[str]]:
+    return [caminhos[i:i + tamanho] for i in range(0, len(caminhos), tamanho)]
+
+
+def _rodada(lotes: List[List[str]], processos: int, gravar) -> List[List[str]]:
+    """Processa os lotes num pool novo; devolve os que estavam nele quando um worker morreu."""
+    interrompidos = []
+    with ProcessPoolExecutor(processos) as pool:
+        em_andamento = {}
+        for i, lote in enumerate(lotes):
+            try:
+                em_andamento[pool.submit(_analisar_lote, lote)] = lote
+            except BrokenProcessPool:
+                interrompidos.extend(lotes[i:])
+                break
+        while em_andamento:
+            prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                lote = em_andamento.pop(futuro)
+                try:
+                    gravar(futuro.result())
+                except BrokenProcessPool:
+                    interrompidos.append(lote)
+    return interrompidos
+
+
+def _isolar(caminhos: List[str], gravar):
+    # Uma suíte por vez num worker só: se ele morrer, a culpada é conhecida.
+    pool = ProcessPoolExecutor(1)
+    try:
+        for caminho in caminhos:
+            try:
+                gravar(pool.submit(_analisar_lote, [caminho]).result())
+            except BrokenProcessPool:
+                gravar([(caminho, None, None, ERRO_WORKER)])
+                pool.shutdown()
+                pool = ProcessPoolExecutor(1)
+    finally:
+        pool.shutdown()
+
+
+def avaliar_suites(
+    caminhos: Iterable[str],
+    saida: str,
+    processos: Optional[int] = None,
+    tamanho_lote: Optional[int] = None,
+    retomar: bool = False,
+    cache: Optional[CacheMetricas] = None,
+) -> Dict[str, int]:
+    """Analisa as suítes num pool de processos e grava um registro JSON por linha em ``saida``.
+
+    Com retomar, as suítes que já estão em ``saida`` são puladas e os novos
+    registros são acrescentados ao fim. Quando um worker morre, o pool inteiro
+    quebra e não se sabe qual lote o derrubou: os lotes interrompidos são
+    refeitos uma vez num pool novo e, se quebrarem de novo, suas suítes rodam
+    uma a uma num worker isolado; a que derrubar esse worker é registrada com
+    ERRO_WORKER. Com um cache, as suítes já analisadas vêm dele e as novas
+    métricas são guardadas nele. Devolve as contagens {"analisadas", "erros",
+    "puladas", "do_cache"}.
+    """
+    caminhos = list(caminhos)
+    feitos = carregar_resultados(saida) if retomar else {}
+    pendentes = [c for c in caminhos if c not in feitos]
+    processos = processos or os.cpu_count() or 1
+    contagem = {"analisadas": 0, "erros": 0, "puladas": len(caminhos) - len(pendentes), "do_cache": 0}
+    acertos = {}
+    if cache is not None:
+        chaves = chaves_arquivos(pendentes)
+        encontradas = cache.obter_varios(c for c in chaves.values() if c is not None)
+        acertos = {caminho: encontradas[c] for caminho, c in chaves.items() if c in encontradas}
+        pendentes = [caminho for caminho in pendentes if caminho not in acertos]
+    if tamanho_lote is None:
+        # Lotes pequenos o bastante para equilibrar a carga (~4 por processo),
+        # grandes o bastante para diluir o custo de ida e volta ao worker.
+        tamanho_lote = max(1, min(64, len(pendentes) // (processos * 4)))
+
+    with open(saida, "a" if retomar else "w", encoding="utf-8") as arquivo:
+        def gravar(resultados: List[tuple]):
+            novos = []
+            for caminho, chave, metricas, erro in resultados:
+                arquivo.write(json.dumps(_registro(caminho, metricas, erro), ensure_ascii=False) + "\n")
+                contagem["erros" if erro is not None else "analisadas"] += 1
+                if metricas is not None:
+                    novos.append((chave, metricas))
+            arquivo.flush()
+            if cache is not None and novos:
+                cache.guardar_varios(novos)
+                cache.confirmar()
+
+        for caminho, metricas in acertos.items():
+            arquivo.write(json.dumps(_registro(caminho, metricas, None), ensure_ascii=False) + "\n")
+        arquivo.flush()
+        contagem["do_cache"] = len(acertos)
+
+        interrompidos = _rodada(_lotes(pendentes, tamanho_lote), processos, gravar)
+        if interrompidos:
+            interrompidos = _rodada(interrompidos, processos, gravar)
+        if interrompidos:
+            _isolar([caminho for lote in interrompidos for caminho in lote], gravar)
+    if cache is not None:
+        cache.confirmar()
+    return contagem
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Avalia suítes de teste geradas por LLMs, em paralelo.")
+    parser.add_argument("padroes", nargs="+", help="padrões glob das suítes (** é recursivo)")
+    parser.add_argument("-o", "--saida", default="resultados.jsonl", help="arquivo JSONL de saída")
+    parser.add_argument("-j", "--processos", type=int, default=None, help="processos (padrão: núcleos)")
+    parser.add_argument("--lote", type=int, default=None, help="suítes por lote enviado a um worker")
+    parser.add_argument("--retomar", action="store_true", help="pula as suítes que já estão na saída")
+    parser.add_argument("--cache", default=None, help="banco SQLite do cache de métricas por conteúdo")
+    args = parser.parse_args(argv)
+
+    caminhos = descobrir_suites(args.padroes)
+    if not caminhos:
+        print("nenhuma suíte encontrada", file=sys.stderr)
+        return 1
+    inicio = time.perf_counter()
+    cache = CacheMetricas(args.cache) if args.cache else None
+    try:
+        contagem = avaliar_suites(caminhos, args.saida, args.processos, args.lote, args.retomar, cache)
+    finally:
+        if cache is not None:
+            cache.fechar()
+    print(
+        f"{contagem['analisadas']} analisadas, {contagem['do_cache']} do cache, {contagem['erros']} com erro, "
+        f"{contagem['puladas']} puladas em {time.perf_counter() - inicio:.2f}s -> {args.saida}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
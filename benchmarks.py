@@ -0,0 +1,1014 @@
+"""Benchmarks de desempenho do sistema_alvo.
+
+Uso: python benchmarks.py [nome ...]   (sem argumentos, executa todos)
+"""
+import asyncio
+import gc
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import analisador_testes
+from analisador_testes import analisar_codigo
+from armazenamento_colunar import ArmazenamentoColunar
+from armazenamento_sqlite import ArmazenamentoSQLite
+from avaliar_suites import avaliar_suites
+from cache_metricas import CacheMetricas
+from executar_suites import executar_suites
+from cache_usuarios import UserServiceComCache
+from fluxo_alteracoes import FluxoAlteracoes
+from indice_idade import IndiceIdade
+from log_operacoes import recuperar_servico
+from snapshot import carregar_snapshot, salvar_snapshot
+from servico_async import AsyncUserService, BackendEmExecutor, BackendEmMemoria
+from servico_concorrente import UserServiceConcorrente
+from servico_particionado import UserServiceParticionado
+import sistema_alvo
+from sistema_alvo import (
+    GeradorSequencial,
+    GeradorUUID4,
+    GeradorUUID7,
+    User,
+    UserService,
+    ValidationError,
+    compilar_validador,
+    email_valido,
+    usuarios_para_dicts,
+    usuarios_para_jsonl,
+)
+
+
+def _payloads(n, prefixo="usuario"):
+    return [
+        {
+            "nome": f"Usuario {i}",
+            "email": f"{prefixo}{i}@example.com",
+            "idade": 18 + i % 60,
+            "ativo": i % 2 == 0,
+        }
+        for i in range(n)
+    ]
+
+
+def _cronometrar(funcao, repeticoes=3):
+    """Retorna o melhor tempo (em segundos) entre as repetições."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def bench_criacao_em_lote(n=100_000):
+    payloads = _payloads(n)
+
+    def um_a_um():
+        service = UserService()
+        for payload in payloads:
+            service.criarUsuario(payload)
+
+    def em_lote():
+        UserService().criarUsuariosEmLote(payloads)
+
+    t_um = _cronometrar(um_a_um)
+    t_lote = _cronometrar(em_lote)
+    print(f"criarUsuario (loop):   {t_um / n * 1e6:8.2f} us/usuario")
+    print(f"criarUsuariosEmLote:   {t_lote / n * 1e6:8.2f} us/usuario  ({t_um / t_lote:.1f}x)")
+
+
+def bench_busca_por_email(tamanhos=(1_000, 10_000, 100_000, 1_000_000), consultas=10_000):
+    for n in tamanhos:
+        service = UserService()
+        service.criarUsuariosEmLote(_payloads(n))
+        emails = [f"usuario{(i * 7919) % n}@example.com" for i in range(consultas)]
+
+        def indice():
+            for email in emails:
+                service.buscarUsuarioPorEmail(email)
+
+        def varredura():
+            for email in emails[:10]:
+                next((u for u in service._store.values() if u.email == email), None)
+
+        t_indice = _cronometrar(indice) / consultas
+        t_varredura = _cronometrar(varredura, repeticoes=1) / 10
+        print(f"n={n:>9}: indice {t_indice * 1e6:6.2f} us/busca | varredura {t_varredura * 1e6:10.1f} us/busca")
+
+
+@dataclass
+class _UserComDict:
+    # Layout anterior de User (dataclass sem __slots__), usado como referência.
+    id: str
+    nome: str
+    email: str
+    idade: int
+    ativo: bool = True
+
+
+def bench_memoria_por_usuario(n=200_000):
+    # As str de cada usuário são criadas dentro da medição (o armazenamento as
+    # mantém vivas), e os Users são montados sem validar: o cache LRU de
+    # email_valido não entra na conta de nenhum layout.
+    def campos(i):
+        return (f"{i:08x}-7d1c-4a2e-9b3f-{i:012x}", f"Usuario {i}", f"usuario{i}@example.com", 18 + i % 60, i % 2 == 0)
+
+    def colunar():
+        armazenamento = ArmazenamentoColunar()
+        armazenamento.update((c[0], sistema_alvo._usuario_validado(*c)) for c in map(campos, range(n)))
+        return armazenamento
+
+    def servico(armazenamento):
+        servico = UserService(armazenamento=armazenamento())
+        servico.criarUsuariosEmLote(
+            {"id": c[0], "nome": c[1], "email": c[2], "idade": c[3], "ativo": c[4]} for c in map(campos, range(n))
+        )
+        return servico
+
+    medicoes = (
+        ("dict de dataclass com __dict__", lambda: {c[0]: _UserComDict(*c) for c in map(campos, range(n))}),
+        ("dict de User (slots)", lambda: {c[0]: sistema_alvo._usuario_validado(*c) for c in map(campos, range(n))}),
+        ("ArmazenamentoColunar", colunar),
+        ("UserService (dict)", lambda: servico(lambda: None)),
+        ("UserService (colunar)", lambda: servico(ArmazenamentoColunar)),
+    )
+    for nome, montar in medicoes:
+        gc.collect()
+        email_valido.cache_clear()
+        tracemalloc.start()
+        resultado = montar()
+        atual, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{nome:<32} {atual / n:7.1f} bytes/usuario")
+        del resultado
+    print("(armazenamentos: id, nome e email incluídos; UserService: também índice de email e versões)")
+
+
+def bench_atualizacao_parcial(n=100_000):
+    service = UserService()
+    ids = [u.id for u in service.criarUsuariosEmLote(_payloads(n)).usuarios]
+
+    def como_antes():
+        # Caminho anterior: to_dict() + merge + User(**merged) revalidando tudo.
+        for i, uid in enumerate(ids):
+            merged = service._store[uid].to_dict()
+            merged.update({"ativo": i % 2 == 1, "id": uid})
+            service._store[uid] = User(**merged)
+
+    def atual():
+        for i, uid in enumerate(ids):
+            service.atualizarUsuario(uid, {"ativo": i % 2 == 1})
+
+    t_antes = _cronometrar(como_antes)
+    t_atual = _cronometrar(atual)
+    print(f"to_dict + User(**merged): {t_antes / n * 1e6:6.2f} us/atualizacao")
+    print(f"atualizarUsuario:         {t_atual / n * 1e6:6.2f} us/atualizacao  ({t_antes / t_atual:.1f}x)")
+
+
+def bench_serializacao(n=100_000):
+    usuarios = UserService().criarUsuariosEmLote(_payloads(n)).usuarios
+
+    t_asdict = _cronometrar(lambda: [asdict(u) for u in usuarios])
+    t_to_dict = _cronometrar(lambda: [u.to_dict() for u in usuarios])
+    t_dicts = _cronometrar(lambda: usuarios_para_dicts(usuarios))
+    t_json_asdict = _cronometrar(
+        lambda: "".join(json.dumps(asdict(u), ensure_ascii=False) + "\n" for u in usuarios).encode("utf-8")
+    )
+    t_jsonl = _cronometrar(lambda: usuarios_para_jsonl(usuarios))
+    print(f"asdict:                  {t_asdict / n * 1e6:6.2f} us/usuario")
+    print(f"User.to_dict:            {t_to_dict / n * 1e6:6.2f} us/usuario  ({t_asdict / t_to_dict:.1f}x)")
+    print(f"usuarios_para_dicts:     {t_dicts / n * 1e6:6.2f} us/usuario  ({t_asdict / t_dicts:.1f}x)")
+    print(f"json.dumps(asdict(u)):   {t_json_asdict / n * 1e6:6.2f} us/usuario")
+    print(f"usuarios_para_jsonl:     {t_jsonl / n * 1e6:6.2f} us/usuario  ({t_json_asdict / t_jsonl:.1f}x)")
+
+
+def _em_threads(n_threads, alvo):
+    threads = [threading.Thread(target=alvo, args=(t,)) for t in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def bench_concorrencia(n_threads=8, ids=2_000, ops_por_thread=20_000):
+    # Teste de estresse: todas as threads tentam criar os mesmos ids e emails.
+    # A regra 6 (id duplicado gera erro) e a unicidade de email devem valer sob corrida.
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for cls in (UserService, UserServiceConcorrente):
+            service = cls(email_unico=True)
+            sucessos = [0] * n_threads
+
+            def criar(t):
+                for i in range(ids):
+                    try:
+                        service.criarUsuario({"id": f"id-{i}", "nome": "Usuario", "email": f"u{i}@example.com", "idade": 30})
+                        sucessos[t] += 1
+                    except ValidationError:
+                        pass
+
+            _em_threads(n_threads, criar)
+            duplicados = sum(sucessos) - ids
+            print(f"estresse {cls.__name__:<24} criacoes aceitas alem do esperado: {duplicados}")
+            if cls is UserServiceConcorrente:
+                assert duplicados == 0 and len(service._store) == ids
+                assert all(len(v) == 1 for v in service._por_email._ids.values())
+    finally:
+        sys.setswitchinterval(intervalo)
+
+    # Vazão: mistura de leitura e escrita sobre ids independentes por thread.
+    for n in (1, 2, 4, 8):
+        service = UserServiceConcorrente()
+
+        def trabalho(t):
+            for i in range(ops_por_thread // n):
+                uid = f"t{t}-{i % 500}"
+                if service.buscarUsuario(uid) is None:
+                    service.criarUsuario({"id": uid, "nome": "Usuario", "email": f"{uid}@example.com", "idade": 30})
+                else:
+                    service.atualizarUsuario(uid, {"ativo": i % 2 == 0})
+
+        inicio = time.perf_counter()
+        _em_threads(n, trabalho)
+        decorrido = time.perf_counter() - inicio
+        print(f"vazao com {n} thread(s): {ops_por_thread / decorrido:10.0f} ops/s")
+
+
+class _BackendComLatencia(BackendEmMemoria):
+    # Simula um armazenamento assíncrono com 1 ms de I/O por leitura.
+    async def buscar(self, id):
+        await asyncio.sleep(0.001)
+        return await super().buscar(id)
+
+
+class _ServicoBloqueante(UserServiceConcorrente):
+    # Simula um armazenamento síncrono lento (1 ms bloqueando a thread por leitura).
+    def buscarUsuario(self, id):
+        time.sleep(0.001)
+        return super().buscarUsuario(id)
+
+
+def bench_async(requisicoes=2_000):
+    async def medir(service, concorrencia):
+        ids = [u.id for u in (await service.criarUsuariosEmLote(_payloads(100))).usuarios]
+        fila = [ids[i % len(ids)] for i in range(requisicoes)]
+
+        async def cliente(c):
+            for id in fila[c::concorrencia]:
+                await service.buscarUsuario(id)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(c) for c in range(concorrencia)))
+        return requisicoes / (time.perf_counter() - inicio)
+
+    with ThreadPoolExecutor(32) as executor:
+        for nome, fabrica in (
+            ("backend async (1 ms/leitura)", lambda: _BackendComLatencia()),
+            ("executor, 32 threads (1 ms bloqueante)", lambda: BackendEmExecutor(_ServicoBloqueante(), executor)),
+        ):
+            for concorrencia in (1, 10, 100):
+                vazao = asyncio.run(medir(AsyncUserService(fabrica()), concorrencia))
+                print(f"{nome:<40} concorrencia {concorrencia:>3}: {vazao:9.0f} req/s")
+
+
+def bench_armazenamento(n=20_000):
+    with tempfile.TemporaryDirectory() as pasta:
+        backends = (
+            ("dict (memoria)", lambda: None),
+            ("colunar (memoria)", ArmazenamentoColunar),
+            ("SQLite (WAL, arquivo)", lambda: ArmazenamentoSQLite(os.path.join(pasta, f"{time.time_ns()}.db"))),
+        )
+        for nome, fabrica in backends:
+            payloads = _payloads(n)
+            service = UserService(armazenamento=fabrica())
+
+            inicio = time.perf_counter()
+            ids = [service.criarUsuario(p).id for p in payloads]
+            t_criar = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            service.criarUsuariosEmLote(_payloads(n, prefixo="lote"))
+            t_lote = time.perf_counter() - inicio
+
+            t_buscar = _cronometrar(lambda: [service.buscarUsuario(id) for id in ids], 1)
+            t_email = _cronometrar(lambda: [service.buscarUsuarioPorEmail(p["email"]) for p in payloads], 1)
+            t_atualizar = _cronometrar(lambda: [service.atualizarUsuario(id, {"ativo": False}) for id in ids], 1)
+            t_excluir = _cronometrar(lambda: [service.excluirUsuario(id) for id in ids], 1)
+            if isinstance(service._store, ArmazenamentoSQLite):
+                service._store.fechar()
+
+            print(f"{nome}:")
+            for operacao, t in (
+                ("criarUsuario", t_criar), ("criarUsuariosEmLote", t_lote), ("buscarUsuario", t_buscar),
+                ("buscarUsuarioPorEmail", t_email), ("atualizarUsuario", t_atualizar), ("excluirUsuario", t_excluir),
+            ):
+                print(f"  {operacao:<22} {n / t:10.0f} ops/s")
+
+
+def bench_snapshot(n=200_000):
+    payloads = _payloads(n)
+
+    def replay():
+        service = UserService()
+        for payload in payloads:
+            service.criarUsuario(payload)
+        return service
+
+    inicio = time.perf_counter()
+    service = replay()
+    t_replay = time.perf_counter() - inicio
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "usuarios.snap")
+        inicio = time.perf_counter()
+        salvar_snapshot(service, caminho)
+        t_salvar = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho)
+
+        t_carregar = _cronometrar(lambda: carregar_snapshot(caminho))
+        primeiro = next(iter(service._store))
+        t_carregar_e_ler = _cronometrar(lambda: carregar_snapshot(caminho).buscarUsuario(primeiro))
+        t_materializar = _cronometrar(lambda: list(carregar_snapshot(caminho)._store.values()), 1)
+        t_nao_confiavel = _cronometrar(lambda: list(carregar_snapshot(caminho, confiavel=False)._store.values()), 1)
+
+    print(f"replay de criarUsuario:              {t_replay:7.3f} s")
+    print(f"salvar_snapshot:                     {t_salvar:7.3f} s  ({tamanho / n:.0f} bytes/usuario)")
+    print(f"carregar_snapshot:                   {t_carregar:7.3f} s  ({t_replay / t_carregar:.1f}x)")
+    print(f"carregar + primeira busca:           {t_carregar_e_ler:7.3f} s")
+    print(f"carregar + materializar tudo:        {t_materializar:7.3f} s")
+    print(f"idem, revalidando (confiavel=False): {t_nao_confiavel:7.3f} s")
+
+
+def bench_log_operacoes(n=5_000):
+    def carga(service):
+        inicio = time.perf_counter()
+        for i, payload in enumerate(_payloads(n)):
+            user = service.criarUsuario(payload)
+            if i % 2:
+                service.atualizarUsuario(user.id, {"ativo": False})
+        return 1.5 * n / (time.perf_counter() - inicio)
+
+    print(f"sem log:                    {carga(UserService()):9.0f} ops/s")
+    for tamanho_grupo in (1, 16, 128, 1024):
+        with tempfile.TemporaryDirectory() as pasta:
+            service, log = recuperar_servico(pasta, tamanho_grupo=tamanho_grupo, intervalo_fsync=60)
+            vazao = carga(service)
+            log.fechar()
+        print(f"fsync a cada {tamanho_grupo:>4} operacoes: {vazao:9.0f} ops/s")
+
+
+def bench_validacao(n=200_000):
+    registros = [(p["nome"], p["email"], p["idade"], p["ativo"]) for p in _payloads(n)]
+    validate_name = sistema_alvo._validate_name
+    validate_email = sistema_alvo._validate_email
+    validate_idade = sistema_alvo._validate_idade
+    validate_ativo = sistema_alvo._validate_ativo
+
+    def separados():
+        for nome, email, idade, ativo in registros:
+            validate_name(nome)
+            validate_email(email)
+            validate_idade(idade)
+            validate_ativo(ativo)
+
+    def compilado(coletar_todos):
+        validar = compilar_validador(coletar_todos=coletar_todos)
+
+        def executar():
+            for nome, email, idade, ativo in registros:
+                validar(nome, email, idade, ativo)
+
+        return executar
+
+    t_separados = _cronometrar(separados)
+    t_rapido = _cronometrar(compilado(False))
+    t_todos = _cronometrar(compilado(True))
+    print(f"_validate_* um a um:             {t_separados / n * 1e9:6.0f} ns/registro")
+    print(f"compilado (falha no primeiro):   {t_rapido / n * 1e9:6.0f} ns/registro  ({t_separados / t_rapido:.1f}x)")
+    print(f"compilado (coleta todos):        {t_todos / n * 1e9:6.0f} ns/registro  ({t_separados / t_todos:.1f}x)")
+
+
+def bench_validacao_vetorizada(n=200_000):
+    import numpy as np
+    from validacao_vetorizada import carregar_validos, validar_colunas
+
+    payloads = _payloads(n)
+    colunas = {
+        "nome": np.array([p["nome"] for p in payloads], dtype=object),
+        "email": np.array([p["email"] for p in payloads], dtype=object),
+        "idade": np.array([p["idade"] for p in payloads]),
+        "ativo": np.array([p["ativo"] for p in payloads]),
+    }
+
+    def por_linha():
+        for p in payloads:
+            try:
+                User(id=None, **p)
+            except ValidationError:
+                pass
+
+    def criar_um_a_um():
+        service = UserService()
+        for p in payloads:
+            service.criarUsuario(p)
+
+    t_linha = _cronometrar(por_linha)
+    t_colunas = _cronometrar(lambda: validar_colunas(colunas))
+    t_criar = _cronometrar(criar_um_a_um)
+    t_carga = _cronometrar(lambda: carregar_validos(UserService(), colunas))
+    print(f"User(**linha):          {t_linha / n * 1e6:6.2f} us/linha")
+    print(f"validar_colunas:        {t_colunas / n * 1e6:6.2f} us/linha  ({t_linha / t_colunas:.1f}x)")
+    print(f"criarUsuario (loop):    {t_criar / n * 1e6:6.2f} us/linha")
+    print(f"carregar_validos:       {t_carga / n * 1e6:6.2f} us/linha  ({t_criar / t_carga:.1f}x, validar + criar em lote)")
+
+
+def bench_email(distintos=50_000, consultas=500_000):
+    # Distribuição de cauda longa (Zipf) sobre um conjunto de emails, ~5% inválidos.
+    aleatorio = random.Random(42)
+    dominios = ["gmail.com", "hotmail.com", "empresa.com.br", "uol.com.br", "example.org"]
+    emails = []
+    for i in range(distintos):
+        email = f"usuario.{i}@{dominios[i % len(dominios)]}"
+        sorteio = aleatorio.random()
+        if sorteio < 0.02:
+            email = email.replace("@", "")
+        elif sorteio < 0.04:
+            email = email.replace(".", " ", 1)
+        elif sorteio < 0.05:
+            email = email.split("@")[0] + "@localhost"
+        emails.append(email)
+    pesos = [1 / (i + 1) ** 1.1 for i in range(distintos)]
+    amostra = aleatorio.choices(emails, weights=pesos, k=consultas)
+
+    regex = sistema_alvo.EMAIL_RE.match
+    assert all(email_valido(e) == (regex(e) is not None) for e in emails)
+
+    def so_regex():
+        for email in amostra:
+            regex(email)
+
+    def com_cache():
+        email_valido.cache_clear()
+        for email in amostra:
+            email_valido(email)
+
+    t_regex = _cronometrar(so_regex)
+    t_cache = _cronometrar(com_cache)
+    info = email_valido.cache_info()
+    print(f"EMAIL_RE.match:         {t_regex / consultas * 1e9:6.0f} ns/email")
+    print(f"email_valido (cache):   {t_cache / consultas * 1e9:6.0f} ns/email  ({t_regex / t_cache:.1f}x, "
+          f"acertos {info.hits / (info.hits + info.misses):.0%})")
+
+
+def bench_ids(n=200_000, n_sqlite=100_000):
+    geradores = (
+        ("str(uuid.uuid4())", None),
+        ("GeradorUUID4", GeradorUUID4),
+        ("GeradorUUID7", GeradorUUID7),
+        ("GeradorSequencial", GeradorSequencial),
+    )
+    for nome, classe in geradores:
+        if classe is None:
+            um = lambda: str(uuid.uuid4())
+            lote = lambda k: [str(uuid.uuid4()) for _ in range(k)]
+        else:
+            gerador = classe()
+            um, lote = gerador, gerador.gerar_lote
+        t_um = _cronometrar(lambda: [um() for _ in range(n)])
+        t_lote = _cronometrar(lambda: lote(n))
+        ids = lote(n)
+        bytes_por_id = sum(map(sys.getsizeof, ids)) / n
+        print(f"{nome:<18} um a um {t_um / n * 1e9:5.0f} ns/id  gerar_lote {t_lote / n * 1e9:5.0f} ns/id  "
+              f"{bytes_por_id:4.0f} bytes/id")
+
+    # Localidade: ids crescentes entram sempre no fim do índice UNIQUE do SQLite.
+    payloads = _payloads(n_sqlite)
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, classe in (("GeradorUUID4", GeradorUUID4), ("GeradorUUID7", GeradorUUID7)):
+            armazenamento = ArmazenamentoSQLite(os.path.join(pasta, f"{nome}.db"))
+            service = UserService(armazenamento=armazenamento, gerador_id=classe())
+            inicio = time.perf_counter()
+            for i in range(0, n_sqlite, 1000):
+                service.criarUsuariosEmLote(payloads[i:i + 1000])
+            armazenamento.fechar()
+            print(f"SQLite, {nome:<13} {n_sqlite / (time.perf_counter() - inicio):8.0f} usuarios/s (lotes de 1000)")
+
+
+def bench_particionado(n=200_000, tamanho_lote=10_000, consultas=20_000):
+    print(f"(os.cpu_count() = {os.cpu_count()})")
+    payloads = _payloads(n)
+    lotes = [payloads[i:i + tamanho_lote] for i in range(0, n, tamanho_lote)]
+
+    def medir(service, threads):
+        inicio = time.perf_counter()
+        ids = [u.id for lote in lotes for u in service.criarUsuariosEmLote(lote).usuarios]
+        t_criar = time.perf_counter() - inicio
+        amostra = ids[::max(1, n // consultas)]
+        buscar_lote = getattr(service, "buscarUsuariosEmLote", lambda ids: [service.buscarUsuario(id) for id in ids])
+        t_lote = _cronometrar(lambda: buscar_lote(ids), 1)
+        t_busca = _cronometrar(lambda: _em_threads(threads, lambda _: [service.buscarUsuario(id) for id in amostra]), 1)
+        return n / t_criar, n / t_lote, threads * len(amostra) / t_busca
+
+    print(f"{'':<22}{'criar (lote)':>14}{'buscar (lote)':>15}{'buscarUsuario':>15}  ops/s")
+    print(f"{'UserService':<22}" + "".join(f"{v:15.0f}" for v in medir(UserService(), 1)))
+    for particoes in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with UserServiceParticionado(particoes) as service:
+            valores = medir(service, particoes)
+        print(f"{f'{particoes} particoes':<22}" + "".join(f"{v:15.0f}" for v in valores))
+
+
+def bench_consulta(n=500_000):
+    service = UserService()
+    service.criarUsuariosEmLote(_payloads(n))
+
+    def copiando():
+        usuarios = list(service._store.values())
+        return [{"id": u.id, "email": u.email} for u in usuarios if u.ativo and 30 <= u.idade <= 40]
+
+    def streaming():
+        consulta = service.consultarUsuarios(ativo=True, idade_min=30, idade_max=40, campos=("id", "email"))
+        return sum(1 for _ in consulta)
+
+    for nome, funcao in (("copia + list comprehension", copiando), ("consultarUsuarios", streaming)):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        funcao()
+        t = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{nome:<28} {t * 1e3:8.1f} ms  pico {pico / 2**20:7.2f} MiB")
+
+    t_primeiros = _cronometrar(lambda: list(service.consultarUsuarios(ativo=True, idade_min=30, limite=100)))
+    print(f"primeiros 100 (limite):      {t_primeiros * 1e3:8.3f} ms")
+    # Varredura completa por páginas: com o cursor por posição, as últimas páginas
+    # custam o mesmo que as primeiras (antes, cada uma reencontrava o cursor do início).
+    inicio = time.perf_counter()
+    service.paginarUsuarios(1000)
+    print(f"primeira pagina (monta o indice de posicoes): {(time.perf_counter() - inicio) * 1e3:8.2f} ms")
+    tempos, cursor = [], None
+    inicio = time.perf_counter()
+    while True:
+        t = time.perf_counter()
+        pagina = service.paginarUsuarios(1000, cursor, ativo=True)
+        tempos.append(time.perf_counter() - t)
+        cursor = pagina.cursor
+        if cursor is None:
+            break
+    total = time.perf_counter() - inicio
+    print(f"paginarUsuarios (1000/pag):  {len(tempos)} paginas em {total * 1e3:8.1f} ms | "
+          f"10 primeiras {sum(tempos[:10]) / 10 * 1e3:6.2f} ms/pag, 10 ultimas {sum(tempos[-10:]) / 10 * 1e3:6.2f} ms/pag")
+
+
+def bench_indice_idade(n=500_000, consultas=1_000):
+    payloads = _payloads(n)
+    faixas = [18, 25, 35, 45, 55, 65]
+
+    service = UserService()
+    t_sem = _cronometrar(lambda: [service.criarUsuario(p) for p in payloads[:50_000]], 1)
+    service = UserService()
+    indice = IndiceIdade(service)
+    t_com = _cronometrar(lambda: [service.criarUsuario(p) for p in payloads[:50_000]], 1)
+    print(f"criarUsuario sem/com indice:  {t_sem / 50_000 * 1e6:6.2f} / {t_com / 50_000 * 1e6:6.2f} us/usuario")
+
+    service.criarUsuariosEmLote(payloads[50_000:])
+
+    def varredura():
+        contagens = [0] * len(faixas)
+        for user in service._store.values():
+            if user.ativo:
+                for i in range(len(faixas) - 1, -1, -1):
+                    if user.idade >= faixas[i]:
+                        contagens[i] += 1
+                        break
+        return contagens
+
+    assert varredura() == indice.contar_por_faixa(faixas, ativo=True)
+    t_varredura = _cronometrar(varredura, 1)
+    t_indice = _cronometrar(lambda: [indice.contar_por_faixa(faixas, ativo=True) for _ in range(consultas)]) / consultas
+    print(f"ativos por faixa, varredura:  {t_varredura * 1e3:10.3f} ms")
+    print(f"ativos por faixa, indice:     {t_indice * 1e3:10.3f} ms  ({t_varredura / t_indice:.0f}x)")
+
+    t_scan = _cronometrar(lambda: [u for u in service._store.values() if 30 <= u.idade <= 31], 1)
+    t_faixa = _cronometrar(lambda: list(indice.usuarios(30, 31)), 1)
+    print(f"usuarios 30-31, varredura:    {t_scan * 1e3:10.3f} ms")
+    print(f"usuarios 30-31, indice:       {t_faixa * 1e3:10.3f} ms  ({t_scan / t_faixa:.1f}x)")
+
+
+def bench_fluxo_alteracoes(n=100_000, repeticoes=5):
+    payloads = _payloads(n)
+    operacoes = 3 * n
+
+    def mutacoes(service, a_cada=None):
+        # a_cada: chamada a cada 1000 mutações (leitura no mesmo thread).
+        for inicio in range(0, n, 1000):
+            ids = [service.criarUsuario(p).id for p in payloads[inicio:inicio + 1000]]
+            if a_cada:
+                a_cada()
+            for id in ids:
+                service.atualizarUsuario(id, {"idade": 40})
+            if a_cada:
+                a_cada()
+            for id in ids:
+                service.excluirUsuario(id)
+            if a_cada:
+                a_cada()
+
+    def medir(preparar):
+        service = UserService()
+        a_cada, encerrar = preparar(service)
+        # Nem o lixo nem o cache de emails (cheio e despejando, depois da
+        # primeira variante) da variante anterior entram na conta desta.
+        email_valido.cache_clear()
+        gc.collect()
+        inicio = time.perf_counter()
+        mutacoes(service, a_cada)
+        encerrar()
+        return time.perf_counter() - inicio
+
+    def sem_fluxo(service):
+        return None, lambda: None
+
+    def sem_assinantes(service):
+        FluxoAlteracoes(service)
+        return None, lambda: None
+
+    def mesmo_thread(service):
+        assinatura = FluxoAlteracoes(service).assinar()
+
+        def drenar():
+            while assinatura.receber(4096, tempo_limite=0):
+                pass
+        return drenar, lambda: None
+
+    def leitor_concorrente(service):
+        assinatura = FluxoAlteracoes(service).assinar()
+
+        def ler():
+            lidos = 0
+            while lidos < operacoes:
+                lidos += len(assinatura.receber(1024))
+
+        leitor = threading.Thread(target=ler)
+        leitor.start()
+        return None, leitor.join
+
+    # As variantes se alternam a cada repetição, para que a variação da máquina
+    # ao longo do tempo não pese mais sobre uma do que sobre outra.
+    variantes = {
+        "sem fluxo": sem_fluxo,
+        "fluxo sem assinantes": sem_assinantes,
+        "1 assinante, lido no mesmo thread": mesmo_thread,
+        "1 assinante, leitor em outra thread": leitor_concorrente,
+    }
+    tempos = dict.fromkeys(variantes, float("inf"))
+    for _ in range(repeticoes):
+        for nome, preparar in variantes.items():
+            tempos[nome] = min(tempos[nome], medir(preparar))
+    t_base = tempos["sem fluxo"]
+    for nome, t in tempos.items():
+        variacao = "" if nome == "sem fluxo" else f"  ({(t / t_base - 1) * 100:+5.1f}%)"
+        print(f"{nome + ':':<40}{t / operacoes * 1e6:6.2f} us/mutacao{variacao}")
+
+    # Só a publicação de um evento (o que a mutação paga), contra um observador vazio,
+    # no buffer padrão; a leitura entre os blocos fica fora da medição.
+    fluxo = FluxoAlteracoes(UserService())
+    assinatura = fluxo.assinar()
+    publicar = fluxo._registrar
+    bloco = fluxo.capacidade // 2
+
+    def vazio(operacao, antes, depois):
+        pass
+
+    def medir_publicacao(observador):
+        total = 0.0
+        for _ in range(n // bloco):
+            inicio = time.perf_counter()
+            for _ in range(bloco):
+                observador("criar", None, None)
+            total += time.perf_counter() - inicio
+            while assinatura.receber(bloco, tempo_limite=0):
+                pass
+        return total
+
+    t_vazio = min(medir_publicacao(vazio) for _ in range(repeticoes))
+    t_publicar = min(medir_publicacao(publicar) for _ in range(repeticoes))
+    por_evento = (t_publicar - t_vazio) / (n // bloco * bloco)
+    print(f"{'publicar evento (caminho quente):':<40}{por_evento * 1e6:6.2f} us/evento "
+          f"({por_evento / (t_base / operacoes) * 100:.1f}% de uma mutação)")
+
+
+class _ArmazenamentoLento(dict):
+    """dict com latência fixa de leitura, simulando um backend remoto."""
+
+    def __init__(self, latencia):
+        super().__init__()
+        self.latencia = latencia
+        self.leituras = 0
+
+    def get(self, id, default=None):
+        self.leituras += 1
+        time.sleep(self.latencia)
+        return super().get(id, default)
+
+
+def bench_cache(n=50_000, consultas=200_000, quentes=1_000):
+    # 95% das buscas vão para um conjunto quente de ids; 1% são ids inexistentes.
+    aleatorio = random.Random(7)
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoSQLite(os.path.join(pasta, "cache.db"))
+        service = UserService(armazenamento=armazenamento)
+        ids = [u.id for u in service.criarUsuariosEmLote(_payloads(n)).usuarios]
+        armazenamento.confirmar()
+        amostra = [
+            aleatorio.choice(ids[:quentes]) if r < 0.95 else (aleatorio.choice(ids) if r < 0.99 else f"ausente-{r}")
+            for r in (aleatorio.random() for _ in range(consultas))
+        ]
+        cache = UserServiceComCache(service, tamanho=5_000)
+        t_sem = _cronometrar(lambda: [service.buscarUsuario(id) for id in amostra], 1)
+        t_com = _cronometrar(lambda: [cache.buscarUsuario(id) for id in amostra], 1)
+        armazenamento.fechar()
+    e = cache.estatisticas
+    print(f"SQLite, sem cache:   {t_sem / consultas * 1e6:7.2f} us/busca")
+    print(f"SQLite, com cache:   {t_com / consultas * 1e6:7.2f} us/busca  ({t_sem / t_com:.1f}x)  "
+          f"acertos {e.taxa_acertos:.1%}, despejos {e.despejos}")
+
+    # Estouro de buscas pelo mesmo id ausente: uma única leitura no backend.
+    lento = _ArmazenamentoLento(latencia=0.01)
+    cache = UserServiceComCache(UserService(armazenamento=lento))
+    _em_threads(32, lambda _: cache.buscarUsuario("nao-existe"))
+    print(f"32 threads, mesmo id ausente: {lento.leituras} leitura(s) no backend")
+
+
+def bench_versoes(n_threads=8, usuarios=16, ops_por_thread=500, latencia=0.0002):
+    # Leitura-modificação-escrita com uma pausa (latencia) entre ler e gravar,
+    # simulando o processamento do chamador (ex.: uma chamada remota).
+    total = n_threads * ops_por_thread
+
+    def preparar(service):
+        return [service.criarUsuario(p).id for p in _payloads(usuarios)]
+
+    def sorteio(t):
+        # Sequência de ids por thread, igual entre as variantes.
+        aleatorio = random.Random(t)
+        return [aleatorio.randrange(usuarios) for _ in range(ops_por_thread)]
+
+    def incrementar(user):
+        time.sleep(latencia)
+        return {"idade": user.idade + 1}
+
+    def trava_global():
+        service = UserService()
+        ids = preparar(service)
+        trava = threading.Lock()
+
+        def alvo(t):
+            for i in sorteio(t):
+                id = ids[i]
+                with trava:
+                    service.atualizarUsuario(id, incrementar(service.buscarUsuario(id)))
+        return service, ids, alvo
+
+    def compare_and_set():
+        service = UserServiceConcorrente()
+        ids = preparar(service)
+
+        def alvo(t):
+            for i in sorteio(t):
+                service.atualizarUsuarioComRetentativa(ids[i], incrementar, tentativas=1000)
+        return service, ids, alvo
+
+    def sem_controle():
+        service = UserServiceConcorrente()
+        ids = preparar(service)
+
+        def alvo(t):
+            for i in sorteio(t):
+                id = ids[i]
+                service.atualizarUsuario(id, incrementar(service.buscarUsuario(id)))
+        return service, ids, alvo
+
+    for nome, montar in (
+        ("trava global externa", trava_global),
+        ("compare-and-set (versao)", compare_and_set),
+        ("sem controle (ultimo vence)", sem_controle),
+    ):
+        service, ids, alvo = montar()
+        inicial = sum(service.buscarUsuario(id).idade for id in ids)
+        inicio = time.perf_counter()
+        _em_threads(n_threads, alvo)
+        t = time.perf_counter() - inicio
+        perdidas = total - (sum(service.buscarUsuario(id).idade for id in ids) - inicial)
+        print(f"{nome:<28} {total / t:8.0f} atualizacoes/s  perdidas: {perdidas}")
+
+
+SUITES = (
+    "Claude_Sonnet_4_5.py",
+    "DeepSeek-V3.py",
+    "Copilot_Smart _(GPT\u20115).py",
+    "Gemini_1_5_Flash.py",
+    "GPT-4o_mini.py",
+)
+
+
+def _analisar_com_regex(conteudo):
+    # As três varreduras por regex que o notebook fazia antes de analisador_testes.
+    testes = re.findall(r'def (test_[^(]+)\([^)]*\):', conteudo)
+    asserts = re.findall(r'assert ', conteudo)
+    comentarios = re.findall(r'""".*?"""|\'\'\'.*?\'\'\'|#.*?$', conteudo, re.MULTILINE | re.DOTALL)
+    return len(testes), len(asserts), len(comentarios)
+
+
+def bench_analisador(copias=400):
+    # Corpus: as suítes do repositório repetidas, como milhares de suítes geradas.
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    suites = []
+    for nome in SUITES:
+        with open(os.path.join(pasta, nome), encoding="utf-8") as f:
+            suites.append(f.read())
+    corpus = suites * copias
+
+    variantes = (
+        ("regex (notebook)", _analisar_com_regex),
+        ("analisador", analisar_codigo),
+        ("só ast", analisador_testes._analisar_com_ast),
+    )
+    for nome, analisar in variantes:
+        inicio = time.perf_counter()
+        for conteudo in corpus:
+            analisar(conteudo)
+        t = time.perf_counter() - inicio
+        print(f"{nome:<18} {len(corpus)} suites em {t:6.2f}s  ({len(corpus) / t:7.0f} suites/s)")
+
+
+def bench_avaliacao_paralela(copias=400, max_processos=None):
+    # Escalonamento de avaliar_suites de 1 a N processos sobre um corpus em disco.
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    max_processos = max_processos or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = []
+        for nome in SUITES:
+            with open(os.path.join(pasta, nome), encoding="utf-8") as f:
+                conteudo = f.read()
+            for i in range(copias):
+                caminho = os.path.join(tmp, f"{len(caminhos)}.py")
+                with open(caminho, "w", encoding="utf-8") as f:
+                    f.write(conteudo)
+                caminhos.append(caminho)
+        saida = os.path.join(tmp, "resultados.jsonl")
+
+        base = None
+        for processos in range(1, max_processos + 1):
+            inicio = time.perf_counter()
+            avaliar_suites(caminhos, saida, processos=processos)
+            t = time.perf_counter() - inicio
+            base = base or t
+            print(f"{processos:>2} processo(s)  {len(caminhos)} suites em {t:6.2f}s  "
+                  f"({len(caminhos) / t:6.0f} suites/s, {base / t:4.2f}x)")
+
+
+def bench_cache_metricas(suites=10_000, alteradas=100):
+    # Reavaliação incremental: corpus de suítes distintas, depois sem mudanças,
+    # depois com ``alteradas`` suítes editadas.
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    modelos = []
+    for nome in SUITES:
+        with open(os.path.join(pasta, nome), encoding="utf-8") as f:
+            modelos.append(f.read())
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = []
+        for i in range(suites):
+            caminho = os.path.join(tmp, f"{i}.py")
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(f"{modelos[i % len(modelos)]}\n# suite {i}\n")
+            caminhos.append(caminho)
+        saida = os.path.join(tmp, "resultados.jsonl")
+
+        with CacheMetricas(os.path.join(tmp, "cache.sqlite")) as cache:
+            for rodada in ("fria", "sem mudancas", f"{alteradas} alteradas"):
+                if rodada.endswith("alteradas"):
+                    for caminho in random.Random(0).sample(caminhos, alteradas):
+                        with open(caminho, "a", encoding="utf-8") as f:
+                            f.write("# editada\n")
+                inicio = time.perf_counter()
+                contagem = avaliar_suites(caminhos, saida, cache=cache)
+                t = time.perf_counter() - inicio
+                print(f"{rodada:<16} {t:7.2f}s  analisadas: {contagem['analisadas']:>6}  "
+                      f"do cache: {contagem['do_cache']:>6}")
+            print(f"cache: {len(cache)} entradas, {cache.tamanho / 1e6:.1f} MB")
+
+
+def _pontuacao_notebook(metricas, resultados, pesos):
+    # O algoritmo de calcular_pontuacao_final: os máximos são refeitos a cada suíte.
+    validos = [m for m in resultados if m is not None]
+    pontuacao = 0
+    for nome, peso in pesos.items():
+        maximo = max(m[nome] for m in validos)
+        if maximo > 0:
+            pontuacao += peso * (metricas[nome] / maximo)
+    return pontuacao * 100
+
+
+def bench_pontuacao(suites=100_000, configuracoes=1_000, suites_notebook=2_000):
+    import numpy as np
+    from pontuacao import METRICAS, PESOS_PADRAO, matriz_metricas, pontuar
+
+    aleatorio = np.random.default_rng(0)
+    valores = aleatorio.integers(0, 60, size=(suites, len(METRICAS))).tolist()
+    resultados = [dict(zip(METRICAS, linha)) for linha in valores]
+
+    amostra = resultados[:suites_notebook]
+    inicio = time.perf_counter()
+    for m in amostra:
+        _pontuacao_notebook(m, amostra, PESOS_PADRAO)
+    t = time.perf_counter() - inicio
+    estimado = t * (suites / suites_notebook) ** 2
+    print(f"notebook (O(n^2))        {suites_notebook} suites em {t:7.3f}s  (~{estimado / 3600:.0f} h para {suites})")
+
+    inicio = time.perf_counter()
+    matriz = matriz_metricas(resultados)
+    print(f"matriz_metricas          {suites} suites em {time.perf_counter() - inicio:7.3f}s")
+
+    inicio = time.perf_counter()
+    pontuar(matriz)
+    print(f"pontuar (1 configuracao) {suites} suites em {time.perf_counter() - inicio:7.3f}s")
+
+    pesos = aleatorio.dirichlet(np.ones(len(METRICAS)), size=configuracoes)
+    inicio = time.perf_counter()
+    lideres = set()
+    for bloco in range(0, configuracoes, 100):  # blocos de 100 x suites (80 MB)
+        lideres.update(pontuar(matriz, pesos[bloco:bloco + 100]).argmax(axis=1).tolist())
+    t = time.perf_counter() - inicio
+    print(f"pontuar em lote          {configuracoes} configuracoes x {suites} suites em {t:7.3f}s  "
+          f"(suites que lideram alguma: {len(lideres)})")
+
+
+def bench_execucao(copias=4, max_processos=None):
+    # Execução real das suítes (um processo por suíte), de 1 a N processos, com e sem cobertura.
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    max_processos = max_processos or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = []
+        for nome in SUITES:
+            with open(os.path.join(pasta, nome), encoding="utf-8") as f:
+                conteudo = f.read()
+            for i in range(copias):
+                caminho = os.path.join(tmp, f"suite_{len(caminhos)}.py")
+                with open(caminho, "w", encoding="utf-8") as f:
+                    f.write(conteudo)
+                caminhos.append(caminho)
+
+        for cobertura in (False, True):
+            for processos in range(1, max_processos + 1):
+                inicio = time.perf_counter()
+                resultados = executar_suites(caminhos, processos=processos, cobertura=cobertura)
+                t = time.perf_counter() - inicio
+                testes = sum(r["testes_executados"] for r in resultados)
+                aviso = "sem pacote coverage" if cobertura and resultados[0]["cobertura"] is None else ""
+                print(f"cobertura={cobertura!s:<5} {processos:>2} processo(s)  {len(caminhos)} suites "
+                      f"({testes} testes) em {t:6.2f}s  {aviso}")
+
+
+BENCHMARKS = {
+    "criacao_em_lote": bench_criacao_em_lote,
+    "busca_por_email": bench_busca_por_email,
+    "memoria_por_usuario": bench_memoria_por_usuario,
+    "atualizacao_parcial": bench_atualizacao_parcial,
+    "serializacao": bench_serializacao,
+    "concorrencia": bench_concorrencia,
+    "async": bench_async,
+    "armazenamento": bench_armazenamento,
+    "snapshot": bench_snapshot,
+    "log_operacoes": bench_log_operacoes,
+    "validacao": bench_validacao,
+    "validacao_vetorizada": bench_validacao_vetorizada,
+    "email": bench_email,
+    "ids": bench_ids,
+    "particionado": bench_particionado,
+    "consulta": bench_consulta,
+    "indice_idade": bench_indice_idade,
+    "fluxo_alteracoes": bench_fluxo_alteracoes,
+    "cache": bench_cache,
+    "versoes": bench_versoes,
+    "analisador": bench_analisador,
+    "avaliacao_paralela": bench_avaliacao_paralela,
+    "cache_metricas": bench_cache_metricas,
+    "pontuacao": bench_pontuacao,
+    "execucao": bench_execucao,
+}
+
+
+if __name__ == "__main__":
+    nomes = sys.argv[1:] or list(BENCHMARKS)
+    for nome in nomes:
+        print(f"== {nome} ==")
+        BENCHMARKS[nome]()
@@ -0,0 +1,159 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+from analisador_testes import VERSAO_ANALISADOR, analisar_codigo
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS metricas (
+    chave BLOB PRIMARY KEY,
+    versao INTEGER NOT NULL,
+    valor BLOB NOT NULL,
+    usado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metricas_uso ON metricas (usado_em);
+"""
+
+# chave: hash do conteúdo da suíte; valor: pickle das métricas de analisar_codigo
+# (o pickle preserva os sets). usado_em ordena o despejo (LRU).
+_SQL_INVALIDAR = "DELETE FROM metricas WHERE versao != ?"
+_SQL_TAMANHO = "SELECT COALESCE(SUM(LENGTH(valor) + LENGTH(chave)), 0) FROM metricas"
+_SQL_GRAVAR = "INSERT OR REPLACE INTO metricas (chave, versao, valor, usado_em) VALUES (?, ?, ?, ?)"
+_SQL_USAR = "UPDATE metricas SET usado_em = ? WHERE chave = ?"
+_SQL_MAIS_ANTIGOS = "SELECT chave, LENGTH(valor) + LENGTH(chave) FROM metricas ORDER BY usado_em"
+_SQL_EXCLUIR = "DELETE FROM metricas WHERE chave = ?"
+_SQL_CONTAR = "SELECT COUNT(*) FROM metricas"
+
+# Limite de parâmetros por consulta do SQLite (999 nas versões antigas).
+_BLOCO_CONSULTA = 900
+
+
+def chave_conteudo(conteudo: bytes) -> bytes:
+    """Hash do conteúdo de uma suíte (BLAKE2b de 128 bits)."""
+    return hashlib.blake2b(conteudo, digest_size=16).digest()
+
+
+class CacheMetricas:
+    """Cache persistente (SQLite) das métricas por suíte, pelo hash do conteúdo.
+
+    Suítes com o mesmo conteúdo não são analisadas de novo, mesmo que tenham
+    mudado de nome ou de lugar. Ao abrir, as entradas de outra
+    VERSAO_ANALISADOR são descartadas. Quando o valor guardado passa de
+    ``tamanho_max`` bytes, as entradas usadas há mais tempo são despejadas.
+    As escritas ficam numa transação até confirmar() ou fechar().
+    """
+
+    def __init__(self, caminho: str = ":memory:", tamanho_max: int = 256 * 1024 * 1024):
+        self._conexao = sqlite3.connect(caminho)
+        self._conexao.execute("PRAGMA journal_mode = WAL")
+        self._conexao.execute("PRAGMA synchronous = NORMAL")
+        self._conexao.executescript(_ESQUEMA)
+        self._conexao.execute(_SQL_INVALIDAR, (VERSAO_ANALISADOR,))
+        self._conexao.commit()
+        self.tamanho_max = tamanho_max
+        self._tamanho = self._conexao.execute(_SQL_TAMANHO).fetchone()[0]
+        self._usadas: Dict[bytes, float] = {}  # acertos ainda não gravados em usado_em
+
+    def __len__(self) -> int:
+        return self._conexao.execute(_SQL_CONTAR).fetchone()[0]
+
+    @property
+    def tamanho(self) -> int:
+        """Bytes ocupados pelas entradas (chaves e valores)."""
+        return self._tamanho
+
+    def obter_varios(self, chaves: Iterable[bytes]) -> Dict[bytes, dict]:
+        """Métricas das chaves que estão no cache."""
+        chaves = list(dict.fromkeys(chaves))
+        encontradas = {}
+        for i in range(0, len(chaves), _BLOCO_CONSULTA):
+            bloco = chaves[i:i + _BLOCO_CONSULTA]
+            sql = f"SELECT chave, valor FROM metricas WHERE chave IN ({','.join('?' * len(bloco))})"
+            for chave, valor in self._conexao.execute(sql, bloco):
+                encontradas[chave] = pickle.loads(valor)
+        agora = time.time()
+        self._usadas.update(dict.fromkeys(encontradas, agora))
+        return encontradas
+
+    def obter(self, chave: bytes) -> Optional[dict]:
+        return self.obter_varios([chave]).get(chave)
+
+    def guardar(self, chave: bytes, metricas: dict):
+        self.guardar_varios([(chave, metricas)])
+
+    def guardar_varios(self, itens: Iterable[tuple]):
+        """Guarda pares (chave, métricas) e despeja o excedente."""
+        agora = time.time()
+        linhas = [
+            (chave, VERSAO_ANALISADOR, pickle.dumps(metricas, protocol=pickle.HIGHEST_PROTOCOL), agora)
+            for chave, metricas in itens
+        ]
+        # Uma chave regravada ainda conta o valor antigo; o recálculo em
+        # _despejar corrige o total antes de despejar qualquer coisa.
+        self._conexao.executemany(_SQL_GRAVAR, linhas)
+        self._tamanho += sum(len(linha[0]) + len(linha[2]) for linha in linhas)
+        if self._tamanho > self.tamanho_max:
+            self._despejar()
+
+    def _despejar(self):
+        self._gravar_usos()
+        self._tamanho = self._conexao.execute(_SQL_TAMANHO).fetchone()[0]
+        excesso = self._tamanho - self.tamanho_max
+        if excesso <= 0:
+            return
+        despejadas = []
+        for chave, tamanho in self._conexao.execute(_SQL_MAIS_ANTIGOS):
+            despejadas.append((chave,))
+            excesso -= tamanho
+            self._tamanho -= tamanho
+            if excesso <= 0:
+                break
+        self._conexao.executemany(_SQL_EXCLUIR, despejadas)
+
+    def _gravar_usos(self):
+        if self._usadas:
+            self._conexao.executemany(_SQL_USAR, [(t, chave) for chave, t in self._usadas.items()])
+            self._usadas.clear()
+
+    def analisar_arquivo(self, caminho_arquivo: str) -> Optional[dict]:
+        """Como analisador_testes.analisar_arquivo_testes, consultando o cache antes."""
+        try:
+            with open(caminho_arquivo, "rb") as f:
+                conteudo = f.read()
+            chave = chave_conteudo(conteudo)
+            metricas = self.obter(chave)
+            if metricas is None:
+                metricas = analisar_codigo(conteudo.decode("utf-8"))
+                self.guardar(chave, metricas)
+            return metricas
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+            print(f"Erro ao analisar {caminho_arquivo}: {e}")
+            return None
+
+    def confirmar(self):
+        self._gravar_usos()
+        self._conexao.commit()
+
+    def fechar(self):
+        self.confirmar()
+        self._conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def chaves_arquivos(caminhos: List[str]) -> Dict[str, Optional[bytes]]:
+    """Chave de cada arquivo (None para os que não puderam ser lidos)."""
+    chaves = {}
+    for caminho in caminhos:
+        try:
+            with open(caminho, "rb") as f:
+                chaves[caminho] = chave_conteudo(f.read())
+        except OSError:
+            chaves[caminho] = None
+    return chaves
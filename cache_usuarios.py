@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sistema_alvo import ResultadoLote, User, UserService
+
+
+@dataclass
+class EstatisticasCache:
+    acertos: int = 0
+    faltas: int = 0
+    despejos: int = 0  # entradas removidas por falta de espaço
+
+    @property
+    def taxa_acertos(self) -> float:
+        total = self.acertos + self.faltas
+        return self.acertos / total if total else 0.0
+
+
+class _Carga:
+    """Busca em andamento de um id; quem chega depois espera por ela (single-flight)."""
+
+    __slots__ = ("pronta", "usuario", "erro")
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.usuario: Optional[User] = None
+        self.erro: Optional[BaseException] = None
+
+
+class UserServiceComCache:
+    """Cache de leitura (LRU + TTL) na frente de um UserService com armazenamento lento.
+
+    buscarUsuario lê do cache e, na falta, do serviço; ids inexistentes também
+    são guardados (None), por ``ttl_negativo`` segundos. Buscas simultâneas pelo
+    mesmo id ausente fazem uma única leitura no serviço. As entradas são
+    invalidadas por um observador do serviço, então mutações feitas direto nele
+    também valem. As demais operações são repassadas ao serviço.
+    """
+
+    def __init__(
+        self,
+        servico: UserService,
+        tamanho: int = 10_000,
+        ttl: Optional[float] = 60.0,
+        ttl_negativo: Optional[float] = 5.0,
+    ):
+        self.servico = servico
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self.estatisticas = EstatisticasCache()
+        # id -> (expira_em, User ou None); a ordem é a de uso, do mais antigo ao mais recente.
+        self._entradas: "OrderedDict[object, tuple]" = OrderedDict()
+        self._cargas: Dict[object, _Carga] = {}
+        self._trava = threading.Lock()
+        # Contador de invalidações: uma carga só é guardada se nenhuma ocorreu
+        # durante ela, para não gravar no cache um valor lido antes da mutação.
+        self._invalidacoes = 0
+        servico.registrarObservador(self._invalidar)
+
+    def _invalidar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        id = (depois or antes).id
+        with self._trava:
+            self._invalidacoes += 1
+            self._entradas.pop(id, None)
+
+    def limpar(self):
+        with self._trava:
+            self._invalidacoes += 1
+            self._entradas.clear()
+
+    def buscarUsuario(self, id: str) -> Optional[User]:
+        with self._trava:
+            entrada = self._entradas.get(id)
+            if entrada is not None and (entrada[0] is None or entrada[0] > time.monotonic()):
+                self._entradas.move_to_end(id)
+                self.estatisticas.acertos += 1
+                return entrada[1]
+            self.estatisticas.faltas += 1
+            carga = self._cargas.get(id)
+            dono = carga is None
+            if dono:
+                carga = self._cargas[id] = _Carga()
+                invalidacoes = self._invalidacoes
+
+        if not dono:
+            carga.pronta.wait()
+            if carga.erro is not None:
+                raise carga.erro
+            return carga.usuario
+
+        try:
+            carga.usuario = self.servico.buscarUsuario(id)
+        except BaseException as e:
+            carga.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._cargas[id]
+                if carga.erro is None and invalidacoes == self._invalidacoes:
+                    self._guardar(id, carga.usuario)
+            carga.pronta.set()
+        return carga.usuario
+
+    def _guardar(self, id, usuario: Optional[User]):
+        ttl = self.ttl if usuario is not None else self.ttl_negativo
+        if ttl is not None and ttl <= 0:
+            return
+        self._entradas[id] = (None if ttl is None else time.monotonic() + ttl, usuario)
+        self._entradas.move_to_end(id)
+        while len(self._entradas) > self.tamanho:
+            self._entradas.popitem(last=False)
+            self.estatisticas.despejos += 1
+
+    def buscarUsuarioPorEmail(self, email: str) -> Optional[User]:
+        return self.servico.buscarUsuarioPorEmail(email)
+
+    def criarUsuario(self, usuario: dict) -> User:
+        return self.servico.criarUsuario(usuario)
+
+    def criarUsuariosEmLote(self, usuarios: Iterable[dict]) -> ResultadoLote:
+        return self.servico.criarUsuariosEmLote(usuarios)
+
+    def atualizarUsuario(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        return self.servico.atualizarUsuario(id, usuario, versao_esperada)
+
+    def excluirUsuario(self, id: str) -> bool:
+        return self.servico.excluirUsuario(id)
@@ -0,0 +1,431 @@
+"""Execução real das suítes geradas pelos LLMs contra sistema_alvo.
+
+Uso: python executar_suites.py PADRAO [PADRAO ...] -o execucao.jsonl [-j PROCESSOS] [--tempo-limite S]
+                               [--sem-cobertura]
+
+As suítes importam o sistema de módulos que não existem aqui (``from test
+import ...``, ``from user_service import ...``); no processo de cada suíte esses
+nomes apontam para sistema_alvo. Cada suíte roda num processo novo (estado do
+módulo, sys.modules e cobertura isolados), até ``processos`` ao mesmo tempo, com
+pytest ou unittest conforme o arquivo. Se o pacote coverage estiver instalado,
+cada suíte roda uma segunda vez, noutro processo, contra a cópia fixa da versão
+original de sistema_alvo.py (ARQUIVO_REFERENCIA), e é dessa execução que sai a
+cobertura de linhas e ramos de SUPERFICIE_ALVO: no sistema_alvo atual, os
+validadores gerados com exec pulam o corpo das funções _validate_* sempre que
+o valor é válido, e a cobertura delas sairia subestimada.
+"""
+import argparse
+import ast
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import unittest
+from functools import lru_cache
+from multiprocessing.connection import wait
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from avaliar_suites import descobrir_suites
+
+MODULO_ALVO = "sistema_alvo"
+# Nomes que as suítes usam para importar o sistema testado.
+MODULOS_APELIDO = ("test", "user_service")
+# Cópia da versão original de sistema_alvo.py, sobre a qual a cobertura é medida.
+# Não deve ser alterada junto com sistema_alvo.py.
+ARQUIVO_REFERENCIA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "referencia", "sistema_alvo.py")
+# O que as suítes foram escritas para testar: as funções _validate_*, a classe
+# User e os quatro métodos CRUD do UserService. Só essas linhas contam na cobertura.
+SUPERFICIE_ALVO = ("_validate_*", "User", "UserService.criarUsuario", "UserService.buscarUsuario",
+                   "UserService.atualizarUsuario", "UserService.excluirUsuario")
+
+# Colunas numéricas de cada resultado, para pontuacao.matriz_metricas(resultados, METRICAS_EXECUCAO).
+METRICAS_EXECUCAO = (
+    "testes_executados",
+    "testes_passaram",
+    "testes_falharam",
+    "testes_com_erro",
+    "taxa_aprovacao",
+    "cobertura_linhas",
+    "cobertura_ramos",
+)
+
+
+def framework(conteudo: str) -> str:
+    """"unittest" se a suíte só define TestCases e não usa pytest; senão "pytest"."""
+    arvore = ast.parse(conteudo)
+    usa_pytest = usa_unittest = False
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Import):
+            usa_pytest |= any(a.name.split(".")[0] == "pytest" for a in no.names)
+        elif isinstance(no, ast.ImportFrom):
+            usa_pytest |= (no.module or "").split(".")[0] == "pytest"
+        elif isinstance(no, ast.ClassDef):
+            usa_unittest |= any(
+                (isinstance(base, ast.Attribute) and base.attr == "TestCase")
+                or (isinstance(base, ast.Name) and base.id == "TestCase")
+                for base in no.bases
+            )
+    return "unittest" if usa_unittest and not usa_pytest else "pytest"
+
+
+class _ColetorPytest:
+    """Plugin do pytest: resultado e duração (setup + chamada + teardown) de cada teste."""
+
+    def __init__(self):
+        self.testes: Dict[str, dict] = {}
+        self.erro_coleta: Optional[str] = None
+
+    def pytest_runtest_logreport(self, report):
+        teste = self.testes.setdefault(report.nodeid, {"nome": report.nodeid, "resultado": "passou", "duracao": 0.0})
+        teste["duracao"] += report.duration
+        if report.skipped and teste["resultado"] == "passou":
+            teste["resultado"] = "pulado"
+        elif report.failed:
+            # Falha fora da chamada (fixture, setup, teardown) é erro, como no pytest.
+            teste["resultado"] = "falhou" if report.when == "call" else "erro"
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.erro_coleta = str(report.longrepr)
+
+
+def _rodar_pytest(caminho: str) -> List[dict]:
+    import pytest
+
+    coletor = _ColetorPytest()
+    # importlib: os nomes de arquivo das suítes não são nomes de módulo válidos.
+    pytest.main(
+        [caminho, "-q", "-p", "no:cacheprovider", "--import-mode=importlib", "--rootdir", os.path.dirname(caminho)],
+        plugins=[coletor],
+    )
+    if coletor.erro_coleta is not None and not coletor.testes:
+        raise RuntimeError(f"erro ao coletar a suíte: {coletor.erro_coleta.strip().splitlines()[-1]}")
+    return list(coletor.testes.values())
+
+
+class _ResultadoUnittest(unittest.TestResult):
+    def __init__(self):
+        super().__init__()
+        self.testes: List[dict] = []
+        self._inicio = 0.0
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._inicio = time.perf_counter()
+        self.testes.append({"nome": test.id(), "resultado": "passou", "duracao": 0.0})
+
+    def stopTest(self, test):
+        self.testes[-1]["duracao"] = time.perf_counter() - self._inicio
+        super().stopTest(test)
+
+    def _marcar(self, resultado: str):
+        self.testes[-1]["resultado"] = resultado
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._marcar("falhou")
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        # Erros de setUpClass/setUpModule chegam fora de um teste.
+        if isinstance(test, unittest.TestCase):
+            self._marcar("erro")
+        else:
+            self.testes.append({"nome": str(test), "resultado": "erro", "duracao": 0.0})
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._marcar("pulado")
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._marcar("passou")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._marcar("falhou")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            self._marcar("falhou" if issubclass(err[0], test.failureException) else "erro")
+
+
+def _rodar_unittest(caminho: str) -> List[dict]:
+    especificacao = importlib.util.spec_from_file_location("suite_em_execucao", caminho)
+    modulo = importlib.util.module_from_spec(especificacao)
+    sys.modules[especificacao.name] = modulo
+    especificacao.loader.exec_module(modulo)
+    resultado = _ResultadoUnittest()
+    unittest.defaultTestLoader.loadTestsFromModule(modulo).run(resultado)
+    return resultado.testes
+
+
+@lru_cache(maxsize=None)
+def linhas_superficie(caminho: str = ARQUIVO_REFERENCIA) -> FrozenSet[int]:
+    """Linhas (com decoradores) das definições de SUPERFICIE_ALVO em caminho."""
+    with open(caminho, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    prefixos = tuple(nome[:-1] for nome in SUPERFICIE_ALVO if nome.endswith("*"))
+    linhas = set()
+
+    def incluir(no):
+        inicio = min([no.lineno] + [d.lineno for d in no.decorator_list])
+        linhas.update(range(inicio, no.end_lineno + 1))
+
+    for no in arvore.body:
+        if not isinstance(no, (ast.FunctionDef, ast.ClassDef)):
+            continue
+        if no.name in SUPERFICIE_ALVO or no.name.startswith(prefixos):
+            incluir(no)
+        elif isinstance(no, ast.ClassDef):
+            for metodo in no.body:
+                if isinstance(metodo, ast.FunctionDef) and f"{no.name}.{metodo.name}" in SUPERFICIE_ALVO:
+                    incluir(metodo)
+    return frozenset(linhas)
+
+
+def _cobertura(cov, diretorio_temporario: str) -> dict:
+    # O relatório JSON é a forma pública de obter as linhas e os ramos executados;
+    # os totais são refeitos só sobre as linhas da superfície.
+    relatorio = os.path.join(diretorio_temporario, f"cobertura-{os.getpid()}.json")
+    try:
+        cov.json_report(outfile=relatorio, include=[ARQUIVO_REFERENCIA])
+        with open(relatorio, encoding="utf-8") as f:
+            arquivos = json.load(f)["files"]
+    finally:
+        if os.path.exists(relatorio):
+            os.remove(relatorio)
+    superficie = linhas_superficie()
+    arquivo = next(iter(arquivos.values()), {})
+    cobertas = sum(1 for n in arquivo.get("executed_lines", ()) if n in superficie)
+    linhas = cobertas + sum(1 for n in arquivo.get("missing_lines", ()) if n in superficie)
+    ramos_cobertos = sum(1 for de, _ in arquivo.get("executed_branches", ()) if de in superficie)
+    ramos = ramos_cobertos + sum(1 for de, _ in arquivo.get("missing_branches", ()) if de in superficie)
+    return {
+        "linhas_cobertas": cobertas,
+        "linhas_total": linhas,
+        "ramos_cobertos": ramos_cobertos,
+        "ramos_total": ramos,
+        "cobertura_linhas": cobertas / linhas if linhas else 0.0,
+        "cobertura_ramos": ramos_cobertos / ramos if ramos else 0.0,
+    }
+
+
+def _cobertura_disponivel() -> bool:
+    return importlib.util.find_spec("coverage") is not None
+
+
+def _importar_alvo(medir_cobertura: bool):
+    # Importado de novo aqui (depois do fork e com a cobertura ligada), para que
+    # o corpo do módulo também seja medido e cada suíte comece do zero. Na
+    # medição de cobertura, o módulo vem de ARQUIVO_REFERENCIA, com o mesmo nome.
+    sys.modules.pop(MODULO_ALVO, None)
+    if medir_cobertura:
+        especificacao = importlib.util.spec_from_file_location(MODULO_ALVO, ARQUIVO_REFERENCIA)
+        alvo = importlib.util.module_from_spec(especificacao)
+        sys.modules[MODULO_ALVO] = alvo
+        especificacao.loader.exec_module(alvo)
+    else:
+        alvo = importlib.import_module(MODULO_ALVO)
+    for apelido in MODULOS_APELIDO:
+        sys.modules[apelido] = alvo
+
+
+def _executar(caminho: str, medir_cobertura: bool, diretorio_temporario: str) -> dict:
+    # Roda no processo da suíte: sem medir_cobertura, devolve os testes contra
+    # sistema_alvo; com ele, só a cobertura de ARQUIVO_REFERENCIA.
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            tipo = framework(f.read())
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+        return {"erro": f"{type(e).__name__}: {e}"}
+
+    cov = None
+    if medir_cobertura:
+        import coverage
+
+        cov = coverage.Coverage(
+            branch=True,
+            include=[ARQUIVO_REFERENCIA],
+            data_file=os.path.join(diretorio_temporario, f".coverage-{os.getpid()}"),
+        )
+        cov.start()
+    _importar_alvo(medir_cobertura)
+
+    try:
+        testes = _rodar_pytest(caminho) if tipo == "pytest" else _rodar_unittest(caminho)
+        erro = None
+    except Exception as e:
+        testes, erro = [], f"{type(e).__name__}: {e}"
+    finally:
+        if cov is not None:
+            cov.stop()
+    if cov is not None:
+        return {"cobertura": _cobertura(cov, diretorio_temporario)}
+    resultado = {"framework": tipo, "testes": testes}
+    if erro is not None:
+        resultado["erro"] = erro
+    return resultado
+
+
+def _processo_suite(conexao, caminho: str, medir_cobertura: bool, diretorio_temporario: str):
+    # A saída das suítes (pytest, prints) não interessa: o resultado volta pelo pipe.
+    nulo = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(nulo, 1)
+    os.dup2(nulo, 2)
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+    try:
+        resultado = _executar(caminho, medir_cobertura, diretorio_temporario)
+    except BaseException as e:
+        resultado = {"erro": f"{type(e).__name__}: {e}"}
+    conexao.send(resultado)
+    conexao.close()
+
+
+def _resumir(caminho: str, resultado: dict) -> dict:
+    testes = resultado.get("testes", [])
+    contagem = {r: 0 for r in ("passou", "falhou", "erro", "pulado")}
+    for teste in testes:
+        contagem[teste["resultado"]] += 1
+    executados = contagem["passou"] + contagem["falhou"] + contagem["erro"]
+    cobertura = resultado.get("cobertura")
+    resumo = {
+        "arquivo": caminho,
+        "framework": resultado.get("framework"),
+        "testes_executados": executados,
+        "testes_passaram": contagem["passou"],
+        "testes_falharam": contagem["falhou"],
+        "testes_com_erro": contagem["erro"],
+        "testes_pulados": contagem["pulado"],
+        "taxa_aprovacao": contagem["passou"] / executados if executados else 0.0,
+        "cobertura_linhas": cobertura["cobertura_linhas"] if cobertura else None,
+        "cobertura_ramos": cobertura["cobertura_ramos"] if cobertura else None,
+        "cobertura": cobertura,
+        "testes": testes,
+    }
+    for chave in ("erro", "erro_cobertura"):
+        if chave in resultado:
+            resumo[chave] = resultado[chave]
+    return resumo
+
+
+def executar_suites(
+    caminhos: Iterable[str],
+    saida: Optional[str] = None,
+    processos: Optional[int] = None,
+    tempo_limite: Optional[float] = 300.0,
+    cobertura: bool = True,
+) -> List[dict]:
+    """Executa cada suíte num processo próprio, até ``processos`` ao mesmo tempo.
+
+    Devolve um resultado por suíte, na ordem de ``caminhos``, com as contagens
+    (METRICAS_EXECUCAO), a lista "testes" (nome, resultado e duração de cada
+    teste) e a cobertura de SUPERFICIE_ALVO em ARQUIVO_REFERENCIA, medida num
+    segundo processo (None sem o pacote coverage). Um processo que passa de
+    ``tempo_limite`` segundos é encerrado; a suíte fica com "erro" (ou, se foi o
+    da cobertura, "erro_cobertura"), assim como quando o processo morre. Com
+    ``saida``, cada resultado é gravado numa linha de JSON assim que a suíte termina.
+    """
+    caminhos = [os.path.abspath(c) for c in caminhos]
+    processos = processos or os.cpu_count() or 1
+    cobertura = cobertura and _cobertura_disponivel()
+    contexto = multiprocessing.get_context()
+    resultados: Dict[str, dict] = {}
+    partes: Dict[str, dict] = {}  # caminho -> resultado de cada processo já concluído
+    arquivo = open(saida, "w", encoding="utf-8") if saida else None
+    rodando = {}  # conexão -> (caminho, medir_cobertura, processo, prazo)
+    # Cada suíte: os testes contra sistema_alvo e, à parte, a medição de cobertura.
+    fila = [(c, medir) for c in reversed(caminhos) for medir in ((True, False) if cobertura else (False,))]
+
+    def concluir(caminho: str, medir_cobertura: bool, resultado: dict):
+        parte = partes.setdefault(caminho, {})
+        if not medir_cobertura:
+            parte.update(resultado)
+        elif "erro" in resultado:
+            parte["erro_cobertura"] = resultado["erro"]
+        else:
+            parte["cobertura"] = resultado["cobertura"]
+        if "testes" in parte or "erro" in parte:
+            if cobertura and "cobertura" not in parte and "erro_cobertura" not in parte:
+                return
+            resultados[caminho] = _resumir(caminho, partes.pop(caminho))
+            if arquivo is not None:
+                arquivo.write(json.dumps(resultados[caminho], ensure_ascii=False) + "\n")
+                arquivo.flush()
+
+    try:
+        with tempfile.TemporaryDirectory() as diretorio_temporario:
+            while fila or rodando:
+                while fila and len(rodando) < processos:
+                    caminho, medir_cobertura = fila.pop()
+                    conexao, remota = contexto.Pipe(duplex=False)
+                    processo = contexto.Process(
+                        target=_processo_suite,
+                        args=(remota, caminho, medir_cobertura, diretorio_temporario),
+                        daemon=True,
+                    )
+                    processo.start()
+                    remota.close()
+                    prazo = None if tempo_limite is None else time.monotonic() + tempo_limite
+                    rodando[conexao] = (caminho, medir_cobertura, processo, prazo)
+
+                prazos = [prazo for _, _, _, prazo in rodando.values() if prazo is not None]
+                espera = max(0.0, min(prazos) - time.monotonic()) if prazos else None
+                for conexao in wait(list(rodando), espera):
+                    caminho, medir_cobertura, processo, _ = rodando.pop(conexao)
+                    try:
+                        resultado = conexao.recv()
+                    except EOFError:
+                        processo.join()
+                        resultado = {"erro": f"o processo da suíte terminou (código {processo.exitcode})"}
+                    conexao.close()
+                    processo.join()
+                    concluir(caminho, medir_cobertura, resultado)
+
+                agora = time.monotonic()
+                for conexao, (caminho, medir_cobertura, processo, prazo) in list(rodando.items()):
+                    if prazo is not None and agora >= prazo:
+                        del rodando[conexao]
+                        processo.kill()
+                        processo.join()
+                        conexao.close()
+                        concluir(caminho, medir_cobertura, {"erro": f"tempo limite de {tempo_limite}s excedido"})
+    finally:
+        for _, _, processo, _ in rodando.values():
+            processo.kill()
+        if arquivo is not None:
+            arquivo.close()
+    return [resultados[caminho] for caminho in caminhos]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Executa suítes de teste geradas por LLMs contra sistema_alvo.")
+    parser.add_argument("padroes", nargs="+", help="padrões glob das suítes (** é recursivo)")
+    parser.add_argument("-o", "--saida", default="execucao.jsonl", help="arquivo JSONL de saída")
+    parser.add_argument("-j", "--processos", type=int, default=None, help="suítes ao mesmo tempo (padrão: núcleos)")
+    parser.add_argument("--tempo-limite", type=float, default=300.0, help="segundos por suíte")
+    parser.add_argument("--sem-cobertura", action="store_true", help="não mede a cobertura de sistema_alvo.py")
+    args = parser.parse_args(argv)
+
+    caminhos = descobrir_suites(args.padroes)
+    if not caminhos:
+        print("nenhuma suíte encontrada", file=sys.stderr)
+        return 1
+    for r in executar_suites(caminhos, args.saida, args.processos, args.tempo_limite, not args.sem_cobertura):
+        cobertura = "" if r["cobertura"] is None else (
+            f"  linhas {r['cobertura_linhas']:.0%}  ramos {r['cobertura_ramos']:.0%}"
+        )
+        erro = f"  ERRO: {r['erro']}" if "erro" in r else ""
+        print(
+            f"{os.path.basename(r['arquivo'])}: {r['testes_passaram']}/{r['testes_executados']} passaram, "
+            f"{r['testes_falharam']} falharam, {r['testes_com_erro']} com erro{cobertura}{erro}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
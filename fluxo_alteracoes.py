@@ -0,0 +1,172 @@
+import threading
+import time
+from itertools import count, repeat
+from typing import List, NamedTuple, Optional
+
+from sistema_alvo import User, UserService
+
+
+class Evento(NamedTuple):
+    seq: int
+    operacao: str  # "criar", "atualizar" ou "excluir"
+    antes: Optional[User]
+    depois: Optional[User]
+
+
+class Assinatura:
+    """Leitor do fluxo: recebe, em lotes e em ordem, os eventos posteriores à assinatura."""
+
+    def __init__(self, fluxo: "FluxoAlteracoes", proximo: int):
+        self._fluxo = fluxo
+        self.proximo = proximo  # seq do próximo evento a receber
+
+    def receber(self, max_eventos: int = 256, tempo_limite: Optional[float] = None) -> List[Evento]:
+        """Até max_eventos eventos; espera por até tempo_limite segundos (None: sem limite)
+        se não houver nenhum. Devolve lista vazia se o tempo acabar ou a assinatura for cancelada."""
+        return self._fluxo._ler(self, max_eventos, tempo_limite)
+
+    def cancelar(self):
+        self._fluxo._cancelar(self)
+
+
+class FluxoAlteracoes:
+    """Fluxo de alterações (CDC) de um UserService, num buffer circular limitado.
+
+    Cada criação, atualização e exclusão vira um evento com as imagens antes e
+    depois (os Users são imutáveis no serviço, então não há cópia). Os eventos
+    ficam num buffer de ``capacidade`` posições, compartilhado pelas assinaturas;
+    quando a assinatura mais atrasada está ``capacidade`` eventos atrás, a
+    mutação que gerou o evento espera o leitor (contrapressão). O fluxo só
+    observa o serviço enquanto há assinaturas: sem elas, as mutações não pagam
+    nada e nada é retido. Uma assinatura que deixa de ser lida precisa ser
+    cancelada.
+    """
+
+    def __init__(self, servico: UserService, capacidade: int = 4096):
+        self._servico = servico
+        self.capacidade = capacidade
+        # O buffer é guardado em colunas, uma lista por campo do evento: publicar
+        # não aloca nada (nem a tupla do evento, que só é montada na leitura).
+        # seqs é escrita por último e marca a posição como publicada.
+        self._seqs: List[Optional[int]] = [None] * capacidade
+        self._operacoes: List[Optional[str]] = [None] * capacidade
+        self._antes: List[Optional[User]] = [None] * capacidade
+        self._depois: List[Optional[User]] = [None] * capacidade
+        self._contador = count()
+        # Onde a busca pelo fim do fluxo começa quando não há assinaturas.
+        self._retomar = 0
+        self._assinaturas: List[Assinatura] = []
+        # Primeiro seq cuja gravação pode sobrescrever um evento ainda não lido.
+        # Só cresce entre recálculos, então um valor lido desatualizado é conservador.
+        self._limite = float("inf")
+        self._condicao = threading.Condition(threading.Lock())
+        # Pedido de um leitor parado; o produtor o atende (e limpa) com um único notify,
+        # em vez de um por evento enquanto o leitor não volta a rodar.
+        self._acordar_leitores = False
+        self._produtores_esperando = 0
+
+    def assinar(self) -> Assinatura:
+        with self._condicao:
+            # O fim do fluxo é o primeiro seq ainda não publicado depois da
+            # assinatura mais adiantada (no máximo capacidade posições adiante);
+            # eventos concorrentes à assinatura podem ou não ser recebidos.
+            inicio = max((a.proximo for a in self._assinaturas), default=self._retomar)
+            while self._publicado(inicio):
+                inicio += 1
+            assinatura = Assinatura(self, inicio)
+            if not self._assinaturas:
+                self._servico.registrarObservador(self._registrar)
+            self._assinaturas.append(assinatura)
+            self._recalcular_limite()
+            return assinatura
+
+    def _cancelar(self, assinatura: Assinatura):
+        with self._condicao:
+            if assinatura in self._assinaturas:
+                self._assinaturas.remove(assinatura)
+                if not self._assinaturas:
+                    self._servico.removerObservador(self._registrar)
+                    self._retomar = assinatura.proximo
+                self._recalcular_limite()
+                self._condicao.notify_all()
+
+    def _recalcular_limite(self):
+        if self._assinaturas:
+            self._limite = min(a.proximo for a in self._assinaturas) + self.capacidade
+        else:
+            self._limite = float("inf")
+
+    def _registrar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        # Caminho quente, sem trava: next() num count e a gravação de um item de
+        # lista são atômicos sob o GIL. Um evento está publicado quando seqs, na
+        # sua posição, traz o seu seq; os outros campos são gravados antes. Só
+        # roda com assinaturas (ou numa mutação em curso quando a última é
+        # cancelada, sem leitor a esperar).
+        seq = next(self._contador)
+        if seq >= self._limite:
+            self._esperar_espaco(seq)
+        posicao = seq % self.capacidade
+        self._operacoes[posicao] = operacao
+        self._antes[posicao] = antes
+        self._depois[posicao] = depois
+        self._seqs[posicao] = seq
+        if self._acordar_leitores:
+            self._acordar_leitores = False
+            with self._condicao:
+                self._condicao.notify_all()
+
+    def _esperar_espaco(self, seq: int):
+        with self._condicao:
+            self._recalcular_limite()
+            while seq >= self._limite:
+                self._produtores_esperando += 1
+                self._condicao.wait()
+                self._produtores_esperando -= 1
+                self._recalcular_limite()
+
+    def _publicado(self, seq: int) -> bool:
+        return self._seqs[seq % self.capacidade] == seq
+
+    def _fatia(self, coluna: list, posicao: int, quantidade: int) -> list:
+        # quantidade itens da coluna a partir de posicao, dando a volta no buffer.
+        fatia = coluna[posicao:posicao + quantidade]
+        if len(fatia) < quantidade:
+            fatia += coluna[:quantidade - len(fatia)]
+        return fatia
+
+    def _ler(self, assinatura: Assinatura, max_eventos: int, tempo_limite: Optional[float]) -> List[Evento]:
+        with self._condicao:
+            prazo = None if tempo_limite is None else time.monotonic() + tempo_limite
+            while assinatura in self._assinaturas:
+                # O pedido vem antes da verificação: se o produtor publicar entre
+                # as duas, ou a verificação vê o evento ou o produtor vê o pedido.
+                self._acordar_leitores = True
+                if self._publicado(assinatura.proximo):
+                    break
+                restante = None if prazo is None else prazo - time.monotonic()
+                if restante is not None and restante <= 0:
+                    break
+                self._condicao.wait(restante)
+            if assinatura not in self._assinaturas:
+                return []
+            inicio = assinatura.proximo
+            posicao = inicio % self.capacidade
+            seqs = self._fatia(self._seqs, posicao, min(max_eventos, self.capacidade))
+            publicados = 0
+            for seq in seqs:
+                if seq != inicio + publicados:
+                    break
+                publicados += 1
+            # O evento é montado aqui, com tuple.__new__ (sem passar por Python).
+            eventos = list(map(tuple.__new__, repeat(Evento, publicados), zip(
+                seqs[:publicados],
+                self._fatia(self._operacoes, posicao, publicados),
+                self._fatia(self._antes, posicao, publicados),
+                self._fatia(self._depois, posicao, publicados),
+            )))
+            assinatura.proximo = inicio + publicados
+            if eventos:
+                self._recalcular_limite()
+                if self._produtores_esperando:
+                    self._condicao.notify_all()
+            return eventos
@@ -0,0 +1,135 @@
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sistema_alvo import User, UserService
+
+
+class IndiceIdade:
+    """Índice ordenado por idade de um UserService, com contagens separadas por ativo.
+
+    As idades distintas ficam numa lista ordenada (bisect) e, para cada valor de
+    ativo, uma árvore de Fenwick guarda quantos usuários há em cada idade: contar
+    uma faixa custa O(log n). O índice é um observador do serviço e se atualiza a
+    cada criação, atualização e exclusão. Uma idade nova reconstrói as árvores
+    (O(idades distintas)), o que é raro; idades que esvaziam continuam na lista.
+    Depois de construído, o índice pode observar um serviço usado por várias
+    threads (ex.: UserServiceConcorrente) e ser consultado ao mesmo tempo: uma
+    trava protege as atualizações e as leituras.
+    """
+
+    def __init__(self, servico: UserService):
+        self._servico = servico
+        self._trava = threading.Lock()
+        self._idades: List[int] = []
+        # ativo -> idade -> ids (dict usado como conjunto ordenado)
+        self._ids: Dict[bool, Dict[int, Dict[str, None]]] = {True: {}, False: {}}
+        self._arvores: Dict[bool, List[int]] = {True: [0], False: [0]}
+        for user in servico._store.values():
+            self._ids[user.ativo].setdefault(user.idade, {})[user.id] = None
+        self._idades = sorted(set(self._ids[True]) | set(self._ids[False]))
+        self._reconstruir()
+        servico.registrarObservador(self._registrar)
+
+    def _reconstruir(self):
+        for ativo, por_idade in self._ids.items():
+            arvore = [0] * (len(self._idades) + 1)
+            for i, idade in enumerate(self._idades, 1):
+                arvore[i] += len(por_idade.get(idade, ()))
+                pai = i + (i & -i)
+                if pai < len(arvore):
+                    arvore[pai] += arvore[i]
+            self._arvores[ativo] = arvore
+
+    def _somar(self, ativo: bool, idade: int, delta: int):
+        arvore = self._arvores[ativo]
+        i = bisect_left(self._idades, idade) + 1
+        while i < len(arvore):
+            arvore[i] += delta
+            i += i & -i
+
+    def _prefixo(self, ativo: bool, n: int) -> int:
+        # Quantos usuários com esse ativo têm uma das n primeiras idades.
+        arvore = self._arvores[ativo]
+        total = 0
+        while n:
+            total += arvore[n]
+            n &= n - 1
+        return total
+
+    def _adicionar(self, user: User):
+        ids = self._ids[user.ativo].setdefault(user.idade, {})
+        ids[user.id] = None
+        posicao = bisect_left(self._idades, user.idade)
+        if posicao == len(self._idades) or self._idades[posicao] != user.idade:
+            self._idades.insert(posicao, user.idade)
+            self._reconstruir()
+        else:
+            self._somar(user.ativo, user.idade, 1)
+
+    def _remover(self, user: User):
+        por_idade = self._ids[user.ativo]
+        ids = por_idade[user.idade]
+        del ids[user.id]
+        if not ids:
+            del por_idade[user.idade]
+        self._somar(user.ativo, user.idade, -1)
+
+    def _registrar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        if operacao == "atualizar" and antes.idade == depois.idade and antes.ativo == depois.ativo:
+            return
+        with self._trava:
+            if antes is not None:
+                self._remover(antes)
+            if depois is not None:
+                self._adicionar(depois)
+
+    def _faixa(self, idade_min: Optional[int], idade_max: Optional[int]):
+        inicio = 0 if idade_min is None else bisect_left(self._idades, idade_min)
+        fim = len(self._idades) if idade_max is None else bisect_right(self._idades, idade_max)
+        return inicio, max(inicio, fim)
+
+    def contar(self, idade_min: Optional[int] = None, idade_max: Optional[int] = None,
+               ativo: Optional[bool] = None) -> int:
+        """Quantos usuários têm idade_min <= idade <= idade_max (limites opcionais)."""
+        with self._trava:
+            return self._contar(idade_min, idade_max, ativo)
+
+    def _contar(self, idade_min: Optional[int], idade_max: Optional[int], ativo: Optional[bool]) -> int:
+        inicio, fim = self._faixa(idade_min, idade_max)
+        return sum(
+            self._prefixo(a, fim) - self._prefixo(a, inicio)
+            for a in ((True, False) if ativo is None else (ativo,))
+        )
+
+    def contar_por_faixa(self, limites: Iterable[int], ativo: Optional[bool] = None) -> List[int]:
+        """Contagem em cada faixa [limites[i], limites[i + 1]); a última é aberta à direita."""
+        limites = list(limites)
+        fins = [None if i + 1 == len(limites) else limites[i + 1] - 1 for i in range(len(limites))]
+        with self._trava:
+            return [self._contar(inicio, fim, ativo) for inicio, fim in zip(limites, fins)]
+
+    def usuarios(self, idade_min: Optional[int] = None, idade_max: Optional[int] = None,
+                 ativo: Optional[bool] = None) -> Iterator[User]:
+        """Usuários da faixa em ordem crescente de idade (na mesma idade, ativos antes).
+
+        Os ids são copiados do índice na chamada; quem for excluído antes de ser
+        alcançado é pulado.
+        """
+        with self._trava:
+            inicio, fim = self._faixa(idade_min, idade_max)
+            selecionados = [self._ids[a] for a in ((True, False) if ativo is None else (ativo,))]
+            ids = [
+                id
+                for idade in self._idades[inicio:fim]
+                for por_idade in selecionados
+                for id in por_idade.get(idade, ())
+            ]
+        return _existentes(self._servico._store, ids)
+
+
+def _existentes(store, ids: List[str]) -> Iterator[User]:
+    for id in ids:
+        user = store.get(id)
+        if user is not None:
+            yield user
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from itertools import count
+from typing import Optional, Tuple
+
+from sistema_alvo import User, UserService, _usuario_validado, usuarios_para_jsonl
+from snapshot import carregar_snapshot, salvar_snapshot
+
+ARQUIVO_LOG = "operacoes.log"
+ARQUIVO_SNAPSHOT = "usuarios.snap"
+
+# Cada linha do log é um código de operação seguido de JSON:
+#   c<versão> {...}  usuário criado     a<versão> {...}  usuário atualizado (imagem final)
+#   e"id"            usuário excluído
+_CODIGOS = {"criar": b"c", "atualizar": b"a"}
+
+
+class LogOperacoes:
+    """Log de operações (append-only) de um UserService, com commit em grupo.
+
+    As linhas ficam num buffer e vão para o disco, com um único fsync, quando o
+    grupo chega a ``tamanho_grupo`` operações ou, no máximo, ``intervalo_fsync``
+    segundos depois da primeira linha pendente: um temporizador em segundo plano
+    descarrega o grupo mesmo que nenhuma outra operação chegue. Uma queda perde
+    só as operações dos últimos ``intervalo_fsync`` segundos (no máximo
+    ``tamanho_grupo`` delas). Com ``fsync=False`` o log só é entregue ao sistema
+    operacional (sobrevive à queda do processo, não à da máquina).
+    """
+
+    def __init__(
+        self,
+        servico: UserService,
+        pasta: str,
+        tamanho_grupo: int = 64,
+        intervalo_fsync: float = 0.05,
+        fsync: bool = True,
+        compactar_a_cada: Optional[int] = None,
+    ):
+        self._servico = servico
+        self._pasta = pasta
+        self.tamanho_grupo = tamanho_grupo
+        self.intervalo_fsync = intervalo_fsync
+        self.fsync = fsync
+        self.compactar_a_cada = compactar_a_cada
+        self._arquivo = open(os.path.join(pasta, ARQUIVO_LOG), "ab")
+        self._trava = threading.Lock()
+        self._grupo = []
+        self._ultimo_descarregamento = time.monotonic()
+        self._temporizador: Optional[threading.Timer] = None
+        self._operacoes_desde_compactacao = 0
+        servico.registrarObservador(self._registrar)
+
+    def _registrar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        if operacao == "excluir":
+            linha = b"e" + json.dumps(antes.id, ensure_ascii=False).encode("utf-8") + b"\n"
+        else:
+            # Os observadores rodam depois de a nova versão ser gravada no serviço.
+            versao = self._servico._versoes.get(depois.id, 0)
+            linha = b"%s%d %s" % (_CODIGOS[operacao], versao, usuarios_para_jsonl((depois,)))
+
+        with self._trava:
+            self._grupo.append(linha)
+            self._operacoes_desde_compactacao += 1
+            if (
+                len(self._grupo) >= self.tamanho_grupo
+                or time.monotonic() - self._ultimo_descarregamento >= self.intervalo_fsync
+            ):
+                self._descarregar()
+            elif self._temporizador is None:
+                # Um temporizador pendente já vence antes do prazo deste grupo.
+                self._temporizador = threading.Timer(self.intervalo_fsync, self._descarregar_no_prazo)
+                self._temporizador.daemon = True
+                self._temporizador.start()
+            compactar = (
+                self.compactar_a_cada is not None
+                and self._operacoes_desde_compactacao >= self.compactar_a_cada
+            )
+        if compactar:
+            self.compactar()
+
+    def _descarregar(self):
+        if self._grupo:
+            self._arquivo.write(b"".join(self._grupo))
+            self._grupo.clear()
+            self._arquivo.flush()
+            if self.fsync:
+                os.fsync(self._arquivo.fileno())
+        self._ultimo_descarregamento = time.monotonic()
+
+    def _descarregar_no_prazo(self):
+        with self._trava:
+            self._temporizador = None
+            if not self._arquivo.closed:
+                self._descarregar()
+
+    def sincronizar(self):
+        """Grava e sincroniza no disco o grupo pendente."""
+        with self._trava:
+            self._descarregar()
+
+    def compactar(self):
+        """Grava um snapshot do estado atual e esvazia o log."""
+        with self._trava:
+            self._descarregar()
+            salvar_snapshot(self._servico, os.path.join(self._pasta, ARQUIVO_SNAPSHOT))
+            self._arquivo.truncate(0)
+            self._operacoes_desde_compactacao = 0
+
+    def fechar(self):
+        with self._trava:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+            self._descarregar()
+            self._arquivo.close()
+
+
+def _reaplicar(servico: UserService, caminho_log: str) -> int:
+    # A reaplicação é idempotente (criar regrava, excluir ignora ausentes), pois
+    # operações concorrentes a uma compactação podem estar no snapshot e no log.
+    store = servico._store
+    indice = servico._por_email
+    versoes = servico._versoes
+    maior_versao = versoes.maior()
+    aplicadas = 0
+    with open(caminho_log, "rb") as arquivo:
+        for linha in arquivo:
+            if not linha.endswith(b"\n"):
+                break  # última linha incompleta: a queda ocorreu no meio da escrita
+            codigo = linha[:1]
+            if codigo == b"e":
+                id, versao, dados = json.loads(linha[1:]), None, None
+            else:
+                versao, _, dados = linha[1:].partition(b" ")
+                versao, dados = int(versao), json.loads(dados)
+                id = dados["id"]
+            anterior = store.pop(id, None)
+            if anterior is not None:
+                indice.remover(anterior)
+                versoes.pop(id, None)
+            if dados is not None:
+                user = _usuario_validado(id, dados["nome"], dados["email"], dados["idade"], dados["ativo"])
+                store[id] = user
+                indice.adicionar(user)
+                versoes[id] = versao
+                maior_versao = max(maior_versao, versao)
+            aplicadas += 1
+    # As versões novas continuam depois das que vieram do log.
+    servico._proxima_versao = count(maior_versao + 1)
+    return aplicadas
+
+
+def recuperar_servico(pasta: str, email_unico: bool = False, **opcoes_log) -> Tuple[UserService, LogOperacoes]:
+    """Reconstrói o serviço (snapshot + reaplicação do log) e liga um novo log a ele."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho_snapshot = os.path.join(pasta, ARQUIVO_SNAPSHOT)
+    caminho_log = os.path.join(pasta, ARQUIVO_LOG)
+
+    if os.path.exists(caminho_snapshot):
+        servico = carregar_snapshot(caminho_snapshot, email_unico=email_unico)
+    else:
+        servico = UserService(email_unico=email_unico)
+    if os.path.exists(caminho_log):
+        _reaplicar(servico, caminho_log)
+        # Consolida o que foi recuperado para que o log recomece vazio.
+        salvar_snapshot(servico, caminho_snapshot)
+        os.remove(caminho_log)
+
+    return servico, LogOperacoes(servico, pasta, **opcoes_log)
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+# Pesos de calcular_pontuacao_final no notebook; a ordem define as colunas da matriz.
+PESOS_PADRAO: Dict[str, float] = {
+    "total_testes": 0.15,
+    "num_cobertura_cenarios": 0.20,
+    "testes_erro": 0.15,
+    "testes_borda": 0.15,
+    "num_metodos_cobertos": 0.10,
+    "num_erros_cobertos": 0.10,
+    "asserts_por_teste": 0.10,
+    "comentarios_por_teste": 0.05,
+}
+METRICAS = tuple(PESOS_PADRAO)
+
+Pesos = Union[Mapping[str, float], Sequence[float], np.ndarray]
+
+
+def matriz_metricas(resultados: Iterable[Optional[dict]], metricas: Sequence[str] = METRICAS) -> np.ndarray:
+    """Matriz float64 (suítes x métricas); suítes sem resultado (None) viram linhas de NaN."""
+    vazia = [np.nan] * len(metricas)
+    return np.array(
+        [vazia if m is None else [m[nome] for nome in metricas] for m in resultados],
+        dtype=np.float64,
+    ).reshape(-1, len(metricas))
+
+
+def normalizar(matriz: np.ndarray) -> np.ndarray:
+    """Cada coluna dividida pelo seu máximo entre as suítes com resultado.
+
+    Colunas cujo máximo não é positivo valem 0, como os ``if max_... > 0`` do
+    notebook; linhas de NaN (suítes sem resultado) também viram 0.
+    """
+    maximos = np.fmax.reduce(matriz, axis=0, initial=0.0)  # fmax ignora NaN
+    escala = np.divide(1.0, maximos, out=np.zeros_like(maximos), where=maximos > 0)
+    return np.nan_to_num(matriz, nan=0.0) * escala
+
+
+def vetor_pesos(pesos: Pesos, metricas: Sequence[str] = METRICAS) -> np.ndarray:
+    """Pesos como array: (métricas,) ou (configurações, métricas). Num dict, métrica ausente pesa 0."""
+    if isinstance(pesos, Mapping):
+        desconhecidas = set(pesos) - set(metricas)
+        if desconhecidas:
+            raise ValueError(f"métricas desconhecidas: {', '.join(sorted(desconhecidas))}")
+        return np.array([pesos.get(nome, 0.0) for nome in metricas], dtype=np.float64)
+    vetor = np.asarray(pesos, dtype=np.float64)
+    if vetor.shape[-1] != len(metricas) or vetor.ndim > 2:
+        raise ValueError(f"pesos devem ter forma ({len(metricas)},) ou (n, {len(metricas)}), não {vetor.shape}")
+    return vetor
+
+
+def pontuar(matriz: np.ndarray, pesos: Pesos = PESOS_PADRAO, metricas: Sequence[str] = METRICAS) -> np.ndarray:
+    """Pontuação (0 a 100) de cada suíte, como calcular_pontuacao_final.
+
+    Com um vetor de pesos devolve (suítes,); com uma matriz de k configurações,
+    (k, suítes), numa única multiplicação de matrizes — a análise de
+    sensibilidade não repete a normalização. O resultado ocupa k x suítes x 8
+    bytes: para muitas configurações, divida-as em blocos.
+    """
+    return (vetor_pesos(pesos, metricas) @ normalizar(matriz).T) * 100
+
+
+def pontuar_resultados(resultados: Mapping[str, Optional[dict]], pesos: Pesos = PESOS_PADRAO) -> Dict[str, float]:
+    """Pontuação por chave (ex.: nome do LLM) de um dict de métricas do analisador."""
+    pontuacoes = pontuar(matriz_metricas(resultados.values()), pesos)
+    return dict(zip(resultados, pontuacoes.tolist()))
+
+
+def posicoes(pontuacoes: np.ndarray) -> np.ndarray:
+    """Posição no ranking (1 = maior pontuação) ao longo do último eixo; empates pela ordem original."""
+    ordem = np.argsort(-pontuacoes, axis=-1, kind="stable")
+    posicao = np.empty_like(ordem)
+    np.put_along_axis(posicao, ordem, np.arange(1, pontuacoes.shape[-1] + 1), axis=-1)
+    return posicao
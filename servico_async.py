@@ -0,0 +1,170 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from servico_concorrente import UserServiceConcorrente
+from sistema_alvo import ResultadoLote, User, UserService
+
+
+class BackendAssincrono(ABC):
+    """Interface dos backends de armazenamento usados por AsyncUserService."""
+
+    @abstractmethod
+    async def criar(self, usuario: dict) -> User:
+        ...
+
+    @abstractmethod
+    async def criar_lote(self, usuarios: List[dict]) -> ResultadoLote:
+        ...
+
+    @abstractmethod
+    async def buscar(self, id: str) -> Optional[User]:
+        ...
+
+    @abstractmethod
+    async def buscar_lote(self, ids: List[str]) -> List[Optional[User]]:
+        ...
+
+    @abstractmethod
+    async def buscar_com_versao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        ...
+
+    @abstractmethod
+    async def atualizar(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        ...
+
+    @abstractmethod
+    async def excluir(self, id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def ids(self) -> List[str]:
+        ...
+
+
+class BackendEmMemoria(BackendAssincrono):
+    """Chama o UserService direto no loop; só serve para backends que não bloqueiam."""
+
+    def __init__(self, servico: Optional[UserService] = None):
+        self.servico = servico if servico is not None else UserService()
+
+    async def criar(self, usuario: dict) -> User:
+        return self.servico.criarUsuario(usuario)
+
+    async def criar_lote(self, usuarios: List[dict]) -> ResultadoLote:
+        return self.servico.criarUsuariosEmLote(usuarios)
+
+    async def buscar(self, id: str) -> Optional[User]:
+        return self.servico.buscarUsuario(id)
+
+    async def buscar_lote(self, ids: List[str]) -> List[Optional[User]]:
+        buscar = self.servico.buscarUsuario
+        return [buscar(id) for id in ids]
+
+    async def buscar_com_versao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        return self.servico.buscarUsuarioComVersao(id)
+
+    async def atualizar(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        return self.servico.atualizarUsuario(id, usuario, versao_esperada)
+
+    async def excluir(self, id: str) -> bool:
+        return self.servico.excluirUsuario(id)
+
+    async def ids(self) -> List[str]:
+        return list(self.servico._store)
+
+
+class BackendEmExecutor(BackendAssincrono):
+    """Executa cada chamada do UserService num executor, fora do loop de eventos.
+
+    Para backends lentos (disco, rede). O serviço precisa ser seguro para threads;
+    por padrão usa UserServiceConcorrente. O executor criado aqui (quando nenhum
+    é passado) é encerrado em fechar() ou na saída do ``async with``; um executor
+    recebido continua sendo de quem o passou.
+    """
+
+    def __init__(self, servico: Optional[UserService] = None, executor: Optional[Executor] = None):
+        self.servico = servico if servico is not None else UserServiceConcorrente()
+        self._dono_do_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor()
+
+    def fechar(self, esperar: bool = True):
+        if self._dono_do_executor:
+            self._executor.shutdown(wait=esperar)
+
+    close = fechar
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        # Sem bloquear o loop esperando as threads terminarem.
+        await asyncio.get_running_loop().run_in_executor(None, self.fechar)
+
+    def _executar(self, funcao, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(funcao, *args))
+
+    async def criar(self, usuario: dict) -> User:
+        return await self._executar(self.servico.criarUsuario, usuario)
+
+    async def criar_lote(self, usuarios: List[dict]) -> ResultadoLote:
+        return await self._executar(self.servico.criarUsuariosEmLote, usuarios)
+
+    async def buscar(self, id: str) -> Optional[User]:
+        return await self._executar(self.servico.buscarUsuario, id)
+
+    async def buscar_lote(self, ids: List[str]) -> List[Optional[User]]:
+        buscar = self.servico.buscarUsuario
+        return await self._executar(lambda: [buscar(id) for id in ids])
+
+    async def buscar_com_versao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        return await self._executar(self.servico.buscarUsuarioComVersao, id)
+
+    async def atualizar(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        return await self._executar(self.servico.atualizarUsuario, id, usuario, versao_esperada)
+
+    async def excluir(self, id: str) -> bool:
+        return await self._executar(self.servico.excluirUsuario, id)
+
+    async def ids(self) -> List[str]:
+        return await self._executar(list, self.servico._store)
+
+
+class AsyncUserService:
+    """Versão awaitable do UserService, sobre um BackendAssincrono plugável."""
+
+    def __init__(self, backend: Optional[BackendAssincrono] = None):
+        self.backend = backend if backend is not None else BackendEmMemoria()
+
+    async def criarUsuario(self, usuario: dict) -> User:
+        return await self.backend.criar(usuario)
+
+    async def criarUsuariosEmLote(self, usuarios: Iterable[dict]) -> ResultadoLote:
+        return await self.backend.criar_lote(list(usuarios))
+
+    async def buscarUsuario(self, id: str) -> Optional[User]:
+        return await self.backend.buscar(id)
+
+    async def buscarUsuariosEmLote(self, ids: Iterable[str]) -> List[Optional[User]]:
+        return await self.backend.buscar_lote(list(ids))
+
+    async def buscarUsuarioComVersao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        return await self.backend.buscar_com_versao(id)
+
+    async def atualizarUsuario(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        return await self.backend.atualizar(id, usuario, versao_esperada)
+
+    async def excluirUsuario(self, id: str) -> bool:
+        return await self.backend.excluir(id)
+
+    async def iterarUsuarios(self, tamanho_lote: int = 1000) -> AsyncIterator[User]:
+        # Percorre uma cópia dos ids, devolvendo o controle ao loop a cada lote;
+        # usuários excluídos durante a iteração são pulados.
+        ids = await self.backend.ids()
+        for inicio in range(0, len(ids), tamanho_lote):
+            for user in await self.buscarUsuariosEmLote(ids[inicio:inicio + tamanho_lote]):
+                if user is not None:
+                    yield user
+            await asyncio.sleep(0)
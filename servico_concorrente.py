@@ -0,0 +1,87 @@
+import threading
+from typing import List, MutableMapping, Optional
+
+from sistema_alvo import GeradorId, ResultadoLote, User, UserService
+
+
+class _Travas:
+    """Adquire várias travas na ordem dada e as libera na ordem inversa."""
+
+    __slots__ = ("_travas",)
+
+    def __init__(self, travas: List[threading.Lock]):
+        self._travas = travas
+
+    def __enter__(self):
+        for trava in self._travas:
+            trava.acquire()
+
+    def __exit__(self, *exc):
+        for trava in reversed(self._travas):
+            trava.release()
+
+
+class UserServiceConcorrente(UserService):
+    """UserService seguro para várias threads, com travas por faixa de id e de email.
+
+    Operações sobre ids (e emails) que caem em faixas diferentes não disputam a
+    mesma trava. A ordem de aquisição é sempre id antes de email, e faixas em
+    ordem crescente, o que evita deadlock.
+    """
+
+    def __init__(
+        self,
+        email_unico: bool = False,
+        faixas: int = 64,
+        gerador_id: Optional[GeradorId] = None,
+        armazenamento: Optional[MutableMapping[str, User]] = None,
+    ):
+        super().__init__(email_unico=email_unico, armazenamento=armazenamento, gerador_id=gerador_id)
+        self._travas_id = [threading.Lock() for _ in range(faixas)]
+        self._travas_email = [threading.Lock() for _ in range(faixas)]
+
+    def _trava_id(self, id) -> threading.Lock:
+        return self._travas_id[hash(id) % len(self._travas_id)]
+
+    def _travas_de_email(self, *emails) -> _Travas:
+        # Emails com tipo inválido não chegam ao índice (a validação falha antes).
+        faixas = {hash(e) % len(self._travas_email) for e in emails if isinstance(e, str)}
+        return _Travas([self._travas_email[f] for f in sorted(faixas)])
+
+    def criarUsuario(self, usuario: dict) -> User:
+        # O id é definido antes de travar, para saber qual faixa proteger.
+        payload = dict(usuario)
+        if not payload.get("id"):
+            payload["id"] = self._gerar_id()
+
+        with self._trava_id(payload["id"]), self._travas_de_email(payload.get("email")):
+            return super().criarUsuario(payload)
+
+    def _criarValidadosEmLote(self, ids: list, nomes, emails, idades, ativos) -> ResultadoLote:
+        # Onde criarUsuariosEmLote (e as cargas já validadas) conferem repetições e
+        # gravam. O lote pode tocar qualquer faixa: trava todas, na ordem global.
+        # A validação dos campos, antes disso, roda sem trava: o que ela consulta
+        # do serviço só serve para relatar erros, e é conferido de novo aqui.
+        with _Travas(self._travas_id + self._travas_email):
+            return super()._criarValidadosEmLote(ids, nomes, emails, idades, ativos)
+
+    def buscarUsuarioPorEmail(self, email: str) -> Optional[User]:
+        with self._travas_de_email(email):
+            return super().buscarUsuarioPorEmail(email)
+
+    def atualizarUsuario(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        # A comparação de versão acontece dentro da trava do id: o compare-and-set é atômico.
+        with self._trava_id(id):
+            atual = self._store.get(id)
+            if atual is None or "email" not in usuario:
+                return super().atualizarUsuario(id, usuario, versao_esperada)
+            with self._travas_de_email(atual.email, usuario["email"]):
+                return super().atualizarUsuario(id, usuario, versao_esperada)
+
+    def excluirUsuario(self, id: str) -> bool:
+        with self._trava_id(id):
+            atual = self._store.get(id)
+            if atual is None:
+                return False
+            with self._travas_de_email(atual.email):
+                return super().excluirUsuario(id)
@@ -0,0 +1,353 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from servico_concorrente import _Travas
+from sistema_alvo import (
+    GeradorId,
+    GeradorUUID4,
+    ResultadoLote,
+    User,
+    UserService,
+    ValidationError,
+    _campos_patch,
+    _compilar_atualizacao,
+    _usuario_validado,
+)
+
+
+def _para_memoria(objeto) -> tuple:
+    # Lotes viajam por memória compartilhada; pelo pipe passa só (nome, tamanho).
+    dados = pickle.dumps(objeto, protocol=pickle.HIGHEST_PROTOCOL)
+    memoria = SharedMemory(create=True, size=max(len(dados), 1))
+    memoria.buf[:len(dados)] = dados
+    memoria.close()
+    return memoria.name, len(dados)
+
+
+def _de_memoria(nome: str, tamanho: int):
+    # Quem recebe o bloco é quem o libera.
+    memoria = SharedMemory(name=nome)
+    try:
+        return pickle.loads(memoria.buf[:tamanho])
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+# Comandos executados pelo processo de cada partição, sobre um UserService local.
+
+def _criar(servico: UserService, payload: dict) -> User:
+    return servico.criarUsuario(payload)
+
+
+def _validar_criacao(servico: UserService, payload: dict):
+    # As verificações de criarUsuario que vêm antes da de email, sem gravar nada.
+    if payload["id"] in servico._store:
+        raise ValidationError("id já existe")
+    User(**servico._normalize_user_payload(payload))
+
+
+def _buscar(servico: UserService, id) -> Optional[User]:
+    return servico.buscarUsuario(id)
+
+
+def _buscar_por_email(servico: UserService, email: str) -> Optional[User]:
+    return servico.buscarUsuarioPorEmail(email)
+
+
+def _buscar_com_versao(servico: UserService, id) -> tuple:
+    return servico.buscarUsuarioComVersao(id)
+
+
+def _atualizar(servico: UserService, id, patch: dict, versao_esperada: Optional[int]) -> tuple:
+    antes = servico.buscarUsuario(id)
+    return antes, servico.atualizarUsuario(id, patch, versao_esperada)
+
+
+def _validar_atualizacao(servico: UserService, id, patch: dict):
+    atual = servico.buscarUsuario(id)
+    if atual is None:
+        raise KeyError("usuario não encontrado")
+    _compilar_atualizacao(_campos_patch(patch))(atual, patch)
+
+
+def _excluir(servico: UserService, id) -> Optional[User]:
+    antes = servico.buscarUsuario(id)
+    return antes if servico.excluirUsuario(id) else None
+
+
+def _criar_lote(servico: UserService, nome: str, tamanho: int) -> Dict[int, Exception]:
+    return servico.criarUsuariosEmLote(_de_memoria(nome, tamanho)).erros
+
+
+def _buscar_lote(servico: UserService, nome: str, tamanho: int) -> tuple:
+    # Tuplas de campos: bem mais baratas de serializar que instâncias de User.
+    buscar = servico.buscarUsuario
+    usuarios = [buscar(id) for id in _de_memoria(nome, tamanho)]
+    return _para_memoria([u and (u.id, u.nome, u.email, u.idade, u.ativo) for u in usuarios])
+
+
+def _desfazer_lote(servico: UserService, ids: List):
+    for id in ids:
+        servico.excluirUsuario(id)
+
+
+_COMANDOS = {
+    "criar": _criar,
+    "validar_criacao": _validar_criacao,
+    "buscar": _buscar,
+    "buscar_por_email": _buscar_por_email,
+    "buscar_com_versao": _buscar_com_versao,
+    "atualizar": _atualizar,
+    "validar_atualizacao": _validar_atualizacao,
+    "excluir": _excluir,
+    "criar_lote": _criar_lote,
+    "buscar_lote": _buscar_lote,
+    "desfazer_lote": _desfazer_lote,
+}
+
+
+def _executar_particao(conexao):
+    servico = UserService()
+    while True:
+        comando, *args = conexao.recv()
+        if comando == "fechar":
+            break
+        try:
+            resposta = (True, _COMANDOS[comando](servico, *args))
+        except Exception as e:
+            resposta = (False, e)
+        conexao.send(resposta)
+    conexao.close()
+
+
+class _Particao:
+    """Um processo com seu UserService, falando com o coordenador por um pipe."""
+
+    def __init__(self, contexto):
+        self.conexao, remota = contexto.Pipe()
+        self.processo = contexto.Process(target=_executar_particao, args=(remota,), daemon=True)
+        self.processo.start()
+        remota.close()
+        self.trava = threading.Lock()
+
+    def enviar(self, comando: str, *args):
+        self.conexao.send((comando, *args))
+
+    def receber(self):
+        ok, valor = self.conexao.recv()
+        if not ok:
+            raise valor
+        return valor
+
+    def chamar(self, comando: str, *args):
+        with self.trava:
+            self.enviar(comando, *args)
+            return self.receber()
+
+
+class UserServiceParticionado:
+    """UserService distribuído em ``particoes`` processos, por hash (crc32) do id.
+
+    Cada partição roda num processo próprio, fora do GIL do coordenador. As
+    operações unitárias vão pelo pipe da partição do id; as em lote são enviadas
+    a todas as partições de uma vez, por memória compartilhada. Com email_unico
+    o coordenador mantém o mapa global email -> id. Os ids sem valor são gerados
+    no coordenador, que precisa deles para rotear. Observadores e armazenamento
+    plugável não são suportados: o estado vive nos processos das partições.
+    """
+
+    def __init__(
+        self,
+        particoes: Optional[int] = None,
+        email_unico: bool = False,
+        gerador_id: Optional[GeradorId] = None,
+    ):
+        # O rastreador de memória compartilhada precisa existir antes do fork,
+        # para que coordenador e partições registrem os blocos no mesmo lugar.
+        resource_tracker.ensure_running()
+        contexto = multiprocessing.get_context()
+        self._particoes = [_Particao(contexto) for _ in range(particoes or os.cpu_count() or 1)]
+        self._email_unico = email_unico
+        self._emails: Dict[str, object] = {}
+        self._trava_emails = threading.Lock()
+        self._gerar_id = gerador_id if gerador_id is not None else GeradorUUID4()
+
+    def _particao(self, id) -> _Particao:
+        chave = id.encode("utf-8", "surrogatepass") if type(id) is str else repr(id).encode()
+        return self._particoes[zlib.crc32(chave) % len(self._particoes)]
+
+    def _reservar_email(self, email, id, validar) -> bool:
+        """Reserva email para id; True se a reserva é nova e deve ser desfeita em caso de erro."""
+        if not self._email_unico or type(email) is not str:
+            return False
+        with self._trava_emails:
+            dono = self._emails.get(email)
+            if dono is None:
+                self._emails[email] = id
+                return True
+            if dono == id:
+                return False
+        # Mantém a precedência de UserService: os erros do próprio payload vêm antes.
+        validar()
+        raise ValidationError("email já existe")
+
+    def _liberar_email(self, email, id):
+        with self._trava_emails:
+            if self._emails.get(email) == id:
+                del self._emails[email]
+
+    def criarUsuario(self, usuario: dict) -> User:
+        payload = dict(usuario)
+        if not payload.get("id"):
+            payload["id"] = self._gerar_id()
+        id = payload["id"]
+        email = payload.get("email")
+        particao = self._particao(id)
+
+        reservado = self._reservar_email(email, id, lambda: particao.chamar("validar_criacao", payload))
+        try:
+            return particao.chamar("criar", payload)
+        except BaseException:
+            if reservado:
+                self._liberar_email(email, id)
+            raise
+
+    def buscarUsuario(self, id: str) -> Optional[User]:
+        return self._particao(id).chamar("buscar", id)
+
+    def buscarUsuarioPorEmail(self, email: str) -> Optional[User]:
+        if self._email_unico:
+            with self._trava_emails:
+                id = self._emails.get(email) if isinstance(email, str) else None
+            return None if id is None else self.buscarUsuario(id)
+        # Sem o mapa global, pergunta a todas; com emails repetidos em partições
+        # diferentes, vale a primeira partição (não a ordem de criação).
+        for particao in self._particoes:
+            user = particao.chamar("buscar_por_email", email)
+            if user is not None:
+                return user
+        return None
+
+    def buscarUsuarioComVersao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        return self._particao(id).chamar("buscar_com_versao", id)
+
+    def atualizarUsuario(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        # O compare-and-set acontece dentro da partição, que executa um comando por vez.
+        particao = self._particao(id)
+        email = usuario.get("email")
+        reservado = self._reservar_email(email, id, lambda: particao.chamar("validar_atualizacao", id, usuario))
+        try:
+            antes, depois = particao.chamar("atualizar", id, usuario, versao_esperada)
+        except BaseException:
+            if reservado:
+                self._liberar_email(email, id)
+            raise
+        if reservado:
+            self._liberar_email(antes.email, id)
+        return depois
+
+    def excluirUsuario(self, id: str) -> bool:
+        antes = self._particao(id).chamar("excluir", id)
+        if antes is None:
+            return False
+        if self._email_unico:
+            self._liberar_email(antes.email, id)
+        return True
+
+    def _todas(self):
+        # Lotes tocam todas as partições: trava todas, sempre na mesma ordem.
+        travas = [p.trava for p in self._particoes]
+        if self._email_unico:
+            travas.append(self._trava_emails)
+        return _Travas(travas)
+
+    def criarUsuariosEmLote(self, usuarios: Iterable[dict]) -> ResultadoLote:
+        # Tudo ou nada, como em UserService: cada partição cria a sua parte em
+        # paralelo; se alguma parte falhar, as que foram gravadas são desfeitas.
+        usuarios = list(usuarios)
+        sem_id = [i for i, usuario in enumerate(usuarios) if not usuario.get("id")]
+        payloads = list(usuarios)
+        for i, uid in zip(sem_id, self._gerar_id.gerar_lote(len(sem_id))):
+            payloads[i] = dict(usuarios[i], id=uid)
+
+        posicoes: Dict[_Particao, List[int]] = {}
+        for i, payload in enumerate(payloads):
+            posicoes.setdefault(self._particao(payload["id"]), []).append(i)
+
+        resultado = ResultadoLote()
+        with self._todas():
+            for particao, indices in posicoes.items():
+                particao.enviar("criar_lote", *_para_memoria([payloads[i] for i in indices]))
+            gravadas = []
+            for particao, indices in posicoes.items():
+                try:
+                    erros = particao.receber()
+                except Exception as e:
+                    erros = {0: e}
+                for j, erro in erros.items():
+                    resultado.erros[indices[j]] = erro
+                if not erros:
+                    gravadas.append(particao)
+
+            novos = []
+            emails_no_lote = {}
+            for i, payload in enumerate(payloads):
+                if i in resultado.erros:
+                    continue
+                email = payload["email"]
+                if self._email_unico:
+                    if email in self._emails or email in emails_no_lote:
+                        resultado.erros[i] = ValidationError("email já existe")
+                        continue
+                    emails_no_lote[email] = payload["id"]
+                novos.append(_usuario_validado(
+                    payload["id"], payload["nome"], email, payload["idade"], payload.get("ativo", True)
+                ))
+
+            if resultado.erros:
+                for particao in gravadas:
+                    particao.enviar("desfazer_lote", [payloads[i]["id"] for i in posicoes[particao]])
+                for particao in gravadas:
+                    particao.receber()
+                resultado.erros = dict(sorted(resultado.erros.items()))
+                resultado.usuarios = [None] * len(payloads)
+                return resultado
+            self._emails.update(emails_no_lote)
+        resultado.usuarios = novos
+        return resultado
+
+    def buscarUsuariosEmLote(self, ids: Iterable) -> List[Optional[User]]:
+        ids = list(ids)
+        posicoes: Dict[_Particao, List[int]] = {}
+        for i, id in enumerate(ids):
+            posicoes.setdefault(self._particao(id), []).append(i)
+        usuarios: List[Optional[User]] = [None] * len(ids)
+        with _Travas([p.trava for p in self._particoes]):
+            for particao, indices in posicoes.items():
+                particao.enviar("buscar_lote", *_para_memoria([ids[i] for i in indices]))
+            for particao, indices in posicoes.items():
+                for i, campos in zip(indices, _de_memoria(*particao.receber())):
+                    if campos is not None:
+                        usuarios[i] = _usuario_validado(*campos)
+        return usuarios
+
+    def fechar(self):
+        for particao in self._particoes:
+            with particao.trava:
+                particao.enviar("fechar")
+                particao.conexao.close()
+        for particao in self._particoes:
+            particao.processo.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
@@ -1,14 +1,43 @@
-from dataclasses import dataclass, asdict
-from typing import Optional, Dict
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import count, islice, repeat
+from operator import itemgetter
+from typing import Callable, Optional, Dict, Iterable, Iterator, List, MutableMapping, Tuple
+import json
+import os
 import re
-import uuid
+import threading
+import time
 
 
 class ValidationError(ValueError):
     pass
 
 
+class ConflitoVersao(ValueError):
+    """A versão do usuário mudou desde a leitura (atualização com versao_esperada)."""
+
+
 EMAIL_RE = re.compile(r"^[^@ \t\r\n]+@[^@ \t\r\n]+\.[^@ \t\r\n]+$")
+_match_email = EMAIL_RE.match
+TAMANHO_CACHE_EMAIL = 65536
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_EMAIL)
+def email_valido(email: str) -> bool:
+    """Veredito de EMAIL_RE para um email (str), com cache LRU limitado.
+
+    Antes da regex, descarta sem alocação o que ela nunca aceitaria: é preciso
+    exatamente um "@", com algo antes dele, e um "." no domínio que não seja o
+    primeiro caractere após o "@".
+    """
+    arroba = email.find("@")
+    if arroba < 1 or email.find("@", arroba + 1) != -1 or email.find(".", arroba + 2) == -1:
+        return False
+    return _match_email(email) is not None
 
 
 def _validate_name(name: str):
@@ -20,7 +49,7 @@ def _validate_name(name: str):
 
 
 def _validate_email(email: str):
-    if not isinstance(email, str) or not EMAIL_RE.match(email):
+    if not isinstance(email, str) or not email_valido(email):
         raise ValidationError("email em formato inválido")
 
 
@@ -36,7 +65,130 @@ def _validate_ativo(ativo: bool):
         raise ValidationError("ativo deve ser booleano")
 
 
-@dataclass
+CAMPOS_VALIDADOS = ("nome", "email", "idade", "ativo")
+
+_VALIDADORES = {
+    "nome": "_validate_name",
+    "email": "_validate_email",
+    "idade": "_validate_idade",
+    "ativo": "_validate_ativo",
+}
+
+# Teste rápido de cada regra, sem alocação. Quando ele falha (ou não cobre o caso,
+# como subclasses de str ou nomes com espaços nas pontas), o _validate_* original
+# decide, e por isso as mensagens de ValidationError continuam as mesmas.
+_TESTES_RAPIDOS = {
+    "nome": "(type(nome) is str and 2 <= len(nome) <= 100 and not nome[0].isspace() and not nome[-1].isspace())",
+    "email": "(type(email) is str and {checar_email})",
+    "idade": "(type(idade) is int and idade >= 18)",
+    "ativo": "(ativo is True or ativo is False)",
+}
+
+
+@lru_cache(maxsize=None)
+def compilar_validador(
+    campos: Tuple[str, ...] = CAMPOS_VALIDADOS, coletar_todos: bool = False, cache_email: bool = True
+) -> Callable:
+    """Compila as regras dos campos dados numa única função, como dataclasses faz com exec.
+
+    A função recebe os valores na ordem de CAMPOS_VALIDADOS. No modo padrão ela
+    lança o primeiro ValidationError; com coletar_todos=True devolve a lista de
+    erros (vazia se tudo for válido). cache_email=False usa a regex direto, o que
+    compensa quando os emails quase nunca se repetem (cargas em lote).
+    """
+    campos = tuple(c for c in CAMPOS_VALIDADOS if c in campos)
+    teste = " and ".join(_teste_rapido(c, cache_email) for c in campos) or "True"
+    linhas = [f"def validar({', '.join(campos)}):", f"    if {teste}:"]
+    if coletar_todos:
+        linhas += ["        return []", "    erros = []"]
+        for c in campos:
+            linhas += [
+                "    try:",
+                f"        {_VALIDADORES[c]}({c})",
+                "    except ValidationError as e:",
+                "        erros.append(e)",
+            ]
+        linhas.append("    return erros")
+    else:
+        linhas.append("        return")
+        linhas += [f"    {_VALIDADORES[c]}({c})" for c in campos]
+
+    return _compilar(linhas, "validar")
+
+
+def _compilar(linhas: List[str], nome: str) -> Callable:
+    # Os nomes usados no código gerado são resolvidos nos globais deste módulo.
+    definidos = {}
+    exec("\n".join(linhas), globals(), definidos)
+    return definidos[nome]
+
+
+def _campos_patch(patch: dict) -> Tuple[str, ...]:
+    # Chave canônica do cache de _compilar_atualizacao: só os campos de User, na
+    # ordem de CAMPOS_VALIDADOS. A ordem e as chaves extras do patch não contam,
+    # então patches arbitrários não esgotam nem poluem o cache.
+    return tuple([c for c in CAMPOS_VALIDADOS if c in patch])
+
+
+@lru_cache(maxsize=None)
+def _compilar_atualizacao(campos: Tuple[str, ...]) -> Callable:
+    # Para cada conjunto de campos alterados (de _campos_patch), uma função que
+    # lê esses campos do patch, valida só eles e monta o novo User a partir do atual.
+    linhas = ["def aplicar(atual, patch):"]
+    linhas += [f"    {c} = patch[{c!r}]" for c in campos]
+    if campos:
+        linhas.append(f"    if not ({' and '.join(_teste_rapido(c) for c in campos)}):")
+        linhas += [f"        {_VALIDADORES[c]}({c})" for c in campos]
+    argumentos = ", ".join(c if c in campos else f"atual.{c}" for c in CAMPOS_VALIDADOS)
+    linhas.append(f"    return _usuario_validado(atual.id, {argumentos})")
+    return _compilar(linhas, "aplicar")
+
+
+def _teste_rapido(campo: str, cache_email: bool = True) -> str:
+    checar_email = "email_valido(email)" if cache_email else "_match_email(email) is not None"
+    return _TESTES_RAPIDOS[campo].format(checar_email=checar_email)
+
+
+def validar_campos(valores: dict, coletar_todos: bool = False):
+    """Valida só os campos de User presentes em valores (criação ou atualização parcial)."""
+    campos = tuple([c for c in CAMPOS_VALIDADOS if c in valores])
+    return compilar_validador(campos, coletar_todos)(*[valores[c] for c in campos])
+
+
+_validar_usuario = compilar_validador()
+_validar_usuario_lote = compilar_validador(cache_email=False)
+
+_LER_NOME = itemgetter("nome")
+_LER_EMAIL = itemgetter("email")
+_LER_IDADE = itemgetter("idade")
+
+
+def _colunas_do_lote(usuarios: List[dict]) -> Optional[tuple]:
+    # Caminho rápido de criarUsuariosEmLote: lê e valida o lote coluna por
+    # coluna, com os laços em C (map, set, min, max, all). Devolve None quando
+    # algum item precisa da validação item a item (campo faltando, regra
+    # violada, tipo que não é exatamente str/int/bool, payload que não é dict),
+    # que é quem produz os erros.
+    try:
+        nomes = list(map(_LER_NOME, usuarios))
+        emails = list(map(_LER_EMAIL, usuarios))
+        idades = list(map(_LER_IDADE, usuarios))
+        ids = list(map(dict.get, usuarios, repeat("id")))
+        ativos = list(map(dict.get, usuarios, repeat("ativo"), repeat(True)))
+    except (KeyError, TypeError):
+        return None
+    if (
+        set(map(type, nomes)) != {str} or set(map(type, emails)) != {str}
+        or set(map(type, idades)) != {int} or set(map(type, ativos)) != {bool}
+    ):
+        return None
+    tamanhos = list(map(len, map(str.strip, nomes)))
+    if min(tamanhos) < 2 or max(tamanhos) > 100 or min(idades) < 18 or not all(map(_match_email, emails)):
+        return None
+    return ids, nomes, emails, idades, ativos
+
+
+@dataclass(slots=True)
 class User:
     id: str
     nome: str
@@ -45,26 +197,407 @@ class User:
     ativo: bool = True
 
     def __post_init__(self):
-        _validate_name(self.nome)
-        _validate_email(self.email)
-        _validate_idade(self.idade)
-        _validate_ativo(self.ativo)
+        _validar_usuario(self.nome, self.email, self.idade, self.ativo)
 
     def to_dict(self):
-        return asdict(self)
+        # Todos os campos são imutáveis (str/int/bool), então não há o que copiar
+        # em profundidade como dataclasses.asdict faz.
+        return {"id": self.id, "nome": self.nome, "email": self.email, "idade": self.idade, "ativo": self.ativo}
 
 
-class UserService:
+_json_compacto = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+_json_str = json.encoder.encode_basestring
+
+
+def usuarios_para_dicts(usuarios: Iterable[User]) -> List[dict]:
+    return [
+        {"id": u.id, "nome": u.nome, "email": u.email, "idade": u.idade, "ativo": u.ativo}
+        for u in usuarios
+    ]
+
+
+def _linha_json(u: User) -> str:
+    # Os tipos de nome/email/idade/ativo são garantidos pela validação; só o id
+    # (que não é validado) pode exigir o encoder genérico.
+    if type(u.id) is not str:
+        return _json_compacto(u.to_dict())
+    return (
+        f'{{"id":{_json_str(u.id)},"nome":{_json_str(u.nome)},"email":{_json_str(u.email)},'
+        f'"idade":{int.__repr__(u.idade)},"ativo":{"true" if u.ativo else "false"}}}'
+    )
+
+
+def usuarios_para_jsonl(usuarios: Iterable[User]) -> bytes:
+    linhas = [_linha_json(u) for u in usuarios]
+    if not linhas:
+        return b""
+    linhas.append("")
+    return "\n".join(linhas).encode("utf-8")
+
+
+_FALTANDO = object()
+
+
+def _usuario_validado(id, nome, email, idade, ativo) -> User:
+    # Monta o User sem reexecutar __post_init__; os campos já foram validados.
+    user = User.__new__(User)
+    user.id = id
+    user.nome = nome
+    user.email = email
+    user.idade = idade
+    user.ativo = ativo
+    return user
+
+
+def _usuarios_validados(ids, nomes, emails, idades, ativos) -> List[User]:
+    # _usuario_validado para colunas inteiras, sem uma chamada por usuário.
+    novo = User.__new__
+    usuarios = []
+    anexar = usuarios.append
+    for id, nome, email, idade, ativo in zip(ids, nomes, emails, idades, ativos):
+        user = novo(User)
+        user.id = id
+        user.nome = nome
+        user.email = email
+        user.idade = idade
+        user.ativo = ativo
+        anexar(user)
+    return usuarios
+
+
+_BITS_VERSAO_4 = bytes.maketrans(bytes(range(256)), bytes((b & 0x0F) | 0x40 for b in range(256)))
+_BITS_VARIANTE_RFC = bytes.maketrans(bytes(range(256)), bytes((b & 0x3F) | 0x80 for b in range(256)))
+
+
+def _uuid4_em_lote(n: int) -> List[str]:
+    # Uma única leitura de os.urandom para n ids. Cada grupo do UUID é formatado
+    # para todos os ids de uma vez (bytes.hex com separador), e os bits de versão
+    # e variante são ajustados com translate, como uuid.UUID(version=4) faria.
+    bruto = os.urandom(16 * n)
+    versao = bytearray(bruto[6 * n:8 * n])
+    versao[0::2] = versao[0::2].translate(_BITS_VERSAO_4)
+    variante = bytearray(bruto[8 * n:10 * n])
+    variante[0::2] = variante[0::2].translate(_BITS_VARIANTE_RFC)
+    return list(map("-".join, zip(
+        bruto[:4 * n].hex(" ", 4).split(),
+        bruto[4 * n:6 * n].hex(" ", 2).split(),
+        versao.hex(" ", 2).split(),
+        variante.hex(" ", 2).split(),
+        bruto[10 * n:].hex(" ", 6).split(),
+    )))
+
+
+class GeradorId(ABC):
+    """Gera ids para usuários criados sem id. gerar_lote(n) pré-aloca n ids de uma vez."""
+
+    @abstractmethod
+    def __call__(self) -> str:
+        ...
+
+    def gerar_lote(self, n: int) -> List[str]:
+        return [self() for _ in range(n)]
+
+
+class GeradorUUID4(GeradorId):
+    """UUID versão 4 aleatório (o padrão). Os ids saem de um buffer preenchido
+    de ``tamanho_buffer`` em ``tamanho_buffer``, com uma leitura de os.urandom cada."""
+
+    def __init__(self, tamanho_buffer: int = 256):
+        self.tamanho_buffer = tamanho_buffer
+        self._buffer: List[str] = []
+
+    def __call__(self) -> str:
+        try:
+            return self._buffer.pop()
+        except IndexError:
+            # list.pop é atômico; se duas threads reabastecerem, só sobram ids a mais.
+            self._buffer = _uuid4_em_lote(self.tamanho_buffer)
+            return self._buffer.pop()
+
+    def gerar_lote(self, n: int) -> List[str]:
+        return _uuid4_em_lote(n)
+
+
+_MASCARA_74 = (1 << 74) - 1
+
+
+class GeradorUUID7(GeradorId):
+    """UUID versão 7 (RFC 9562): 48 bits de milissegundos Unix seguidos de 74 bits
+    aleatórios. Os ids crescem com o tempo, o que mantém as inserções no fim do
+    índice de backends persistentes. Dentro do mesmo milissegundo a parte aleatória
+    é incrementada, então os ids de um gerador são estritamente crescentes."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._ultimo_ms = 0
+        self._aleatorio = 0
+
+    def _reservar(self, n: int) -> Tuple[int, int]:
+        with self._trava:
+            ms = time.time_ns() // 1_000_000
+            if ms > self._ultimo_ms:
+                # Deixa folga no topo para os incrementos dentro do milissegundo.
+                self._ultimo_ms = ms
+                self._aleatorio = int.from_bytes(os.urandom(10), "big") >> 7
+            if self._aleatorio + n > _MASCARA_74:
+                self._ultimo_ms += 1
+                self._aleatorio = 0
+            inicio = self._aleatorio + 1
+            self._aleatorio += n
+            return self._ultimo_ms, inicio
+
+    @staticmethod
+    def _prefixo(ms: int) -> str:
+        # Os 48 bits de tempo e o dígito de versão são comuns a todo o lote.
+        return f"{ms >> 16:08x}-{ms & 0xFFFF:04x}-7"
+
+    def __call__(self) -> str:
+        ms, a = self._reservar(1)
+        return f"{self._prefixo(ms)}{a >> 62:03x}-{a >> 48 & 0x3FFF | 0x8000:04x}-{a & 0xFFFFFFFFFFFF:012x}"
+
+    def gerar_lote(self, n: int) -> List[str]:
+        ms, inicio = self._reservar(n)
+        prefixo = self._prefixo(ms)
+        return [
+            f"{prefixo}{a >> 62:03x}-{a >> 48 & 0x3FFF | 0x8000:04x}-{a & 0xFFFFFFFFFFFF:012x}"
+            for a in range(inicio, inicio + n)
+        ]
+
+
+class GeradorSequencial(GeradorId):
+    """Contador monotônico (prefixo + número), barato e previsível; pensado para testes."""
+
+    def __init__(self, prefixo: str = "", inicio: int = 1):
+        self.prefixo = prefixo
+        self._contador = count(inicio)
+
+    def __call__(self) -> str:
+        return f"{self.prefixo}{next(self._contador)}"
+
+    def gerar_lote(self, n: int) -> List[str]:
+        # list(islice(count)) roda inteiro em C, sem ceder o GIL: a faixa sai contígua.
+        prefixo = self.prefixo
+        return [f"{prefixo}{i}" for i in list(islice(self._contador, n))]
+
+
+@dataclass
+class ResultadoLote:
+    usuarios: List[Optional[User]] = field(default_factory=list)
+    erros: Dict[int, Exception] = field(default_factory=dict)
+
+    @property
+    def confirmado(self) -> bool:
+        return not self.erros
+
+
+# Condição de cada filtro de consultarUsuarios, sobre o User u.
+_CONDICOES_CONSULTA = {
+    "ativo": "u.ativo is ativo",
+    "idade_min": "u.idade >= idade_min",
+    "idade_max": "u.idade <= idade_max",
+    "prefixo_nome": "u.nome.startswith(prefixo_nome)",
+    "filtro": "filtro(u)",
+}
+
+
+@lru_cache(maxsize=256)
+def _compilar_consulta(filtros: Tuple[str, ...], campos: Optional[Tuple[str, ...]]) -> Callable:
+    # Um laço gerado com só os filtros usados e a projeção embutida custa bem
+    # menos por usuário que uma cadeia de filter/map com lambdas.
+    if campos is not None:
+        desconhecidos = set(campos) - set(User.__slots__)
+        if desconhecidos:
+            raise ValueError(f"campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    item = "u" if campos is None else "{" + ", ".join(f"{c!r}: u.{c}" for c in campos) + "}"
+    linhas = [f"def consultar(usuarios, {', '.join(_CONDICOES_CONSULTA)}):", "    for u in usuarios:"]
+    if filtros:
+        linhas.append(f"        if {' and '.join(_CONDICOES_CONSULTA[f] for f in filtros)}:")
+        linhas.append(f"            yield {item}")
+    else:
+        linhas.append(f"        yield {item}")
+    return _compilar(linhas, "consultar")
+
+
+@dataclass
+class Pagina:
+    itens: list = field(default_factory=list)
+    # Posição de inserção do primeiro item da próxima página; None se não há mais itens.
+    cursor: Optional[int] = None
+
+
+class IndiceEmail:
+    """Índice em memória email -> ids, em ordem de criação."""
+
     def __init__(self):
-        self._store: Dict[str, User] = {}
+        # email -> id; só quando o email se repete o valor vira um dict usado
+        # como conjunto ordenado de ids. O caso comum não paga um dict por usuário.
+        self._ids: Dict[str, object] = {}
+
+    def __contains__(self, email) -> bool:
+        return email in self._ids
+
+    def primeiro_id(self, email: str) -> Optional[str]:
+        ids = self._ids.get(email)
+        return next(iter(ids)) if type(ids) is dict else ids
+
+    def adicionar(self, user: User):
+        self.adicionar_email(user.email, user.id)
+
+    def adicionar_email(self, email: str, id: str):
+        ids = self._ids.get(email, _FALTANDO)
+        if ids is _FALTANDO:
+            self._ids[email] = id
+        elif type(ids) is dict:
+            ids[id] = None
+        else:
+            self._ids[email] = {ids: None, id: None}
+
+    def adicionar_lote(self, emails, ids):
+        # Emails novos e sem repetição (o caso de uma carga) entram com um único update.
+        if len(set(emails)) == len(emails) and self._ids.keys().isdisjoint(emails):
+            self._ids.update(zip(emails, ids))
+        else:
+            for email, id in zip(emails, ids):
+                self.adicionar_email(email, id)
+
+    def remover(self, user: User):
+        ids = self._ids[user.email]
+        if type(ids) is not dict:
+            del self._ids[user.email]
+            return
+        del ids[user.id]
+        if len(ids) == 1:
+            self._ids[user.email] = next(iter(ids))
+
+
+class VersoesEmMemoria(dict):
+    """Versões dos usuários (id -> int) num dict, para backends sem versoes()."""
+
+    def maior(self) -> int:
+        return max(self.values(), default=0)
+
+
+class OrdemInsercao:
+    """Posição de inserção de cada usuário, crescente como o seq do SQLite.
+
+    Serve os cursores de paginação de armazenamentos sem percorrer_desde():
+    uma posição continua válida depois que o usuário dela é excluído, e retomar
+    a partir dela custa uma busca binária. É mantida como observador do serviço.
+    """
+
+    def __init__(self, servico: "UserService"):
+        self._trava = threading.Lock()
+        self._posicao: Dict[str, int] = {}
+        # Entradas em ordem de posição; as de usuários excluídos ficam até a compactação.
+        self._posicoes = array("Q")
+        self._ids: list = []
+        self._proxima = count(1)
+        with self._trava:
+            # Registra antes de listar os ids: o que mudar no meio chega ao
+            # observador, que espera a trava e descarta o que já foi contado.
+            servico.registrarObservador(self._observar)
+            for id in list(servico._store):
+                self._acrescentar(id)
+
+    def _acrescentar(self, id):
+        posicao = next(self._proxima)
+        self._posicao[id] = posicao
+        self._posicoes.append(posicao)
+        self._ids.append(id)
+
+    def _observar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        if operacao == "criar":
+            with self._trava:
+                if depois.id not in self._posicao:
+                    self._acrescentar(depois.id)
+        elif operacao == "excluir":
+            with self._trava:
+                if self._posicao.pop(antes.id, None) is not None and len(self._ids) > 2 * len(self._posicao):
+                    self._compactar()
+
+    def _compactar(self):
+        vivas = [(p, id) for p, id in zip(self._posicoes, self._ids) if self._posicao.get(id) == p]
+        self._posicoes = array("Q", [p for p, _ in vivas])
+        self._ids = [id for _, id in vivas]
+
+    def percorrer_desde(self, posicao: int, tamanho_bloco: int = 256) -> Iterator[Tuple[int, str]]:
+        """(posição, id) dos usuários vivos com posição >= posicao, em ordem."""
+        while True:
+            # Cada bloco é lido sob a trava e reposicionado por busca binária, então
+            # criações, exclusões e compactações entre os blocos não atrapalham.
+            with self._trava:
+                i = bisect_left(self._posicoes, posicao)
+                posicoes = self._posicoes[i:i + tamanho_bloco]
+                ids = self._ids[i:i + tamanho_bloco]
+                bloco = [(p, id) for p, id in zip(posicoes, ids) if self._posicao.get(id) == p]
+            if not posicoes:
+                return
+            yield from bloco
+            posicao = posicoes[-1] + 1
+
+
+_TRAVA_ORDEM = threading.Lock()
+
+
+# Observador de mutações: (operacao, antes, depois), com operacao em
+# "criar" / "atualizar" / "excluir"; antes/depois são None quando não se aplicam.
+Observador = Callable[[str, Optional[User], Optional[User]], None]
+
+
+class UserService:
+    def __init__(
+        self,
+        email_unico: bool = False,
+        armazenamento: Optional[MutableMapping[str, User]] = None,
+        gerador_id: Optional[GeradorId] = None,
+    ):
+        # O armazenamento é qualquer mapeamento id -> User; o padrão é um dict em memória.
+        # Backends com índice de email próprio o expõem via indice_email().
+        self._store: MutableMapping[str, User] = {} if armazenamento is None else armazenamento
+        if hasattr(self._store, "indice_email"):
+            self._por_email = self._store.indice_email()
+        else:
+            self._por_email = IndiceEmail()
+            for user in self._store.values():
+                self._por_email.adicionar(user)
+        self._email_unico = email_unico
+        self._gerar_id = gerador_id if gerador_id is not None else GeradorUUID4()
+        self._observadores: List[Observador] = []
+        # id -> versão, tirada de um contador único do serviço a cada criação e
+        # atualização: um id excluído e recriado nunca volta a uma versão já vista.
+        # Backends que guardam a versão junto do registro a expõem via versoes()
+        # (no SQLite ela sobrevive a reinícios e não ocupa memória por usuário).
+        # Usuários carregados sem passar por criarUsuario estão na versão 0.
+        if hasattr(self._store, "versoes"):
+            self._versoes = self._store.versoes()
+        else:
+            self._versoes = VersoesEmMemoria()
+        self._proxima_versao = count(self._versoes.maior() + 1)
+        self._ordem: Optional[OrdemInsercao] = None
+
+    def registrarObservador(self, observador: Observador):
+        # Chamado depois de cada mutação bem-sucedida, na mesma thread da chamada.
+        # A lista é trocada, nunca alterada: uma notificação em curso segue a antiga.
+        self._observadores = self._observadores + [observador]
+
+    def removerObservador(self, observador: Observador):
+        self._observadores = [o for o in self._observadores if o != observador]
+
+    def _notificar(self, operacao: str, antes: Optional[User], depois: Optional[User]):
+        for observador in self._observadores:
+            observador(operacao, antes, depois)
 
     def _normalize_user_payload(self, payload: dict) -> dict:
         allowed = {"id", "nome", "email", "idade", "ativo"}
         return {k: v for k, v in payload.items() if k in allowed}
 
+    def _verificar_email_disponivel(self, email: str):
+        if self._email_unico and email in self._por_email:
+            raise ValidationError("email já existe")
+
     def criarUsuario(self, usuario: dict) -> User:
         payload = self._normalize_user_payload(usuario)
-        uid = payload.get("id") or str(uuid.uuid4())
+        uid = payload.get("id") or self._gerar_id()
 
         if uid in self._store:
             raise ValidationError("id já existe")
@@ -74,25 +607,290 @@ class UserService:
             payload["ativo"] = True
 
         user = User(**payload)
+        self._verificar_email_disponivel(user.email)
         self._store[user.id] = user
+        self._versoes[user.id] = next(self._proxima_versao)
+        self._por_email.adicionar(user)
+        if self._observadores:
+            for observador in self._observadores:
+                observador("criar", None, user)
         return user
 
+    def criarUsuariosEmLote(self, usuarios: Iterable[dict]) -> ResultadoLote:
+        # Tudo ou nada: se algum item for inválido, nenhum usuário é gravado e
+        # resultado.erros indica o erro de cada item pela sua posição no lote.
+        usuarios = list(usuarios)
+        colunas = _colunas_do_lote(usuarios) if usuarios else None
+        if colunas is None:
+            return self._criarUsuariosEmLoteItemAItem(usuarios)
+        return self._criarValidadosEmLote(*colunas)
+
+    def _criarUsuariosEmLoteItemAItem(self, usuarios: List[dict]) -> ResultadoLote:
+        # Para lotes que _colunas_do_lote não aceita: valida item a item, para
+        # dizer o erro de cada posição.
+        erros = {}
+        colunas = ([], [], [], [], [])
+        ids_no_lote = set()
+        emails_no_lote = set()
+
+        for i, usuario in enumerate(usuarios):
+            get = usuario.get
+            uid = get("id")
+            nome = get("nome", _FALTANDO)
+            email = get("email", _FALTANDO)
+            idade = get("idade", _FALTANDO)
+            ativo = get("ativo", True)
+
+            # Mesma ordem de criarUsuario: id repetido, depois os campos, depois o email.
+            if uid and (uid in self._store or uid in ids_no_lote):
+                erros[i] = ValidationError("id já existe")
+                continue
+            try:
+                if nome is _FALTANDO or email is _FALTANDO or idade is _FALTANDO:
+                    # Deixa o próprio User produzir o TypeError de campo obrigatório,
+                    # como em criarUsuario.
+                    payload = self._normalize_user_payload(usuario)
+                    payload["id"] = uid
+                    User(**payload)
+                _validar_usuario_lote(nome, email, idade, ativo)
+            except (TypeError, ValidationError) as e:
+                erros[i] = e
+                continue
+
+            if self._email_unico:
+                if email in self._por_email or email in emails_no_lote:
+                    erros[i] = ValidationError("email já existe")
+                    continue
+                emails_no_lote.add(email)
+            if uid:
+                ids_no_lote.add(uid)
+            for coluna, valor in zip(colunas, (uid, nome, email, idade, ativo)):
+                coluna.append(valor)
+
+        if erros:
+            return ResultadoLote([None] * len(usuarios), erros)
+        return self._criarValidadosEmLote(*colunas)
+
+    def _criarValidadosEmLote(self, ids: list, nomes, emails, idades, ativos) -> ResultadoLote:
+        """Grava, tudo ou nada, um lote cujos campos já foram validados.
+
+        Só confere ids (e, com email_unico, emails) repetidos, no lote e contra
+        o serviço; ids vazios são gerados. Usado pelos caminhos de
+        criarUsuariosEmLote e por cargas que validam por conta própria.
+        """
+        informados = list(filter(None, ids))
+        if (
+            len(set(informados)) != len(informados)
+            or not self._store.keys().isdisjoint(informados)
+            or self._email_unico
+            and (len(set(emails)) != len(emails) or any(map(self._por_email.__contains__, emails)))
+        ):
+            return ResultadoLote([None] * len(ids), self._erros_de_repeticao(ids, emails))
+
+        if len(informados) < len(ids):
+            gerados = self._gerar_id.gerar_lote(len(ids) - len(informados))
+            vistos = set(informados)
+            vistos.update(gerados)
+            if len(vistos) < len(ids) or not self._store.keys().isdisjoint(gerados):
+                return ResultadoLote([None] * len(ids), self._erros_de_repeticao(ids, emails, gerados))
+            proximo = iter(gerados).__next__
+            ids = [uid or proximo() for uid in ids]
+
+        novos = _usuarios_validados(ids, nomes, emails, idades, ativos)
+        self._store.update(zip(ids, novos))
+        self._versoes.update(zip(ids, self._proxima_versao))
+        self._por_email.adicionar_lote(emails, ids)
+        if self._observadores:
+            for user in novos:
+                self._notificar("criar", None, user)
+        return ResultadoLote(novos)
+
+    def _erros_de_repeticao(self, ids: list, emails, gerados: Iterable[str] = ()) -> Dict[int, Exception]:
+        # Os erros de id e email repetido de cada posição, como no item a item:
+        # a primeira ocorrência vale, as seguintes (e as que já existem) falham.
+        erros = {}
+        proximo = iter(gerados).__next__
+        ids_no_lote = set()
+        emails_no_lote = set()
+        for i, (uid, email) in enumerate(zip(ids, emails)):
+            if uid and (uid in self._store or uid in ids_no_lote):
+                erros[i] = ValidationError("id já existe")
+                continue
+            if self._email_unico:
+                if email in self._por_email or email in emails_no_lote:
+                    erros[i] = ValidationError("email já existe")
+                    continue
+                emails_no_lote.add(email)
+            if uid:
+                ids_no_lote.add(uid)
+        # Ids gerados só são conferidos quando o resto do lote está em ordem.
+        if not erros and gerados:
+            for i, uid in enumerate(ids):
+                if not uid:
+                    uid = proximo()
+                    if uid in self._store or uid in ids_no_lote:
+                        erros[i] = ValidationError("id já existe")
+                    ids_no_lote.add(uid)
+        return erros
+
     def buscarUsuario(self, id: str) -> Optional[User]:
         return self._store.get(id)
 
-    def atualizarUsuario(self, id: str, usuario: dict) -> User:
-        if id not in self._store:
-            raise KeyError("usuario não encontrado")
+    def buscarUsuarioPorEmail(self, email: str) -> Optional[User]:
+        id = self._por_email.primeiro_id(email)
+        return None if id is None else self._store.get(id)
 
-        payload = self._normalize_user_payload(usuario)
-        payload["id"] = id
+    def consultarUsuarios(
+        self,
+        *,
+        ativo: Optional[bool] = None,
+        idade_min: Optional[int] = None,
+        idade_max: Optional[int] = None,
+        prefixo_nome: Optional[str] = None,
+        filtro: Optional[Callable[[User], bool]] = None,
+        campos: Optional[Iterable[str]] = None,
+        cursor: Optional[int] = None,
+        deslocamento: int = 0,
+        limite: Optional[int] = None,
+    ) -> Iterator:
+        """Percorre os usuários, em ordem de criação, sem copiar o armazenamento.
+
+        Os filtros são combinados com "e". cursor (de Pagina.cursor) retoma a
+        varredura nessa posição de inserção; deslocamento e limite valem sobre o
+        resultado já filtrado. Com campos, cada item é um dict só com esses
+        campos; sem, é o próprio User. O resultado é preguiçoso: no armazenamento
+        padrão (dict), criar ou excluir usuários antes de esgotá-lo causa
+        RuntimeError, exceto com cursor; para isso use paginarUsuarios.
+        """
+        if cursor is None:
+            usuarios = self._store.values()
+        else:
+            usuarios = map(itemgetter(1), self._percorrer_desde(cursor))
+        usuarios = self._filtrar(
+            usuarios, ativo=ativo, idade_min=idade_min, idade_max=idade_max,
+            prefixo_nome=prefixo_nome, filtro=filtro, campos=campos,
+        )
+        if deslocamento or limite is not None:
+            usuarios = islice(usuarios, deslocamento, None if limite is None else deslocamento + limite)
+        return usuarios
+
+    @staticmethod
+    def _filtrar(usuarios: Iterable[User], *, campos: Optional[Iterable[str]] = None, **filtros) -> Iterator:
+        valores = dict.fromkeys(_CONDICOES_CONSULTA)
+        for nome, valor in filtros.items():
+            if nome not in valores:
+                raise TypeError(f"filtro desconhecido: {nome!r}")
+            valores[nome] = valor
+        consultar = _compilar_consulta(
+            tuple(f for f, v in valores.items() if v is not None),
+            None if campos is None else tuple(campos),
+        )
+        return consultar(usuarios, **valores)
+
+    def _percorrer_desde(self, posicao: int) -> Iterator[Tuple[int, User]]:
+        # (posição, User) a partir da posição de inserção dada. Backends que
+        # sabem fazer isso (ex.: SQLite, pelo seq) o fazem; nos outros, a
+        # OrdemInsercao é montada na primeira paginação e mantida dali em diante.
+        if hasattr(self._store, "percorrer_desde"):
+            return self._store.percorrer_desde(posicao)
+        if self._ordem is None:
+            with _TRAVA_ORDEM:
+                if self._ordem is None:
+                    self._ordem = OrdemInsercao(self)
+        return self._usuarios_nas_posicoes(self._ordem.percorrer_desde(posicao))
+
+    def _usuarios_nas_posicoes(self, posicoes: Iterator[Tuple[int, str]]) -> Iterator[Tuple[int, User]]:
+        get = self._store.get
+        for posicao, id in posicoes:
+            user = get(id)
+            if user is not None:
+                yield posicao, user
+
+    def paginarUsuarios(self, tamanho_pagina: int, cursor: Optional[int] = None, **filtros) -> Pagina:
+        """Uma página de consultarUsuarios; passe pagina.cursor para obter a seguinte.
 
-        merged = self._store[id].to_dict()
-        merged.update(payload)
+        O cursor é a posição de inserção do primeiro item da próxima página:
+        continua válido se esse usuário for excluído entre as páginas, e retomar
+        dele não percorre de novo os itens anteriores.
+        """
+        if tamanho_pagina < 1:
+            raise ValueError("tamanho_pagina deve ser pelo menos 1")
+        posicao = None
 
-        updated = User(**merged)
+        def usuarios():
+            nonlocal posicao
+            for posicao, user in self._percorrer_desde(0 if cursor is None else cursor):
+                yield user
+
+        # O filtro gerado devolve cada item logo depois de lê-lo: ao pedir o item
+        # além da página, posicao é a dele, que vira o cursor da próxima.
+        itens = []
+        for item in self._filtrar(usuarios(), **filtros):
+            if len(itens) == tamanho_pagina:
+                return Pagina(itens, posicao)
+            itens.append(item)
+        return Pagina(itens, None)
+
+    def versaoUsuario(self, id: str) -> Optional[int]:
+        return self._versoes.get(id, 0) if id in self._store else None
+
+    def buscarUsuarioComVersao(self, id: str) -> Tuple[Optional[User], Optional[int]]:
+        # A versão é lida antes do User: se uma atualização acontecer no meio,
+        # o par fica com versão antiga e o compare-and-set falha (nunca o inverso).
+        versao = self._versoes.get(id, 0)
+        user = self._store.get(id)
+        return (None, None) if user is None else (user, versao)
+
+    def atualizarUsuario(self, id: str, usuario: dict, versao_esperada: Optional[int] = None) -> User:
+        """Aplica o patch; com versao_esperada, só grava se a versão atual for essa.
+
+        Aqui a comparação e a gravação não são atômicas entre threads: só
+        UserServiceConcorrente, que compara dentro da trava do id, garante o
+        compare-and-set sem corrida.
+        """
+        atual = self._store.get(id)
+        if atual is None:
+            raise KeyError("usuario não encontrado")
+        versao = self._versoes.get(id, 0)
+        if versao_esperada is not None and versao_esperada != versao:
+            raise ConflitoVersao(f"versão esperada {versao_esperada}, atual {versao}")
+
+        # Só os campos presentes no patch são validados; o id nunca é alterado.
+        updated = _compilar_atualizacao(_campos_patch(usuario))(atual, usuario)
+        if updated.email != atual.email:
+            self._verificar_email_disponivel(updated.email)
+            self._por_email.remover(atual)
+            self._por_email.adicionar(updated)
         self._store[id] = updated
+        self._versoes[id] = next(self._proxima_versao)
+        if self._observadores:
+            for observador in self._observadores:
+                observador("atualizar", atual, updated)
         return updated
 
+    def atualizarUsuarioComRetentativa(
+        self, id: str, alterar: Callable[[User], dict], tentativas: int = 16
+    ) -> User:
+        """Lê o usuário, calcula o patch com alterar(user) e grava com compare-and-set,
+        repetindo se outra atualização vencer no meio. Nenhuma trava fica presa
+        durante alterar; uma nova tentativa custa só uma nova leitura."""
+        for _ in range(tentativas):
+            user, versao = self.buscarUsuarioComVersao(id)
+            if user is None:
+                raise KeyError("usuario não encontrado")
+            try:
+                return self.atualizarUsuario(id, alterar(user), versao_esperada=versao)
+            except ConflitoVersao:
+                continue
+        raise ConflitoVersao(f"{tentativas} tentativas sem conseguir atualizar {id!r}")
+
     def excluirUsuario(self, id: str) -> bool:
-        return self._store.pop(id, None) is not None
+        user = self._store.pop(id, None)
+        if user is None:
+            return False
+        self._versoes.pop(id, None)
+        self._por_email.remover(user)
+        if self._observadores:
+            for observador in self._observadores:
+                observador("excluir", user, None)
+        return True
@@ -0,0 +1,184 @@
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Union
+
+from sistema_alvo import IndiceEmail, User, UserService, VersoesEmMemoria, _usuario_validado
+
+# Formato (little-endian):
+#   cabeçalho: MAGICO, n, e o deslocamento de cada uma das 10 seções abaixo
+#   tipos_id     n bytes ("s" = str, "i" = int)
+#   id_pos       n+1 uint64, posições em caracteres dentro de ids
+#   ids          texto UTF-8 com todos os ids concatenados
+#   email_pos    n+1 uint64, posições em caracteres dentro de emails
+#   emails       texto UTF-8 com todos os emails concatenados
+#   nome_pos     n+1 uint64, posições em bytes dentro de nomes
+#   nomes        texto UTF-8 com todos os nomes concatenados
+#   idades       n int64
+#   ativos       n bytes (0/1)
+#   versoes      n uint64 (versão de cada usuário, para o compare-and-set)
+# ids e emails são decodificados inteiros na carga (alimentam os índices); nomes
+# ficam no mmap e só são decodificados quando o User é materializado.
+MAGICO = b"USRSNAP2"
+_CABECALHO = struct.Struct("<8sQ10Q")
+
+
+def _colunas_texto(valores: List[str], posicoes_em_bytes: bool):
+    posicoes = array("Q", [0])
+    partes = []
+    total = 0
+    for valor in valores:
+        parte = valor.encode("utf-8")
+        partes.append(parte)
+        total += len(parte) if posicoes_em_bytes else len(valor)
+        posicoes.append(total)
+    return posicoes.tobytes(), b"".join(partes)
+
+
+def salvar_snapshot(servico: UserService, caminho: str):
+    """Grava todos os usuários do serviço num arquivo de snapshot (escrita atômica)."""
+    usuarios = list(servico._store.values())
+    tipos = bytearray()
+    ids = []
+    for user in usuarios:
+        if type(user.id) is str:
+            tipos += b"s"
+            ids.append(user.id)
+        elif type(user.id) is int:
+            tipos += b"i"
+            ids.append(str(user.id))
+        else:
+            raise ValueError(f"snapshot não suporta id do tipo {type(user.id).__name__}")
+    try:
+        idades = array("q", [user.idade for user in usuarios])
+    except OverflowError:
+        raise ValueError("snapshot só suporta idade em 64 bits") from None
+
+    secoes = [
+        bytes(tipos),
+        *_colunas_texto(ids, posicoes_em_bytes=False),
+        *_colunas_texto([user.email for user in usuarios], posicoes_em_bytes=False),
+        *_colunas_texto([user.nome for user in usuarios], posicoes_em_bytes=True),
+        idades.tobytes(),
+        bytes(user.ativo for user in usuarios),
+        array("Q", [servico._versoes.get(user.id, 0) for user in usuarios]).tobytes(),
+    ]
+
+    deslocamentos = []
+    posicao = _CABECALHO.size
+    for secao in secoes:
+        posicao += -posicao % 8  # alinha as seções para memoryview.cast
+        deslocamentos.append(posicao)
+        posicao += len(secao)
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(_CABECALHO.pack(MAGICO, len(usuarios), *deslocamentos))
+        for deslocamento, secao in zip(deslocamentos, secoes):
+            arquivo.write(b"\0" * (deslocamento - arquivo.tell()))
+            arquivo.write(secao)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+class ArmazenamentoSnapshot(MutableMapping):
+    """Armazenamento carregado de um snapshot via mmap, com materialização preguiçosa.
+
+    Cada id aponta para a linha do snapshot até ser lido pela primeira vez; aí o
+    User é montado e fica guardado no lugar da linha. Escritas substituem a linha.
+    fechar() libera o mmap; depois dele só os Users já materializados são legíveis.
+    """
+
+    def __init__(self, caminho: str, confiavel: bool = True):
+        with open(caminho, "rb") as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magico, n, *deslocamentos = _CABECALHO.unpack_from(self._mapa)
+        if magico != MAGICO:
+            self._mapa.close()
+            raise ValueError("arquivo não é um snapshot de usuários")
+        fins = deslocamentos[1:] + [len(self._mapa)]
+        visao = memoryview(self._mapa)
+        tipos, id_pos, ids, email_pos, emails, nome_pos, nomes, idades, ativos, versoes = (
+            visao[inicio:fim] for inicio, fim in zip(deslocamentos, fins)
+        )
+
+        self._confiavel = confiavel
+        self._nome_pos = nome_pos[:8 * (n + 1)].cast("Q")
+        self._nomes = nomes
+        self._idades = idades[:8 * n].cast("q")
+        self._ativos = ativos[:n]
+        self._versoes = versoes[:8 * n].cast("Q")
+        self._emails = self._fatiar(email_pos, emails, n)
+
+        lista_ids = self._fatiar(id_pos, ids, n)
+        tipos = bytes(tipos[:n])
+        if b"i" in tipos:
+            lista_ids = [int(id) if t == ord("i") else id for id, t in zip(lista_ids, tipos)]
+        self._ids = lista_ids
+        # id -> número da linha no snapshot, ou o User já materializado/gravado
+        self._linhas: Dict[object, Union[int, User]] = dict(zip(lista_ids, range(n)))
+
+    @staticmethod
+    def _fatiar(posicoes, texto, n) -> List[str]:
+        pos = posicoes[:8 * (n + 1)].cast("Q")
+        conteudo = str(texto, "utf-8")
+        return [conteudo[pos[i]:pos[i + 1]] for i in range(n)]
+
+    def fechar(self):
+        # O mmap só fecha depois de soltas todas as memoryviews sobre ele.
+        for visao in (self._nome_pos, self._nomes, self._idades, self._ativos, self._versoes):
+            visao.release()
+        self._mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def _materializar(self, linha: int) -> User:
+        nome = str(self._nomes[self._nome_pos[linha]:self._nome_pos[linha + 1]], "utf-8")
+        campos = (self._ids[linha], nome, self._emails[linha], self._idades[linha], bool(self._ativos[linha]))
+        return _usuario_validado(*campos) if self._confiavel else User(*campos)
+
+    def indice_email(self) -> IndiceEmail:
+        # Monta o índice direto das colunas, sem materializar nenhum User.
+        indice = IndiceEmail()
+        for id, email in zip(self._ids, self._emails):
+            indice.adicionar_email(email, id)
+        return indice
+
+    def versoes(self) -> VersoesEmMemoria:
+        return VersoesEmMemoria(zip(self._ids, self._versoes))
+
+    def __getitem__(self, id) -> User:
+        valor = self._linhas[id]
+        if type(valor) is int:
+            valor = self._linhas[id] = self._materializar(valor)
+        return valor
+
+    def __contains__(self, id) -> bool:
+        return id in self._linhas
+
+    def __setitem__(self, id, user: User):
+        self._linhas[id] = user
+
+    def __delitem__(self, id):
+        del self._linhas[id]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._linhas)
+
+    def __len__(self) -> int:
+        return len(self._linhas)
+
+
+def carregar_snapshot(caminho: str, confiavel: bool = True, email_unico: bool = False) -> UserService:
+    """Recria um UserService a partir de um snapshot.
+
+    Com confiavel=True os registros não são revalidados ao serem materializados.
+    """
+    return UserService(email_unico=email_unico, armazenamento=ArmazenamentoSnapshot(caminho, confiavel))
@@ -0,0 +1,95 @@
+"""Testes do analisador: o caminho léxico dá as mesmas métricas que o ast.
+
+Rode com: python -m pytest -q test_analisador_testes.py
+"""
+import os
+
+import pytest
+
+from analisador_testes import _analisar_com_ast, _analisar_lexico, analisar_codigo
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+SUITES = (
+    "Claude_Sonnet_4_5.py",
+    "DeepSeek-V3.py",
+    "Copilot_Smart _(GPT\u20115).py",
+    "Gemini_1_5_Flash.py",
+    "GPT-4o_mini.py",
+)
+
+CASOS = [
+    '"""Módulo."""\ndef test_a():\n    ("doc")\n    assert 1\n',
+    'def test_a():\n    ("doc",)\n',
+    'def test_a():\n    "a" "b"\n    x = 1\n\n\n# fim\n',
+    'def test_a():\n    "a" f"b"\n',
+    'def test_a():\n    b"a"\n',
+    'def test_a():\n    r"a"\n',
+    'def test_a():\n    "a".strip()\n',
+    'x = (\n    "a"  # um\n    "b"  # dois\n)\n',
+    'def test_a():\n    s = """\nabc # não é comentário\n"""\n    return s\n',
+    "def test_a():\n    x = r'\\''\n    y = '\\\nz'\n",
+    'def test_a():\n    x = \\\n      1\n',
+    'def test_a():\n    x = [\n1,\n]\n    y = 2\n',
+    'def test_a():\r\n    assert 1\r\n',
+    '@pytest.mark.parametrize("a", [1])\ndef test_a(a):\n    pass\n@dec\nclass B:\n    "doc"\n',
+    (
+        "class T:\n    def assertValido(self, x):\n        '''d'''\n        assert x\n"
+        "    def test_a(self):\n        self.assertValido(\n            1)\n"
+        "        def test_dentro():\n            pass\n        y = 2\n    # fim\nz = 3\n"
+    ),
+    (
+        "def test_a():\n    x = f'{y}'\n    self.assertTrue(x)\n    assert(x)\n"
+        "    assert_x = (1)\n    m.assert_called_once_with(1)\n"
+    ),
+    (
+        'def test_a():\n    with pytest.raises(E) as e, self.assertRaisesRegex(E, "x"):\n        pass\n'
+        '    with raises:\n        pass\n    with open(f) as g, mock.patch("x"):\n        pass\n'
+        '    with pytest.raises(\n        E,\n        match=(\n            "a:b"\n        ),\n    ):\n        pass\n'
+    ),
+    'async def test_a():\n    async with pytest.raises(E):\n        await f()\n',
+    "",
+    "# só comentário\n",
+]
+
+# O caminho léxico desiste destes; analisar_codigo cai no ast.
+CASOS_AST = [
+    'def test_a(): "doc"\n',
+    "def test_a():\n\tpass\n",
+    "x = 1; assert x\n",
+    "def test_a():\n    with (pytest.raises(E)):\n        pass\n",
+    "def test_a():\n    with x[0].raises(E):\n        pass\n",
+    'def test_a():\n    x = f"{self.assertEqual(1, 1)}"\n',
+]
+
+
+@pytest.mark.parametrize("nome", SUITES)
+def test_suites_do_repositorio_dao_as_mesmas_metricas(nome):
+    with open(os.path.join(PASTA, nome), encoding="utf-8") as f:
+        conteudo = f.read()
+    lexico = _analisar_lexico(conteudo)
+    assert lexico is not None
+    assert lexico == _analisar_com_ast(conteudo)
+
+
+@pytest.mark.parametrize("conteudo", CASOS)
+def test_casos_de_borda_dao_as_mesmas_metricas(conteudo):
+    lexico = _analisar_lexico(conteudo)
+    assert lexico is not None
+    assert lexico == _analisar_com_ast(conteudo)
+
+
+@pytest.mark.parametrize("conteudo", CASOS_AST)
+def test_o_que_o_lexico_nao_trata_vai_para_o_ast(conteudo):
+    assert _analisar_lexico(conteudo) is None
+    assert analisar_codigo(conteudo) == _analisar_com_ast(conteudo)
+
+
+def test_comentarios_entre_strings_concatenadas_contam():
+    metrics = analisar_codigo('x = (\n    "a"  # um\n    "b"  # dois\n)\n')
+    assert metrics["total_comentarios"] == 2
+
+
+@pytest.mark.parametrize("conteudo", ["x = (1,\n", "x = 'abc\n", "def f(:\n    pass\n"])
+def test_codigo_que_nao_compila_lanca_syntax_error(conteudo):
+    with pytest.raises(SyntaxError):
+        analisar_codigo(conteudo)
@@ -0,0 +1,51 @@
+"""Testes do ArmazenamentoColunar contra o armazenamento padrão (dict).
+
+Rode com: python -m pytest -q test_armazenamento_colunar.py
+"""
+import random
+
+from armazenamento_colunar import ArmazenamentoColunar
+from sistema_alvo import UserService
+
+
+class Nome(str):
+    pass
+
+
+def test_mesmo_comportamento_que_o_dict_sob_operacoes_aleatorias():
+    aleatorio = random.Random(7)
+    padrao, colunar = UserService(), UserService(armazenamento=ArmazenamentoColunar())
+    ids = []
+    for passo in range(6000):
+        sorteio = aleatorio.random()
+        if sorteio < 0.3 or not ids:
+            # Inclui valores que não cabem nas colunas: subclasse de str e idade fora de 64 bits.
+            payload = {
+                "id": f"id{passo}",
+                "nome": aleatorio.choice(["Ana Maria", "José Ñandú", " espaço ", "名前テスト", Nome("Sub Classe")]),
+                "email": f"e{passo}@exemplo.com",
+                "idade": aleatorio.choice([18, 45, 2**63 - 1, 10**20]),
+                "ativo": aleatorio.random() < 0.5,
+            }
+            assert padrao.criarUsuario(dict(payload)) == colunar.criarUsuario(dict(payload))
+            ids.append(payload["id"])
+        elif sorteio < 0.8:
+            # Muitas atualizações sobre poucos ids forçam compactações.
+            id = aleatorio.choice(ids[-50:])
+            if padrao.buscarUsuario(id) is not None:
+                patch = aleatorio.choice([{"idade": aleatorio.randint(18, 99)}, {"nome": "Outro Nome"},
+                                          {"ativo": False}, {"email": f"novo{passo}@exemplo.com"}])
+                assert padrao.atualizarUsuario(id, patch) == colunar.atualizarUsuario(id, patch)
+        elif sorteio < 0.95:
+            id = aleatorio.choice(ids)
+            assert padrao.excluirUsuario(id) == colunar.excluirUsuario(id)
+        else:
+            lote = [{"id": f"lote{passo}-{k}", "nome": "Nome Lote", "email": f"l{passo}-{k}@exemplo.com",
+                     "idade": 30} for k in range(5)]
+            assert padrao.criarUsuariosEmLote(lote).usuarios == colunar.criarUsuariosEmLote(lote).usuarios
+            ids += [u["id"] for u in lote]
+
+    assert list(padrao._store.items()) == list(colunar._store.items())
+    assert {id: padrao.versaoUsuario(id) for id in ids} == {id: colunar.versaoUsuario(id) for id in ids}
+    assert all(type(u.nome) is type(padrao.buscarUsuario(u.id).nome) for u in colunar._store.values())
+    assert all(padrao.buscarUsuarioPorEmail(u.email) == u for u in colunar._store.values())
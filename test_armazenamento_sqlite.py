@@ -0,0 +1,53 @@
+"""Testes do backend SQLite de UserService.
+
+Rode com: python -m pytest -q test_armazenamento_sqlite.py
+"""
+import pytest
+
+from armazenamento_sqlite import ArmazenamentoSQLite
+from sistema_alvo import ConflitoVersao, UserService
+
+
+def usuario(i, **campos):
+    return {"nome": f"Usuario {i}", "email": f"u{i}@exemplo.com", "idade": 30, **campos}
+
+
+def test_versoes_ficam_no_banco_e_sobrevivem_ao_reinicio(tmp_path):
+    caminho = str(tmp_path / "usuarios.db")
+    with ArmazenamentoSQLite(caminho) as armazenamento:
+        servico = UserService(armazenamento=armazenamento)
+        ids = [servico.criarUsuario(usuario(i)).id for i in range(3)]
+        servico.criarUsuariosEmLote([usuario(3, id="lote")])
+        servico.atualizarUsuario(ids[0], {"idade": 40})
+        versoes = {id: servico.versaoUsuario(id) for id in ids + ["lote"]}
+        assert len(set(versoes.values())) == 4
+        assert servico._versoes.get(ids[1]) == versoes[ids[1]]
+
+    with ArmazenamentoSQLite(caminho) as armazenamento:
+        servico = UserService(armazenamento=armazenamento)
+        assert {id: servico.versaoUsuario(id) for id in versoes} == versoes
+        with pytest.raises(ConflitoVersao):
+            servico.atualizarUsuario(ids[0], {"idade": 41}, versao_esperada=versoes[ids[0]] - 1)
+        # O contador continua depois da maior versão gravada: nada se repete após o reinício.
+        servico.excluirUsuario(ids[1])
+        servico.criarUsuario(usuario(1, id=ids[1]))
+        assert servico.versaoUsuario(ids[1]) > max(versoes.values())
+        with pytest.raises(ConflitoVersao):
+            servico.atualizarUsuario(ids[1], {"idade": 41}, versao_esperada=versoes[ids[1]])
+
+
+def test_idade_acima_de_64_bits_e_gravada_e_lida_sem_perda(tmp_path):
+    caminho = str(tmp_path / "usuarios.db")
+    with ArmazenamentoSQLite(caminho) as armazenamento:
+        servico = UserService(armazenamento=armazenamento)
+        grande = servico.criarUsuario(usuario(0, idade=10**20))
+        servico.criarUsuariosEmLote([usuario(1, id="lote", idade=2**63), usuario(2, id="limite", idade=2**63 - 1)])
+        atualizado = servico.atualizarUsuario("lote", {"idade": 2**64 + 1})
+        assert servico.buscarUsuario(grande.id) == grande
+
+    with ArmazenamentoSQLite(caminho) as armazenamento:
+        servico = UserService(armazenamento=armazenamento)
+        assert servico.buscarUsuario(grande.id).idade == 10**20
+        assert servico.buscarUsuario("lote") == atualizado
+        assert type(servico.buscarUsuario("limite").idade) is int
+        assert [u.idade for u in servico._store.values()] == [10**20, 2**64 + 1, 2**63 - 1]
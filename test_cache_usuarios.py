@@ -0,0 +1,203 @@
+"""Testes do cache de leitura UserServiceComCache.
+
+Rode com: python -m pytest -q test_cache_usuarios.py
+"""
+import threading
+import time
+
+import pytest
+
+import cache_usuarios
+from cache_usuarios import UserServiceComCache
+from sistema_alvo import UserService
+
+
+def usuario(i, **campos):
+    return {"nome": f"Usuario {i}", "email": f"u{i}@exemplo.com", "idade": 30, **campos}
+
+
+class ServicoContado(UserService):
+    def __init__(self):
+        super().__init__()
+        self.leituras = 0
+        self.antes_de_ler = None
+
+    def buscarUsuario(self, id):
+        self.leituras += 1
+        if self.antes_de_ler is not None:
+            self.antes_de_ler(id)
+        return super().buscarUsuario(id)
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+@pytest.fixture
+def servico():
+    return ServicoContado()
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(cache_usuarios, "time", relogio)
+    return relogio
+
+
+def test_leituras_repetidas_vem_do_cache(servico):
+    cache = UserServiceComCache(servico)
+    user = cache.criarUsuario(usuario(1))
+    assert cache.buscarUsuario(user.id) == user
+    assert cache.buscarUsuario(user.id) == user
+    assert servico.leituras == 1
+    assert (cache.estatisticas.acertos, cache.estatisticas.faltas) == (1, 1)
+
+
+def test_atualizar_e_excluir_invalidam_a_entrada(servico):
+    cache = UserServiceComCache(servico)
+    user = cache.criarUsuario(usuario(1))
+    cache.buscarUsuario(user.id)
+
+    cache.atualizarUsuario(user.id, {"idade": 41})
+    assert cache.buscarUsuario(user.id).idade == 41
+    # Mutações feitas direto no serviço também invalidam.
+    servico.atualizarUsuario(user.id, {"idade": 42})
+    assert cache.buscarUsuario(user.id).idade == 42
+
+    cache.excluirUsuario(user.id)
+    assert cache.buscarUsuario(user.id) is None
+    assert servico.leituras == 4
+
+
+def test_criar_invalida_o_cache_negativo(servico):
+    cache = UserServiceComCache(servico)
+    assert cache.buscarUsuario("novo") is None
+    assert cache.buscarUsuario("novo") is None
+    assert servico.leituras == 1
+
+    user = cache.criarUsuario(usuario(1, id="novo"))
+    assert cache.buscarUsuario("novo") == user
+
+    servico.excluirUsuario("novo")
+    assert cache.buscarUsuario("novo") is None
+    cache.criarUsuariosEmLote([usuario(2, id="novo")])
+    assert cache.buscarUsuario("novo").nome == "Usuario 2"
+
+
+def test_entradas_expiram_depois_do_ttl(servico, relogio):
+    cache = UserServiceComCache(servico, ttl=10, ttl_negativo=1)
+    user = cache.criarUsuario(usuario(1))
+    cache.buscarUsuario(user.id)
+    cache.buscarUsuario("ausente")
+
+    relogio.agora += 0.5
+    cache.buscarUsuario(user.id)
+    cache.buscarUsuario("ausente")
+    assert servico.leituras == 2
+
+    relogio.agora += 1
+    cache.buscarUsuario(user.id)
+    cache.buscarUsuario("ausente")
+    assert servico.leituras == 3
+
+    relogio.agora += 10
+    cache.buscarUsuario(user.id)
+    assert servico.leituras == 4
+
+
+def test_ttl_zero_nao_guarda_e_ttl_none_nao_expira(servico, relogio):
+    cache = UserServiceComCache(servico, ttl=None, ttl_negativo=0)
+    user = cache.criarUsuario(usuario(1))
+    cache.buscarUsuario(user.id)
+    cache.buscarUsuario("ausente")
+    relogio.agora += 1e9
+    cache.buscarUsuario(user.id)
+    cache.buscarUsuario("ausente")
+    assert servico.leituras == 3
+
+
+def test_lru_despeja_a_entrada_menos_usada(servico):
+    cache = UserServiceComCache(servico, tamanho=2)
+    ids = [cache.criarUsuario(usuario(i)).id for i in range(3)]
+    cache.buscarUsuario(ids[0])
+    cache.buscarUsuario(ids[1])
+    cache.buscarUsuario(ids[0])
+    cache.buscarUsuario(ids[2])
+    assert list(cache._entradas) == [ids[0], ids[2]]
+    assert cache.estatisticas.despejos == 1
+
+
+def test_mutacao_durante_a_leitura_nao_fica_no_cache(servico):
+    cache = UserServiceComCache(servico)
+    user = cache.criarUsuario(usuario(1))
+
+    def mutar(id):
+        servico.antes_de_ler = None
+        servico.atualizarUsuario(id, {"idade": 50})
+
+    # A leitura que viu a mutação vale para quem a fez, mas não é guardada.
+    servico.antes_de_ler = mutar
+    cache.buscarUsuario(user.id)
+    assert user.id not in cache._entradas
+    assert cache.buscarUsuario(user.id).idade == 50
+
+
+def _buscar_em_paralelo(cache, id, n):
+    resultados = [None] * n
+
+    def buscar(i):
+        try:
+            resultados[i] = cache.buscarUsuario(id)
+        except Exception as e:
+            resultados[i] = e
+
+    threads = [threading.Thread(target=buscar, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    # Todas contaram a falta: a primeira está lendo e as outras esperam por ela.
+    limite = time.monotonic() + 5
+    while cache.estatisticas.faltas < n and time.monotonic() < limite:
+        time.sleep(0.001)
+    return threads, resultados
+
+
+def test_buscas_simultaneas_fazem_uma_unica_leitura(servico):
+    cache = UserServiceComCache(servico)
+    user = cache.criarUsuario(usuario(1))
+    liberar = threading.Event()
+    servico.antes_de_ler = lambda id: liberar.wait(5)
+
+    threads, resultados = _buscar_em_paralelo(cache, user.id, 8)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert resultados == [user] * 8
+    assert servico.leituras == 1
+    assert cache._cargas == {}
+
+
+def test_erro_na_leitura_chega_a_todos_e_nao_fica_no_cache(servico):
+    cache = UserServiceComCache(servico)
+    user = cache.criarUsuario(usuario(1))
+    liberar = threading.Event()
+
+    def falhar(id):
+        liberar.wait(5)
+        raise OSError("armazenamento fora do ar")
+
+    servico.antes_de_ler = falhar
+    threads, resultados = _buscar_em_paralelo(cache, user.id, 4)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(r, OSError) for r in resultados)
+    assert servico.leituras == 1
+    servico.antes_de_ler = None
+    assert cache.buscarUsuario(user.id) == user
@@ -0,0 +1,176 @@
+"""Testes de estresse de UserServiceConcorrente e UserServiceParticionado sob disputa.
+
+Rode com: python -m pytest -q test_concorrencia.py
+"""
+import sys
+import threading
+
+import pytest
+
+from indice_idade import IndiceIdade
+from servico_concorrente import UserServiceConcorrente
+from servico_particionado import UserServiceParticionado
+from sistema_alvo import ConflitoVersao, ValidationError
+
+THREADS = 8
+RODADAS = 50
+
+
+@pytest.fixture(autouse=True)
+def trocas_frequentes():
+    # Troca de thread a cada poucos microssegundos, para as disputas acontecerem de fato.
+    anterior = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(anterior)
+
+
+def disputar(funcao, threads=THREADS):
+    """Roda funcao(i) em várias threads liberadas ao mesmo tempo; devolve (resultados, erros)."""
+    barreira = threading.Barrier(threads)
+    resultados, erros = {}, {}
+
+    def rodar(i):
+        barreira.wait()
+        try:
+            resultados[i] = funcao(i)
+        except Exception as e:
+            erros[i] = e
+
+    ts = [threading.Thread(target=rodar, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return resultados, erros
+
+
+def usuario(i, **campos):
+    return {"nome": f"Usuario {i}", "email": f"u{i}@exemplo.com", "idade": 30, **campos}
+
+
+def test_id_duplicado_so_um_vence():
+    servico = UserServiceConcorrente()
+    for rodada in range(RODADAS):
+        uid = f"disputado-{rodada}"
+        resultados, erros = disputar(lambda i: servico.criarUsuario(usuario(i, id=uid)))
+        assert len(resultados) == 1
+        assert all(isinstance(e, ValidationError) and str(e) == "id já existe" for e in erros.values())
+        vencedor = next(iter(resultados.values()))
+        assert servico.buscarUsuario(uid) == vencedor
+    assert len(servico._store) == RODADAS
+
+
+def test_email_duplicado_so_um_vence():
+    servico = UserServiceConcorrente(email_unico=True)
+    for rodada in range(RODADAS):
+        email = f"disputado-{rodada}@exemplo.com"
+        resultados, erros = disputar(lambda i: servico.criarUsuario(usuario(i, email=email)))
+        assert len(resultados) == 1
+        assert all(str(e) == "email já existe" for e in erros.values())
+        assert servico.buscarUsuarioPorEmail(email) == next(iter(resultados.values()))
+    assert len(servico._store) == RODADAS
+
+
+def test_atualizacao_para_o_mesmo_email_so_uma_vence():
+    servico = UserServiceConcorrente(email_unico=True)
+    ids = [servico.criarUsuario(usuario(i)).id for i in range(THREADS)]
+    for rodada in range(RODADAS):
+        email = f"alvo-{rodada}@exemplo.com"
+        resultados, erros = disputar(lambda i: servico.atualizarUsuario(ids[i], {"email": email}))
+        assert len(resultados) == 1
+        assert all(str(e) == "email já existe" for e in erros.values())
+        assert [u.id for u in servico._store.values() if u.email == email] == [next(iter(resultados.values())).id]
+
+
+def test_compare_and_set_so_uma_escrita_por_versao():
+    servico = UserServiceConcorrente()
+    uid = servico.criarUsuario(usuario(0)).id
+    for rodada in range(RODADAS):
+        _, versao = servico.buscarUsuarioComVersao(uid)
+        resultados, erros = disputar(
+            lambda i: servico.atualizarUsuario(uid, {"idade": 18 + i}, versao_esperada=versao)
+        )
+        assert len(resultados) == 1
+        assert all(isinstance(e, ConflitoVersao) for e in erros.values())
+        assert servico.buscarUsuario(uid) == next(iter(resultados.values()))
+
+
+def test_retentativa_nao_perde_atualizacoes():
+    servico = UserServiceConcorrente()
+    uid = servico.criarUsuario(usuario(0)).id
+    por_thread = 100
+
+    def incrementar(_):
+        for _ in range(por_thread):
+            servico.atualizarUsuarioComRetentativa(uid, lambda u: {"idade": u.idade + 1}, tentativas=1000)
+
+    _, erros = disputar(incrementar)
+    assert erros == {}
+    assert servico.buscarUsuario(uid).idade == 30 + THREADS * por_thread
+
+
+def test_versao_nao_se_repete_apos_recriar():
+    servico = UserServiceConcorrente()
+    servico.criarUsuario(usuario(0, id="aba"))
+    _, versao_antiga = servico.buscarUsuarioComVersao("aba")
+    servico.excluirUsuario("aba")
+    servico.criarUsuario(usuario(0, id="aba"))
+    with pytest.raises(ConflitoVersao):
+        servico.atualizarUsuario("aba", {"idade": 40}, versao_esperada=versao_antiga)
+
+
+def test_indice_idade_consistente_sob_mutacoes_concorrentes():
+    servico = UserServiceConcorrente()
+    indice = IndiceIdade(servico)
+    ids = [servico.criarUsuario(usuario(i)).id for i in range(THREADS * 20)]
+
+    def mutar(i):
+        meus = ids[i::THREADS]
+        for rodada in range(10):
+            for j, id in enumerate(meus):
+                # Idades novas forçam a reconstrução das árvores no meio das outras threads.
+                servico.atualizarUsuario(id, {"idade": 18 + rodada * len(ids) + j * THREADS + i, "ativo": j % 2 == 0})
+            indice.contar(30, 60)
+            list(indice.usuarios())
+
+    _, erros = disputar(mutar)
+    assert erros == {}
+    usuarios = list(servico._store.values())
+    for ativo in (None, True, False):
+        assert indice.contar(ativo=ativo) == sum(1 for u in usuarios if ativo in (None, u.ativo))
+        assert indice.contar(1000, 3000, ativo) == sum(
+            1 for u in usuarios if 1000 <= u.idade <= 3000 and ativo in (None, u.ativo)
+        )
+    assert sorted(u.id for u in indice.usuarios()) == sorted(ids)
+
+
+def _verificar_lotes_tudo_ou_nada(servico, rodadas):
+    for rodada in range(rodadas):
+        # Cada lote tem ids só seus e um id disputado por todos: só um lote pode ser gravado.
+        lotes = [
+            [usuario(i, id=f"r{rodada}-t{i}-{j}") for j in range(20)] + [usuario(i, id=f"r{rodada}-disputado")]
+            for i in range(THREADS)
+        ]
+        resultados, erros = disputar(lambda i: servico.criarUsuariosEmLote(lotes[i]))
+        assert erros == {}
+        confirmados = [i for i, r in resultados.items() if r.confirmado]
+        assert len(confirmados) == 1
+        for i, resultado in resultados.items():
+            gravados = [servico.buscarUsuario(u["id"]) is not None for u in lotes[i][:-1]]
+            if i in confirmados:
+                assert all(gravados)
+                assert [u.id for u in resultado.usuarios] == [u["id"] for u in lotes[i]]
+            else:
+                assert not any(gravados)
+                assert resultado.usuarios == [None] * len(lotes[i])
+                assert str(resultado.erros[len(lotes[i]) - 1]) == "id já existe"
+
+
+def test_lote_tudo_ou_nada_sob_disputa():
+    _verificar_lotes_tudo_ou_nada(UserServiceConcorrente(), RODADAS)
+
+
+def test_lote_particionado_tudo_ou_nada_sob_disputa():
+    with UserServiceParticionado(particoes=2) as servico:
+        _verificar_lotes_tudo_ou_nada(servico, 10)
@@ -0,0 +1,147 @@
+"""Testes da recuperação pelo log de operações (snapshot + reaplicação).
+
+Rode com: python -m pytest -q test_log_operacoes.py
+"""
+import os
+import time
+
+import pytest
+
+from log_operacoes import ARQUIVO_LOG, ARQUIVO_SNAPSHOT, LogOperacoes, _reaplicar, recuperar_servico
+from sistema_alvo import UserService
+
+
+def usuario(i, **campos):
+    return {"nome": f"Usuario {i}", "email": f"u{i}@exemplo.com", "idade": 30, **campos}
+
+
+def estado(servico):
+    return {id: (user, servico.versaoUsuario(id)) for id, user in servico._store.items()}
+
+
+@pytest.fixture
+def recuperar():
+    abertos = []
+
+    def recuperar(pasta, **opcoes_log):
+        servico, log = recuperar_servico(str(pasta), **opcoes_log)
+        abertos.append((servico, log))
+        return servico, log
+
+    yield recuperar
+    for servico, log in abertos:
+        log.fechar()
+        if hasattr(servico._store, "fechar"):
+            servico._store.fechar()
+
+
+def carga(servico):
+    ids = [servico.criarUsuario(usuario(i)).id for i in range(6)]
+    servico.atualizarUsuario(ids[0], {"idade": 40})
+    servico.atualizarUsuario(ids[1], {"email": "novo@exemplo.com"})
+    servico.excluirUsuario(ids[2])
+    return ids
+
+
+def test_recupera_o_estado_e_as_versoes(tmp_path, recuperar):
+    servico, log = recuperar(tmp_path)
+    carga(servico)
+    esperado = estado(servico)
+    log.fechar()
+
+    recuperado, _ = recuperar(tmp_path)
+    assert estado(recuperado) == esperado
+    assert recuperado.buscarUsuarioPorEmail("novo@exemplo.com") is not None
+    assert recuperado.buscarUsuarioPorEmail("u1@exemplo.com") is None
+    # O log recuperado foi consolidado no snapshot e recomeça vazio.
+    assert os.path.getsize(tmp_path / ARQUIVO_LOG) == 0
+    novo = recuperado.criarUsuario(usuario(9))
+    assert recuperado.versaoUsuario(novo.id) > max(v for _, v in esperado.values())
+
+
+def test_ultima_linha_incompleta_e_descartada(tmp_path, recuperar):
+    servico, log = recuperar(tmp_path)
+    carga(servico)
+    esperado = estado(servico)
+    log.fechar()
+    with open(tmp_path / ARQUIVO_LOG, "ab") as arquivo:
+        arquivo.write(b'c99 {"id": "cortado", "nome": "Usu')
+
+    recuperado, log = recuperar(tmp_path)
+    assert estado(recuperado) == esperado
+    assert "cortado" not in recuperado._store
+    # O que vem depois da recuperação também sobrevive à próxima.
+    extra = recuperado.criarUsuario(usuario(7))
+    esperado = estado(recuperado)
+    log.fechar()
+    novamente, _ = recuperar(tmp_path)
+    assert estado(novamente) == esperado
+    assert extra.id in novamente._store
+
+
+def test_reaplicar_o_mesmo_log_duas_vezes_da_o_mesmo_estado(tmp_path):
+    servico = UserService()
+    log = LogOperacoes(servico, str(tmp_path))
+    ids = carga(servico)
+    log.fechar()
+    caminho_log = str(tmp_path / ARQUIVO_LOG)
+
+    recuperado = UserService()
+    assert _reaplicar(recuperado, caminho_log) == 9
+    primeiro = estado(recuperado)
+    assert primeiro == estado(servico)
+    _reaplicar(recuperado, caminho_log)
+    assert estado(recuperado) == primeiro
+    assert ids[2] not in recuperado._store
+    assert recuperado.buscarUsuarioPorEmail("u0@exemplo.com").idade == 40
+
+
+def test_compactar_grava_snapshot_e_esvazia_o_log(tmp_path, recuperar):
+    servico, log = recuperar(tmp_path)
+    carga(servico)
+    log.compactar()
+    assert os.path.getsize(tmp_path / ARQUIVO_LOG) == 0
+    assert os.path.exists(tmp_path / ARQUIVO_SNAPSHOT)
+
+    # Operações depois da compactação vão para o log novo, por cima do snapshot.
+    extra = servico.criarUsuario(usuario(8))
+    servico.excluirUsuario(next(iter(servico._store)))
+    esperado = estado(servico)
+    log.fechar()
+    assert os.path.getsize(tmp_path / ARQUIVO_LOG) > 0
+
+    recuperado, _ = recuperar(tmp_path)
+    assert estado(recuperado) == esperado
+    assert extra.id in recuperado._store
+
+
+def test_compactar_a_cada_compacta_sozinho(tmp_path, recuperar):
+    servico, log = recuperar(tmp_path, compactar_a_cada=4)
+    for i in range(5):
+        servico.criarUsuario(usuario(i))
+    log.sincronizar()
+    with open(tmp_path / ARQUIVO_LOG, "rb") as arquivo:
+        assert len(arquivo.readlines()) == 1
+    esperado = estado(servico)
+    log.fechar()
+
+    recuperado, _ = recuperar(tmp_path)
+    assert estado(recuperado) == esperado
+
+
+def test_grupo_pendente_vai_para_o_disco_no_prazo_sem_novas_operacoes(tmp_path):
+    servico = UserService()
+    log = LogOperacoes(servico, str(tmp_path), tamanho_grupo=1000, intervalo_fsync=0.5)
+    caminho_log = tmp_path / ARQUIVO_LOG
+    try:
+        servico.criarUsuario(usuario(1))
+        assert os.path.getsize(caminho_log) == 0
+
+        limite = time.monotonic() + 5
+        while os.path.getsize(caminho_log) == 0 and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert os.path.getsize(caminho_log) > 0
+        assert log._grupo == []
+        assert log._temporizador is None
+    finally:
+        log.fechar()
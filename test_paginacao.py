@@ -0,0 +1,68 @@
+"""Testes de paginarUsuarios com mutações entre as páginas.
+
+Rode com: python -m pytest -q test_paginacao.py
+"""
+import pytest
+
+from armazenamento_sqlite import ArmazenamentoSQLite
+from sistema_alvo import UserService
+
+
+@pytest.fixture(params=["dict", "sqlite"])
+def servico(request):
+    if request.param == "dict":
+        yield UserService()
+    else:
+        with ArmazenamentoSQLite() as armazenamento:
+            yield UserService(armazenamento=armazenamento)
+
+
+def criar(servico, n, prefixo="u"):
+    return [
+        servico.criarUsuario({"id": f"{prefixo}{i}", "nome": f"Usuario {i}", "email": f"{prefixo}{i}@x.com",
+                              "idade": 18 + i % 50, "ativo": i % 3 != 0}).id
+        for i in range(n)
+    ]
+
+
+def paginar(servico, tamanho, mutar=lambda pagina: None, **filtros):
+    vistos, cursor = [], None
+    while True:
+        pagina = servico.paginarUsuarios(tamanho, cursor, **filtros)
+        vistos += [u.id for u in pagina.itens]
+        if pagina.cursor is None:
+            return vistos
+        mutar(pagina)
+        cursor = pagina.cursor
+
+
+def test_paginas_cobrem_o_resultado_filtrado(servico):
+    criar(servico, 95)
+    esperado = [u.id for u in servico.consultarUsuarios(ativo=True, idade_min=30)]
+    assert paginar(servico, 7, ativo=True, idade_min=30) == esperado
+    assert paginar(servico, len(esperado), ativo=True, idade_min=30) == esperado
+
+
+def test_cursor_sobrevive_a_exclusoes_e_criacoes(servico):
+    criar(servico, 60)
+    criados = [u.id for u in servico.consultarUsuarios()]
+    excluidos_antes_de_ver = set()
+
+    def mutar(pagina):
+        # Exclui o item do cursor (o primeiro da próxima página) e um já visto, e cria outro.
+        seguinte = next(servico.consultarUsuarios(cursor=pagina.cursor))
+        excluidos_antes_de_ver.add(seguinte.id)
+        servico.excluirUsuario(seguinte.id)
+        servico.excluirUsuario(pagina.itens[0].id)
+        criados.extend(criar(servico, 1, prefixo=f"novo{len(criados)}-"))
+
+    vistos = paginar(servico, 5, mutar)
+    # Cada usuário aparece uma vez, na ordem de criação, e nenhum que ainda existe fica de fora.
+    assert vistos == [id for id in criados if id in vistos]
+    assert not excluidos_antes_de_ver & set(vistos)
+    assert {u.id for u in servico.consultarUsuarios()} <= set(vistos)
+
+
+def test_tamanho_de_pagina_invalido(servico):
+    with pytest.raises(ValueError):
+        servico.paginarUsuarios(0)
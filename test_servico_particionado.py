@@ -0,0 +1,131 @@
+"""Testes de UserServiceParticionado: lotes tudo ou nada e unicidade global de email.
+
+Rode com: python -m pytest -q test_servico_particionado.py
+"""
+import pytest
+
+from servico_particionado import UserServiceParticionado
+from sistema_alvo import UserService, ValidationError
+
+PARTICOES = 3
+
+
+def usuario(i, **campos):
+    return {"id": f"id-{i}", "nome": f"Usuario {i}", "email": f"u{i}@exemplo.com", "idade": 30, **campos}
+
+
+@pytest.fixture
+def servico():
+    with UserServiceParticionado(particoes=PARTICOES, email_unico=True) as servico:
+        yield servico
+
+
+def _em_varias_particoes(servico, payloads):
+    return len({servico._particao(p["id"]) for p in payloads}) > 1
+
+
+def test_lote_valido_e_gravado_em_todas_as_particoes(servico):
+    payloads = [usuario(i) for i in range(12)] + [{"nome": "Sem Id", "email": "s@exemplo.com", "idade": 40}]
+    assert _em_varias_particoes(servico, payloads[:-1])
+
+    resultado = servico.criarUsuariosEmLote(payloads)
+    assert resultado.confirmado
+    assert [u.email for u in resultado.usuarios] == [p["email"] for p in payloads]
+    assert servico.buscarUsuariosEmLote(u.id for u in resultado.usuarios) == resultado.usuarios
+    assert servico.buscarUsuarioPorEmail("s@exemplo.com") == resultado.usuarios[-1]
+
+
+@pytest.mark.parametrize("invalido", [
+    {"idade": 10},
+    {"email": "u0@exemplo.com"},  # repetido dentro do lote
+    {"email": "existente@exemplo.com"},  # já usado fora do lote
+    {"id": "ja-existe"},
+])
+def test_lote_com_erro_nao_grava_nada_em_nenhuma_particao(servico, invalido):
+    servico.criarUsuario(usuario(99, id="ja-existe", email="existente@exemplo.com"))
+    payloads = [usuario(i) for i in range(12)]
+    payloads[7] = usuario(7, **invalido)
+    assert _em_varias_particoes(servico, payloads)
+
+    resultado = servico.criarUsuariosEmLote(payloads)
+    assert list(resultado.erros) == [7]
+    assert isinstance(resultado.erros[7], ValidationError)
+    assert resultado.usuarios == [None] * len(payloads)
+
+    ids = [p["id"] for p in payloads if p["id"] != "ja-existe"]
+    assert servico.buscarUsuariosEmLote(ids) == [None] * len(ids)
+    # Os emails do lote desfeito continuam livres.
+    assert servico.buscarUsuarioPorEmail("u0@exemplo.com") is None
+    assert servico.criarUsuario(usuario(0, id="outro")).email == "u0@exemplo.com"
+
+
+def test_erros_do_lote_sao_os_mesmos_do_user_service(servico):
+    payloads = [usuario(i) for i in range(6)]
+    payloads[1] = usuario(1, idade=10)
+    payloads[3] = usuario(3, email="u2@exemplo.com")
+    payloads[4] = usuario(4, nome="")
+
+    esperado = UserService(email_unico=True).criarUsuariosEmLote(payloads)
+    resultado = servico.criarUsuariosEmLote(payloads)
+    assert {i: (type(e), str(e)) for i, e in resultado.erros.items()} == {
+        i: (type(e), str(e)) for i, e in esperado.erros.items()
+    }
+
+
+def test_email_e_unico_entre_particoes(servico):
+    primeiro = servico.criarUsuario(usuario(0, email="comum@exemplo.com"))
+    outros = [usuario(i, email="comum@exemplo.com") for i in range(1, 10)]
+    assert any(servico._particao(p["id"]) is not servico._particao(primeiro.id) for p in outros)
+
+    for payload in outros:
+        with pytest.raises(ValidationError, match="email já existe"):
+            servico.criarUsuario(payload)
+        assert servico.buscarUsuario(payload["id"]) is None
+    # Os erros do próprio payload vêm antes do de email, como no UserService.
+    with pytest.raises(ValidationError, match="idade"):
+        servico.criarUsuario(usuario(1, email="comum@exemplo.com", idade=10))
+    with pytest.raises(ValidationError, match="email já existe"):
+        servico.atualizarUsuario(servico.criarUsuario(usuario(20)).id, {"email": "comum@exemplo.com"})
+    assert servico.buscarUsuarioPorEmail("comum@exemplo.com") == primeiro
+
+
+def test_sem_email_unico_emails_podem_se_repetir():
+    with UserServiceParticionado(particoes=PARTICOES) as servico:
+        servico.criarUsuario(usuario(0, email="comum@exemplo.com"))
+        servico.criarUsuario(usuario(1, email="comum@exemplo.com"))
+        assert servico.buscarUsuarioPorEmail("comum@exemplo.com") is not None
+        assert servico._emails == {}
+
+
+def test_atualizar_libera_o_email_antigo(servico):
+    user = servico.criarUsuario(usuario(0, email="antigo@exemplo.com"))
+    servico.atualizarUsuario(user.id, {"email": "novo@exemplo.com"})
+
+    assert servico.buscarUsuarioPorEmail("antigo@exemplo.com") is None
+    assert servico.buscarUsuarioPorEmail("novo@exemplo.com").id == user.id
+    servico.criarUsuario(usuario(1, email="antigo@exemplo.com"))
+    with pytest.raises(ValidationError):
+        servico.criarUsuario(usuario(2, email="novo@exemplo.com"))
+    # Regravar o próprio email não conflita com ele mesmo.
+    servico.atualizarUsuario(user.id, {"email": "novo@exemplo.com", "idade": 50})
+
+
+def test_atualizacao_que_falha_nao_reserva_o_email(servico):
+    user = servico.criarUsuario(usuario(0))
+    with pytest.raises(ValidationError):
+        servico.atualizarUsuario(user.id, {"email": "reservado@exemplo.com", "idade": 10})
+    with pytest.raises(KeyError):
+        servico.atualizarUsuario("inexistente", {"email": "reservado@exemplo.com"})
+
+    assert servico.buscarUsuario(user.id) == user
+    servico.criarUsuario(usuario(1, email="reservado@exemplo.com"))
+
+
+def test_excluir_libera_o_email(servico):
+    user = servico.criarUsuario(usuario(0, email="livre@exemplo.com"))
+    assert servico.excluirUsuario(user.id)
+    assert not servico.excluirUsuario(user.id)
+
+    assert servico.buscarUsuarioPorEmail("livre@exemplo.com") is None
+    outro = servico.criarUsuario(usuario(1, email="livre@exemplo.com"))
+    assert servico.buscarUsuarioPorEmail("livre@exemplo.com") == outro
@@ -0,0 +1,125 @@
+"""Testes do snapshot em mmap de UserService.
+
+Rode com: python -m pytest -q test_snapshot.py
+"""
+import os
+
+import pytest
+
+import snapshot
+from sistema_alvo import User, UserService, ValidationError, _usuario_validado
+from snapshot import ArmazenamentoSnapshot, carregar_snapshot, salvar_snapshot
+
+
+def usuario(i, **campos):
+    return {"nome": f"Usuário {i} ç", "email": f"u{i}@exemplo.com", "idade": 30 + i, **campos}
+
+
+@pytest.fixture
+def servico():
+    servico = UserService()
+    for i in range(5):
+        servico.criarUsuario(usuario(i))
+    servico.atualizarUsuario(next(iter(servico._store)), {"ativo": False})
+    return servico
+
+
+def test_salvar_e_carregar_preserva_usuarios_versoes_e_ordem(tmp_path, servico):
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+
+    carregado = carregar_snapshot(caminho, email_unico=True)
+    with carregado._store:
+        assert list(carregado._store) == list(servico._store)
+        for id, user in servico._store.items():
+            assert carregado.buscarUsuario(id) == user
+            assert carregado.versaoUsuario(id) == servico.versaoUsuario(id)
+        assert carregado.buscarUsuarioPorEmail("u3@exemplo.com").nome == "Usuário 3 ç"
+        with pytest.raises(ValidationError):
+            carregado.criarUsuario(usuario(9, email="u3@exemplo.com"))
+        # O contador de versões continua depois da maior versão carregada.
+        novo = carregado.criarUsuario(usuario(9))
+        assert carregado.versaoUsuario(novo.id) > max(map(servico.versaoUsuario, servico._store))
+
+
+def test_ids_inteiros_voltam_como_int(tmp_path):
+    servico = UserService(armazenamento={7: _usuario_validado(7, "Sete", "s@exemplo.com", 70, True)})
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+    with ArmazenamentoSnapshot(caminho) as armazenamento:
+        assert list(armazenamento) == [7]
+        assert armazenamento[7].id == 7
+
+
+def test_usuarios_sao_materializados_so_quando_lidos(tmp_path, servico):
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+    ids = list(servico._store)
+
+    with ArmazenamentoSnapshot(caminho) as armazenamento:
+        assert all(type(linha) is int for linha in armazenamento._linhas.values())
+        user = armazenamento[ids[1]]
+        assert armazenamento[ids[1]] is user
+        assert sum(isinstance(valor, User) for valor in armazenamento._linhas.values()) == 1
+        # Escritas ficam na memória; o arquivo não muda.
+        armazenamento[ids[2]] = _usuario_validado(ids[2], "Outro", "o@exemplo.com", 50, True)
+        del armazenamento[ids[3]]
+        assert len(armazenamento) == 4
+
+    with ArmazenamentoSnapshot(caminho) as armazenamento:
+        assert len(armazenamento) == 5
+        assert armazenamento[ids[2]] == servico._store[ids[2]]
+
+
+def test_fechar_libera_o_mmap_e_mantem_os_materializados(tmp_path, servico):
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+    ids = list(servico._store)
+
+    with ArmazenamentoSnapshot(caminho) as armazenamento:
+        lido = armazenamento[ids[0]]
+    assert armazenamento._mapa.closed
+    assert armazenamento[ids[0]] is lido
+    with pytest.raises(ValueError):
+        armazenamento[ids[1]]
+    armazenamento.fechar()
+
+
+def test_arquivo_que_nao_e_snapshot_e_rejeitado(tmp_path):
+    caminho = tmp_path / "outro.bin"
+    caminho.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        ArmazenamentoSnapshot(str(caminho))
+
+
+def test_falha_ao_gravar_mantem_o_snapshot_anterior(tmp_path, servico, monkeypatch):
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+    anterior = open(caminho, "rb").read()
+    servico.criarUsuario(usuario(5))
+
+    def fsync_falhando(fd):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(snapshot.os, "fsync", fsync_falhando)
+    with pytest.raises(OSError):
+        salvar_snapshot(servico, caminho)
+    monkeypatch.undo()
+
+    assert open(caminho, "rb").read() == anterior
+    with ArmazenamentoSnapshot(caminho) as armazenamento:
+        assert len(armazenamento) == 5
+
+
+def test_substituir_snapshot_nao_afeta_quem_ja_carregou(tmp_path, servico):
+    caminho = str(tmp_path / "usuarios.snap")
+    salvar_snapshot(servico, caminho)
+    ids = list(servico._store)
+
+    with ArmazenamentoSnapshot(caminho) as antigo:
+        servico.atualizarUsuario(ids[4], {"nome": "Renomeado"})
+        salvar_snapshot(servico, caminho)
+        assert not os.path.exists(caminho + ".tmp")
+        assert antigo[ids[4]].nome == "Usuário 4 ç"
+        with ArmazenamentoSnapshot(caminho) as novo:
+            assert novo[ids[4]].nome == "Renomeado"
@@ -0,0 +1,184 @@
+from itertools import repeat
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+from sistema_alvo import EMAIL_RE, ResultadoLote, UserService
+
+# Código de erro por linha -> mensagem que o ValidationError daquela linha teria.
+# 0 significa linha válida.
+MENSAGENS_ERRO = (
+    None,
+    "nome deve ser string",
+    "nome deve ter entre 2 e 100 caracteres",
+    "email em formato inválido",
+    "idade deve ser inteiro",
+    "idade mínima é 18 anos",
+    "ativo deve ser booleano",
+)
+(
+    VALIDO,
+    NOME_NAO_STRING,
+    NOME_TAMANHO,
+    EMAIL_INVALIDO,
+    IDADE_NAO_INTEIRO,
+    IDADE_MINIMA,
+    ATIVO_NAO_BOOLEANO,
+) = range(len(MENSAGENS_ERRO))
+
+# Acima disso, a linha é verificada em Python (ver _por_texto).
+_MAIOR_TEXTO_VETORIZADO = 320
+
+
+class ResultadoValidacao(NamedTuple):
+    mascara: np.ndarray  # bool por linha: True se a linha é válida
+    codigos: np.ndarray  # uint8 por linha, índice em MENSAGENS_ERRO
+
+
+class ResultadoCarga(NamedTuple):
+    validacao: ResultadoValidacao
+    lote: ResultadoLote  # erros indexados pelas linhas originais de dados
+
+
+def _coluna(dados, nome: str) -> np.ndarray:
+    if nome not in dados:
+        raise ValueError(f"coluna obrigatória ausente: {nome}")
+    valores = dados[nome]
+    # Caminho numérico só para arrays/Series já tipados: np.asarray numa lista
+    # mista ([20, "30"], [True, "sim"]) converteria todos os itens para um tipo só.
+    dtype = getattr(valores, "dtype", None)
+    if dtype is not None and dtype.kind in "biu":
+        return np.asarray(valores)
+    # tolist() devolve os tipos nativos do Python, como os que User(**linha) receberia.
+    valores = valores.tolist() if hasattr(valores, "tolist") else list(valores)
+    objetos = np.empty(len(valores), dtype=object)
+    objetos[:] = valores
+    return objetos
+
+
+def _e_tipo(coluna: np.ndarray, tipo) -> np.ndarray:
+    if coluna.dtype.kind == "b":
+        return np.full(len(coluna), tipo in (bool, int))
+    if coluna.dtype.kind in "iu":
+        return np.full(len(coluna), tipo is int)
+    return np.fromiter(map(isinstance, coluna, repeat(tipo)), dtype=bool, count=len(coluna))
+
+
+def _por_texto(valores: np.ndarray, vetorizada, por_item) -> np.ndarray:
+    # Aplica vetorizada à coluna de str convertida para o dtype "U" do NumPy,
+    # onde as funções de np.strings rodam em C sobre a coluna inteira. Linhas
+    # longas (o dtype "U" tem largura fixa: uma só aumentaria a coluna toda) ou
+    # com "\0" (que o dtype "U" trata como fim de string) passam por por_item.
+    n = len(valores)
+    comuns = np.fromiter(map(len, valores), dtype=np.int64, count=n) <= _MAIOR_TEXTO_VETORIZADO
+    comuns &= ~np.fromiter(map(str.__contains__, valores, repeat("\0")), dtype=bool, count=n)
+    if comuns.all():
+        return vetorizada(valores.astype(str))
+    parte = vetorizada(valores[comuns].astype(str))
+    resultado = np.empty(n, dtype=parte.dtype)
+    resultado[comuns] = parte
+    resultado[~comuns] = list(map(por_item, valores[~comuns]))
+    return resultado
+
+
+def _tamanhos_sem_espacos(texto: np.ndarray) -> np.ndarray:
+    # np.strings.strip sem argumentos remove os mesmos espaços que str.strip.
+    return np.strings.str_len(np.strings.strip(texto))
+
+
+def _emails_validos(texto: np.ndarray) -> np.ndarray:
+    # EMAIL_RE (^[^@ \t\r\n]+@[^@ \t\r\n]+\.[^@ \t\r\n]+$) decomposta em operações
+    # de coluna: um único "@", com algo antes; no domínio, um "." com algo antes
+    # e depois; nenhum espaço, tab ou quebra de linha, exceto um "\n" final, que
+    # o "$" da regex aceita.
+    quebra_final = np.strings.endswith(texto, "\n")
+    fim = np.strings.str_len(texto) - quebra_final
+    arroba = np.strings.find(texto, "@")
+    validos = (arroba >= 1) & (np.strings.count(texto, "@") == 1)
+    validos &= np.strings.count(texto, "\n") == quebra_final
+    for espaco in " \t\r":
+        validos &= np.strings.count(texto, espaco) == 0
+    validos &= np.strings.rfind(texto, ".", arroba + 2, fim - 1) != -1
+    return validos
+
+
+def _tamanho_sem_espacos(nome: str) -> int:
+    return len(nome.strip())
+
+
+def _email_valido(email: str) -> bool:
+    return EMAIL_RE.match(email) is not None
+
+
+def validar_colunas(dados) -> ResultadoValidacao:
+    """Valida um DataFrame ou dict de arrays (colunas nome, email, idade e, opcionalmente, ativo).
+
+    As regras são as de sistema_alvo, aplicadas coluna a coluna; o código de cada
+    linha corresponde ao primeiro erro que User(**linha) lançaria.
+    """
+    nomes = _coluna(dados, "nome")
+    emails = _coluna(dados, "email")
+    idades = _coluna(dados, "idade")
+    n = len(nomes)
+    if len(emails) != n or len(idades) != n:
+        raise ValueError("todas as colunas devem ter o mesmo tamanho")
+    ativos = _coluna(dados, "ativo") if "ativo" in dados else np.ones(n, dtype=bool)
+
+    nome_str = _e_tipo(nomes, str)
+    nome_tamanho = np.zeros(n, dtype=bool)
+    if nome_str.any():
+        tamanhos = _por_texto(nomes[nome_str], _tamanhos_sem_espacos, _tamanho_sem_espacos)
+        nome_tamanho[nome_str] = (tamanhos >= 2) & (tamanhos <= 100)
+
+    email_ok = np.zeros(n, dtype=bool)
+    email_str = _e_tipo(emails, str)
+    if email_str.any():
+        email_ok[email_str] = _por_texto(emails[email_str], _emails_validos, _email_valido)
+
+    idade_int = _e_tipo(idades, int)
+    idade_minima = np.zeros(n, dtype=bool)
+    if idade_int.any():
+        # bool é subclasse de int, como em _validate_idade (True < 18).
+        idade_minima[idade_int] = (idades[idade_int] >= 18).astype(bool)
+
+    ativo_ok = _e_tipo(ativos, bool)
+
+    # Atribuídos do último ao primeiro: prevalece o erro da regra verificada antes.
+    codigos = np.zeros(n, dtype=np.uint8)
+    codigos[~ativo_ok] = ATIVO_NAO_BOOLEANO
+    codigos[~idade_minima] = IDADE_MINIMA
+    codigos[~idade_int] = IDADE_NAO_INTEIRO
+    codigos[~email_ok] = EMAIL_INVALIDO
+    codigos[~nome_tamanho] = NOME_TAMANHO
+    codigos[~nome_str] = NOME_NAO_STRING
+    return ResultadoValidacao(codigos == VALIDO, codigos)
+
+
+def mensagens(codigos: np.ndarray) -> Dict[int, str]:
+    """Linha -> mensagem de erro, só para as linhas inválidas."""
+    return {int(i): MENSAGENS_ERRO[codigos[i]] for i in np.flatnonzero(codigos)}
+
+
+def carregar_validos(servico: UserService, dados) -> ResultadoCarga:
+    """Valida as colunas e cria em lote, no serviço, os usuários das linhas válidas.
+
+    Os erros do lote (ex.: id ou email já existentes) vêm indexados pela linha
+    original em dados, como os códigos da validação. Num UserService, as linhas
+    válidas são gravadas sem passar de novo pela validação de campos.
+    """
+    validacao = validar_colunas(dados)
+    linhas = np.flatnonzero(validacao.mascara)
+    colunas = {c: _coluna(dados, c)[linhas].tolist() for c in ("id", "nome", "email", "idade", "ativo") if c in dados}
+    if isinstance(servico, UserService):
+        lote = servico._criarValidadosEmLote(
+            colunas.get("id", [None] * len(linhas)),
+            colunas["nome"],
+            colunas["email"],
+            colunas["idade"],
+            colunas.get("ativo", [True] * len(linhas)),
+        )
+    else:
+        payloads = [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]
+        lote = servico.criarUsuariosEmLote(payloads)
+    lote.erros = {int(linhas[j]): erro for j, erro in lote.erros.items()}
+    return ResultadoCarga(validacao, lote)